@@ -0,0 +1,334 @@
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import platform
+import resource
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from rich.console import Console  # noqa: E402
+
+from pop_setup_cli import ui  # noqa: E402
+from pop_setup_cli.config_loader import load_configs  # noqa: E402
+from pop_setup_cli.executor import Executor  # noqa: E402
+from pop_setup_cli.hardware import HardwareState  # noqa: E402
+from pop_setup_cli.log_buffer import LogBuffer  # noqa: E402
+from pop_setup_cli.wakeup import WakeQueue  # noqa: E402
+
+DEFAULT_BASELINE = ROOT / "benchmarks" / "orchestrator-baseline.json"
+DEFAULT_OUTPUT = Path(tempfile.gettempdir()) / "pop-setup-orchestrator-bench.json"
+SLEEP_SECONDS = 0.1
+FLOOD_LINE = "synthetic output line 0123456789 abcdefghijklmnopqrstuvwxyz"
+
+# Body of each synthetic install script; checks of "noop" steps fail so the
+# install runs, every other kind has no check.
+STEP_BODIES = {
+    "noop": ":",
+    "sleep": f"sleep {SLEEP_SECONDS}",
+    "flood": f"yes '{FLOOD_LINE}' | head -c \"$BENCH_FLOOD_BYTES\"",
+    "hang": "sleep 3600",
+    "fail": "echo 'synthetic failure' >&2; exit 1",
+}
+
+
+class _NoHardware:
+    def detect(self) -> HardwareState:
+        return HardwareState(False, cpu_count=1)
+
+
+class _Controller:
+    # Behaves like InstallController: actions arrive on a wakeup fd.
+    def __init__(self) -> None:
+        self._actions: WakeQueue[str] = WakeQueue()
+        self.requested_at: Optional[float] = None
+
+    def fileno(self) -> int:
+        return self._actions.fileno()
+
+    def consume_action(self) -> Optional[str]:
+        return self._actions.get_nowait()
+
+    def request(self, action: str, delay: float) -> None:
+        def fire() -> None:
+            time.sleep(delay)
+            self.requested_at = time.perf_counter()
+            self._actions.put(action)
+
+        threading.Thread(target=fire, daemon=True).start()
+
+
+def write_catalog(root: Path, kinds: Sequence[str], chain_every: int = 0) -> List[str]:
+    # Generates configs/scripts.yml, configs/profiles.yml and one script per
+    # step. With chain_every, every n-th step depends on the one before it so
+    # the scheduler has dependency edges to resolve.
+    (root / "configs").mkdir(parents=True, exist_ok=True)
+    (root / "scripts").mkdir(parents=True, exist_ok=True)
+    (root / "scripts" / "check_missing.sh").write_text("exit 1\n")
+    (root / "scripts" / "check_present.sh").write_text("command -v bash >/dev/null\n")
+    for kind, body in STEP_BODIES.items():
+        (root / "scripts" / f"bench_{kind}.sh").write_text(f"{body}\n")
+    ids: List[str] = []
+    lines = ["scripts:"]
+    for index, kind in enumerate(kinds):
+        script_id = f"{kind}_{index:04d}"
+        lines += [
+            f"  - id: {script_id}",
+            f'    name: "Synthetic {kind} {index}"',
+            f'    script: "scripts/bench_{kind}.sh"',
+            '    check: "scripts/check_missing.sh"',
+        ]
+        if chain_every and index and index % chain_every == 0:
+            lines += ["    depends_on:", f"      - {ids[-1]}"]
+        ids.append(script_id)
+    (root / "configs" / "scripts.yml").write_text("\n".join(lines) + "\n")
+    profile = ["profiles:", "  bench:", '    description: "Synthetic catalog"', "    scripts:"]
+    profile += [f"      - {script_id}" for script_id in ids]
+    (root / "configs" / "profiles.yml").write_text("\n".join(profile) + "\n")
+    return ids
+
+
+def make_executor(root: Path, jobs: int = 1) -> Executor:
+    scripts, profiles = load_configs(root, cache_path=root / "configs.pickle")
+    return Executor(
+        scripts,
+        profiles,
+        root,
+        hardware_detector=_NoHardware(),
+        jobs=jobs,
+        log_root=root / "logs",
+    )
+
+
+def peak_rss_kb() -> int:
+    # Children are not reported: each one is forked from this process, so
+    # their peak is dominated by the copy of the orchestrator before exec.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def bench_scale(size: int, jobs: int) -> Dict[str, object]:
+    with tempfile.TemporaryDirectory(prefix="pop_bench_") as tmp:
+        root = Path(tmp)
+        ids = write_catalog(root, ["noop"] * size, chain_every=10)
+        started = time.perf_counter()
+        load_configs(root, cache_path=root / "configs.pickle")
+        cold = time.perf_counter() - started
+        started = time.perf_counter()
+        load_configs(root, cache_path=root / "configs.pickle")
+        warm = time.perf_counter() - started
+
+        executor = make_executor(root, jobs)
+        started = time.perf_counter()
+        executor.run_all_checks()
+        checks = time.perf_counter() - started
+
+        timings: Dict[str, float] = {}
+        for label, step_jobs in (("serial", 1), ("parallel", jobs)):
+            started = time.perf_counter()
+            executor.run_scripts(ids, jobs=step_jobs)
+            timings[label] = time.perf_counter() - started
+
+        # The same run again with the live tracker consuming every event, as
+        # the interactive menu does.
+        output = Console(file=io.StringIO(), force_terminal=True, width=120)
+        scripts = [executor.scripts[script_id] for script_id in ids]
+        with ui.install_progress(
+            scripts,
+            ui.DisplayOptions(log_pane=True),
+            output=output,
+            controls=False,
+            estimates={script_id: 0.01 for script_id in ids},
+            jobs=jobs,
+        ) as tracker:
+            started = time.perf_counter()
+            executor.run_scripts(
+                ids, progress_hook=tracker.hook, log_buffer=tracker.log_buffer, jobs=jobs
+            )
+            tracked = time.perf_counter() - started
+    return {
+        "steps": size,
+        "jobs": jobs,
+        "load_configs_cold_ms": round(cold * 1000, 2),
+        "load_configs_warm_ms": round(warm * 1000, 2),
+        "check_sweep_ms_per_step": round(checks / size * 1000, 3),
+        "serial_ms_per_step": round(timings["serial"] / size * 1000, 3),
+        "parallel_ms_per_step": round(timings["parallel"] / size * 1000, 3),
+        "tracked_ms_per_step": round(tracked / size * 1000, 3),
+    }
+
+
+def bench_sleep(count: int, jobs: int) -> Dict[str, object]:
+    # Steps that only sleep: anything beyond the ideal schedule is overhead.
+    with tempfile.TemporaryDirectory(prefix="pop_bench_") as tmp:
+        root = Path(tmp)
+        ids = write_catalog(root, ["sleep"] * count)
+        executor = make_executor(root, jobs)
+        started = time.perf_counter()
+        executor.run_scripts(ids)
+        elapsed = time.perf_counter() - started
+    ideal = -(-count // jobs) * SLEEP_SECONDS
+    return {
+        "steps": count,
+        "jobs": jobs,
+        "seconds": round(elapsed, 3),
+        "ideal_seconds": round(ideal, 3),
+        "overhead_ms_per_step": round((elapsed - ideal) / count * 1000, 3),
+    }
+
+
+def bench_flood(megabytes: int) -> Dict[str, object]:
+    with tempfile.TemporaryDirectory(prefix="pop_bench_") as tmp:
+        root = Path(tmp)
+        ids = write_catalog(root, ["flood"])
+        executor = make_executor(root)
+        buffer = LogBuffer()
+        flood_bytes = megabytes << 20
+        started = time.perf_counter()
+        results = executor._run_streaming_path(
+            executor.scripts[ids[0]].script_path,
+            log_buffer=buffer,
+            log_path=root / "flood.log",
+            env={"BENCH_FLOOD_BYTES": str(flood_bytes)},
+        )
+        elapsed = time.perf_counter() - started
+    status_code = results[0]
+    return {
+        "megabytes": megabytes,
+        "status": status_code,
+        "seconds": round(elapsed, 3),
+        "lines": buffer.line_count,
+        "lines_per_second": round(buffer.line_count / elapsed),
+        "megabytes_per_second": round(megabytes / elapsed, 1),
+    }
+
+
+def bench_cancel(delay: float = 0.5) -> Dict[str, object]:
+    # Time from the cancel request to run_scripts returning with a hanging
+    # step running and more queued behind it.
+    with tempfile.TemporaryDirectory(prefix="pop_bench_") as tmp:
+        root = Path(tmp)
+        ids = write_catalog(root, ["hang", "noop", "noop"])
+        executor = make_executor(root)
+        controller = _Controller()
+        controller.request("cancel", delay)
+        results = executor.run_scripts(ids, controller=controller)
+        returned = time.perf_counter()
+    return {
+        "latency_ms": round((returned - (controller.requested_at or returned)) * 1000, 2),
+        "statuses": [result.status for result in results if result.phase != "check"],
+    }
+
+
+def bench_fail(count: int) -> Dict[str, object]:
+    # A failing step at the head of dependency chains: the dependents must be
+    # skipped without being started.
+    with tempfile.TemporaryDirectory(prefix="pop_bench_") as tmp:
+        root = Path(tmp)
+        ids = write_catalog(root, ["fail"] + ["noop"] * (count - 1), chain_every=1)
+        executor = make_executor(root)
+        started = time.perf_counter()
+        results = executor.run_scripts(ids)
+        elapsed = time.perf_counter() - started
+    skipped = sum(1 for result in results if result.phase == "dependency")
+    return {"steps": count, "dependency_skips": skipped, "seconds": round(elapsed, 3)}
+
+
+def compare(current: dict, baseline: dict, path: str = "") -> List[str]:
+    changes: List[str] = []
+    for key, value in current.items():
+        label = f"{path}.{key}" if path else key
+        previous = baseline.get(key) if isinstance(baseline, dict) else None
+        if isinstance(value, dict):
+            changes += compare(value, previous or {}, label)
+        elif isinstance(value, (int, float)) and isinstance(previous, (int, float)) and previous:
+            delta = (value - previous) / previous * 100
+            if abs(delta) >= 10:
+                changes.append(f"{label}: {previous} -> {value} ({delta:+.0f}%)")
+    return changes
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Measure orchestration overhead on synthetic script catalogs"
+    )
+    parser.add_argument("--sizes", default="10,100,1000", help="Catalog sizes to schedule")
+    parser.add_argument("--jobs", type=int, default=4)
+    parser.add_argument("--flood-mb", type=int, default=64)
+    destination = parser.add_mutually_exclusive_group()
+    destination.add_argument(
+        "--output",
+        type=Path,
+        default=DEFAULT_OUTPUT,
+        help=f"Where to write the JSON results (default: {DEFAULT_OUTPUT})",
+    )
+    destination.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help=f"Write the results over the checked-in baseline ({DEFAULT_BASELINE.name})",
+    )
+    parser.add_argument(
+        "--compare",
+        type=Path,
+        default=None,
+        help="Print metrics that moved by 10%% or more against this baseline",
+    )
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    results: Dict[str, object] = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "scale": {},
+    }
+    for size in sizes:
+        scale = bench_scale(size, args.jobs)
+        results["scale"][str(size)] = scale
+        print(
+            f"{size:>5} steps: load {scale['load_configs_cold_ms']:.1f}/"
+            f"{scale['load_configs_warm_ms']:.1f} ms cold/warm, "
+            f"checks {scale['check_sweep_ms_per_step']:.2f} ms/step, "
+            f"run {scale['serial_ms_per_step']:.2f} ms/step serial, "
+            f"{scale['parallel_ms_per_step']:.2f} ms/step with {args.jobs} jobs, "
+            f"{scale['tracked_ms_per_step']:.2f} ms/step tracked"
+        )
+    results["sleep"] = bench_sleep(20, args.jobs)
+    print(
+        f"sleep: {results['sleep']['seconds']:.2f}s for an ideal "
+        f"{results['sleep']['ideal_seconds']:.2f}s "
+        f"({results['sleep']['overhead_ms_per_step']:.1f} ms/step overhead)"
+    )
+    results["flood"] = bench_flood(args.flood_mb)
+    print(
+        f"flood: {results['flood']['lines']} lines in {results['flood']['seconds']:.2f}s "
+        f"({results['flood']['lines_per_second']:,} lines/s, "
+        f"{results['flood']['megabytes_per_second']} MB/s)"
+    )
+    results["cancel"] = bench_cancel()
+    print(f"cancel: {results['cancel']['latency_ms']:.1f} ms to return after the request")
+    results["fail"] = bench_fail(50)
+    print(f"fail: {results['fail']['dependency_skips']} dependents skipped")
+    results["peak_rss_kb"] = peak_rss_kb()
+    print(f"peak RSS: {results['peak_rss_kb'] / 1024:.1f} MiB orchestrator")
+    if args.compare:
+        try:
+            baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as exc:
+            print(f"Unable to read baseline {args.compare}: {exc}")
+            return 1
+        for change in compare(results, baseline) or ["No metric moved by 10% or more"]:
+            print(change)
+    output = DEFAULT_BASELINE if args.update_baseline else args.output
+    output.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+    print(f"Results written to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
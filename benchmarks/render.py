@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import argparse
+import io
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from rich.console import Console  # noqa: E402
+
+from pop_setup_cli import ui  # noqa: E402
+from pop_setup_cli.models import Script  # noqa: E402
+
+
+def synthetic_scripts(count: int):
+    return [
+        Script(f"step{index:04d}", f"Synthetic step {index}", "", "scripts/none.sh", None, [], [], [])
+        for index in range(count)
+    ]
+
+
+def drive(count: int, plain: bool, log_pane: bool = False) -> dict:
+    # Each script gets a start, a progress line and an end event, fired as
+    # fast as the tracker accepts them, the way a parallel run bursts.
+    scripts = synthetic_scripts(count)
+    output = Console(file=io.StringIO(), force_terminal=not plain, width=120)
+    with ui.install_progress(
+        scripts, ui.DisplayOptions(plain=plain, log_pane=log_pane), output=output, controls=False
+    ) as tracker:
+        start = time.perf_counter()
+        for index, script in enumerate(scripts, start=1):
+            tracker.hook("start", index, count, script)
+            tracker.hook("progress", index, count, script, "50%")
+            tracker.hook("end", index, count, script, "DONE")
+        elapsed = time.perf_counter() - start
+        if not plain:
+            # Paint the final state once, as Live would on its next frame.
+            tracker.refresh()
+    events = count * 3
+    return {
+        "events": events,
+        "seconds": elapsed,
+        "per_event_us": elapsed / events * 1e6,
+        "table_rebuilds": getattr(getattr(tracker, "status_view", None), "rebuilds", 0),
+        "output_bytes": len(output.file.getvalue()),
+    }
+
+
+def flood(lines: int, writers: int = 2) -> dict:
+    # Reader threads append as fast as they can while the live output pane
+    # is open; ingestion must not slow down because frames are being drawn.
+    scripts = synthetic_scripts(1)
+    output = Console(file=io.StringIO(), force_terminal=True, width=120)
+    with ui.install_progress(
+        scripts, ui.DisplayOptions(log_pane=True), output=output, controls=False
+    ) as tracker:
+        buffer = tracker.log_buffer
+
+        def write(name: str) -> None:
+            for index in range(lines // writers):
+                buffer.append(f"{name}: synthetic output line {index}", name)
+
+        threads = [threading.Thread(target=write, args=(f"w{n}",)) for n in range(writers)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        tracker.refresh()
+    return {
+        "lines": buffer.line_count,
+        "seconds": elapsed,
+        "lines_per_second": buffer.line_count / elapsed,
+        "not_shown": tracker.log_view.dropped,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure InstallProgress event handling and output ingestion")
+    parser.add_argument("--scripts", type=int, default=1000)
+    parser.add_argument("--lines", type=int, default=200_000)
+    parser.add_argument(
+        "--max-us",
+        type=float,
+        default=None,
+        help="Exit non-zero when live mode exceeds this many microseconds per event",
+    )
+    args = parser.parse_args()
+    results = {
+        "live": drive(args.scripts, plain=False),
+        "pane": drive(args.scripts, plain=False, log_pane=True),
+        "plain": drive(args.scripts, plain=True),
+    }
+    for label, result in results.items():
+        print(
+            f"{label:>5}: {result['events']} events in {result['seconds'] * 1000:7.1f} ms "
+            f"({result['per_event_us']:6.1f} us/event), "
+            f"{result['table_rebuilds']} table rebuilds, {result['output_bytes']} bytes written"
+        )
+    pane = flood(args.lines)
+    print(
+        f"flood: {pane['lines']} lines in {pane['seconds'] * 1000:7.1f} ms "
+        f"({pane['lines_per_second']:,.0f} lines/s) with the output pane open, "
+        f"{pane['not_shown']} not shown"
+    )
+    per_event = results["live"]["per_event_us"]
+    if args.max_us is not None and per_event > args.max_us:
+        print(f"Render regression: {per_event:.1f} us/event > {args.max_us:.1f} us/event")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def time_to_menu(env: dict) -> float:
+    # The CLI draws the menu, reads "q" from stdin and exits, so wall time of
+    # the whole process is the time-to-menu plus a constant shutdown cost.
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-m", "pop_setup_cli"],
+        cwd=ROOT,
+        input="q\n",
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        text=True,
+        env=env,
+        check=True,
+    )
+    return (time.perf_counter() - start) * 1000
+
+
+def sample(runs: int, cold: bool) -> List[float]:
+    timings: List[float] = []
+    with tempfile.TemporaryDirectory() as cache_home:
+        env = {**os.environ, "XDG_CACHE_HOME": cache_home, "TERM": "dumb"}
+        if not cold:
+            time_to_menu(env)
+        for _ in range(runs):
+            if cold:
+                for cached in Path(cache_home).glob("pop_setup/configs.*"):
+                    cached.unlink()
+            timings.append(time_to_menu(env))
+    return timings
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure Pop Setup time-to-menu")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument(
+        "--max-ms",
+        type=float,
+        default=None,
+        help="Exit non-zero when the warm median exceeds this many milliseconds",
+    )
+    args = parser.parse_args()
+    results = {"cold": sample(args.runs, cold=True), "warm": sample(args.runs, cold=False)}
+    for label, timings in results.items():
+        print(
+            f"{label:>4}: median {statistics.median(timings):7.1f} ms  "
+            f"min {min(timings):7.1f} ms  max {max(timings):7.1f} ms"
+        )
+    warm_median = statistics.median(results["warm"])
+    if args.max_ms is not None and warm_median > args.max_ms:
+        print(f"Startup regression: warm median {warm_median:.1f} ms > {args.max_ms:.1f} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
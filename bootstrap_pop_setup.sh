@@ -30,7 +30,13 @@ fi
 # shellcheck disable=SC1091
 source "$VENV_DIR/bin/activate"
 
-pip install --upgrade pip
-pip install -r requirements.txt
+# Skip the pip round-trip on every launch unless requirements.txt changed.
+REQUIREMENTS_STAMP="$VENV_DIR/.requirements.sha256"
+requirements_hash="$(sha256sum requirements.txt | cut -d' ' -f1)"
+if [[ "$(cat "$REQUIREMENTS_STAMP" 2>/dev/null)" != "$requirements_hash" ]]; then
+  pip install --upgrade pip
+  pip install -r requirements.txt
+  echo "$requirements_hash" > "$REQUIREMENTS_STAMP"
+fi
 
-python -m pop_setup_cli
+exec python -m pop_setup_cli "$@"
@@ -1,5 +1,12 @@
 """Pop Setup CLI package."""
 
-from .app import main
-
 __all__ = ["main"]
+
+
+def __getattr__(name: str):
+    # Keep `python -m pop_setup_cli.download` from importing the whole UI.
+    if name == "main":
+        from .app import main
+
+        return main
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
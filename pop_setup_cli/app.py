@@ -1,16 +1,128 @@
 from __future__ import annotations
 
+import argparse
+import sys
 from pathlib import Path
+from typing import TYPE_CHECKING, Optional, Sequence
 
+from .check_cache import CheckCache
 from .config_loader import load_configs
-from .executor import Executor
-from . import ui
+from .durations import DurationHistory
+from .executor import DEFAULT_CHECK_JOBS, Executor
+from .headless import add_subcommands, run_command
+from .journal import RunJournal
 
+if TYPE_CHECKING:
+    from .ui import DisplayOptions
 
-def main() -> None:
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="pop_setup_cli", description="Pop Setup CLI")
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        help="Maximum number of install steps to run at the same time (default: 1)",
+    )
+    parser.add_argument(
+        "--check-jobs",
+        type=int,
+        default=DEFAULT_CHECK_JOBS,
+        help=f"Maximum number of check scripts to run at the same time (default: {DEFAULT_CHECK_JOBS})",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always run check scripts instead of reusing cached results",
+    )
+    parser.add_argument(
+        "--isolated-checks",
+        action="store_true",
+        help="Run every check script in its own bash instead of batching them in one shell",
+    )
+    parser.add_argument(
+        "--display",
+        choices=("auto", "live", "plain"),
+        default="auto",
+        help="Install progress display; auto uses plain lines over SSH or without a terminal",
+    )
+    parser.add_argument(
+        "--log-pane",
+        action="store_true",
+        help="Start installs with the live output pane open (toggle with 4)",
+    )
+    parser.add_argument(
+        "--longest-first",
+        action="store_true",
+        help="Start independent steps that took longest in earlier runs first (with --jobs > 1)",
+    )
+    parser.add_argument(
+        "--trace",
+        action="store_true",
+        help="Time every line of the install scripts (bash xtrace) and profile the CLI itself",
+    )
+    parser.add_argument(
+        "--report-json",
+        type=Path,
+        default=None,
+        help="Write per-step time, CPU and peak memory of each run to this JSON file",
+    )
+    parser.add_argument(
+        "--metrics-textfile",
+        type=Path,
+        default=None,
+        help="Write the same figures as a Prometheus textfile (for node_exporter)",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue the last interrupted install run before showing the menu",
+    )
+    add_subcommands(parser)
+    args = parser.parse_args(argv)
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if args.check_jobs < 1:
+        parser.error("--check-jobs must be at least 1")
+    return args
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = parse_args(argv)
     base_path = Path(__file__).resolve().parent.parent
     scripts, profiles = load_configs(base_path)
-    executor = Executor(scripts, profiles, base_path)
+    executor = Executor(
+        scripts,
+        profiles,
+        base_path,
+        jobs=args.jobs,
+        check_jobs=args.check_jobs,
+        check_cache=None if args.no_cache else CheckCache(),
+        journal=RunJournal(),
+        report_path=args.report_json,
+        metrics_textfile=args.metrics_textfile,
+        durations=DurationHistory(base_path=base_path),
+        longest_first=args.longest_first,
+        trace=args.trace,
+        batch_checks=not args.isolated_checks,
+    )
+    if args.command:
+        sys.exit(run_command(executor, args))
+    run_menu(executor, args)
+
+
+def run_menu(executor: Executor, args: argparse.Namespace) -> None:
+    # Imported here so headless commands never load Rich.
+    from . import ui
+
+    scripts, profiles = executor.scripts, executor.profiles
+    display = ui.DisplayOptions(
+        plain=ui.plain_output_wanted(args.display),
+        log_pane=args.log_pane,
+    )
+    if args.resume:
+        resume_last_run(executor, display)
 
     while True:
         choice = ui.prompt_main_menu()
@@ -33,7 +145,12 @@ def main() -> None:
                 heading = f"Install all ({profile.description or profile.id})"
                 scripts_to_run = profile.scripts
                 script_objects = [scripts[sid] for sid in scripts_to_run if sid in scripts]
-                with ui.install_progress(script_objects) as tracker:
+                with ui.install_progress(
+                    script_objects,
+                    display,
+                    estimates=executor.expected_durations(scripts_to_run),
+                    jobs=executor.jobs,
+                ) as tracker:
                     hook = tracker.hook if tracker else None
                     controller = tracker.controller if tracker else None
                     log_buffer = tracker.log_buffer if tracker else None
@@ -44,7 +161,12 @@ def main() -> None:
                         log_buffer=log_buffer,
                     )
                 ui.display_results(results, heading)
-                ui.print_run_summary(results)
+                ui.print_run_summary(
+                    results,
+                    executor.cache_stats,
+                    executor.download_stats,
+                    executor.trace_report,
+                )
                 ui.wait_for_enter()
             elif choice == "2":
                 ui.clear_screen()
@@ -61,7 +183,12 @@ def main() -> None:
                 ui.show_hardware_summary(hardware_state)
                 ui.show_status("Running selected scripts")
                 script_objects = [scripts[sid] for sid in selection if sid in scripts]
-                with ui.install_progress(script_objects) as tracker:
+                with ui.install_progress(
+                    script_objects,
+                    display,
+                    estimates=executor.expected_durations(selection),
+                    jobs=executor.jobs,
+                ) as tracker:
                     hook = tracker.hook if tracker else None
                     controller = tracker.controller if tracker else None
                     log_buffer = tracker.log_buffer if tracker else None
@@ -72,17 +199,26 @@ def main() -> None:
                         log_buffer=log_buffer,
                     )
                 ui.display_results(results, "Install selected")
-                ui.print_run_summary(results)
+                ui.print_run_summary(
+                    results,
+                    executor.cache_stats,
+                    executor.download_stats,
+                    executor.trace_report,
+                )
                 ui.wait_for_enter()
             elif choice == "3":
                 ui.clear_screen()
                 hardware_state = executor.refresh_hardware_state()
                 ui.show_hardware_summary(hardware_state)
                 ui.show_status("Gathering system status")
-                results = executor.run_all_checks()
+                with ui.check_progress(len(scripts)) as check_hook:
+                    results = executor.run_all_checks(result_hook=check_hook)
                 ui.display_results(results, "System status")
-                ui.print_check_summary(results)
+                ui.print_check_summary(results, executor.cache_stats)
                 ui.wait_for_enter()
+            elif choice == "4":
+                ui.clear_screen()
+                resume_last_run(executor, display)
             elif choice == "q":
                 ui.show_message("Goodbye.", "cyan")
                 break
@@ -94,5 +230,52 @@ def main() -> None:
             ui.wait_for_enter()
 
 
+def resume_last_run(executor: Executor, display: Optional[DisplayOptions] = None) -> None:
+    from . import ui
+
+    state = executor.resumable_run()
+    if not state:
+        ui.show_message("No interrupted run to resume.", "yellow")
+        ui.wait_for_enter()
+        return
+    hardware_state = executor.refresh_hardware_state()
+    ui.show_hardware_summary(hardware_state)
+    profile = executor.profiles.get(state.profile_id or "")
+    label = profile.description or profile.id if profile else "selected scripts"
+    ui.show_status(f"Resuming run: {label} ({len(state.remaining())} steps left)")
+    if state.dropped:
+        ui.show_message(
+            f"Skipping script(s) no longer in the catalog: {', '.join(state.dropped)}",
+            "yellow",
+        )
+    script_objects = [
+        executor.scripts[script_id]
+        for script_id in state.script_ids
+        if script_id in executor.scripts
+    ]
+    with ui.install_progress(
+        script_objects,
+        display,
+        estimates=executor.expected_durations(state.script_ids),
+        jobs=executor.jobs,
+    ) as tracker:
+        hook = tracker.hook if tracker else None
+        controller = tracker.controller if tracker else None
+        log_buffer = tracker.log_buffer if tracker else None
+        results = executor.resume_run(
+            progress_hook=hook,
+            controller=controller,
+            log_buffer=log_buffer,
+        )
+    ui.display_results(results, f"Resume ({label})")
+    ui.print_run_summary(
+        results,
+        executor.cache_stats,
+        executor.download_stats,
+        executor.trace_report,
+    )
+    ui.wait_for_enter()
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import argparse
+import fcntl
+import hashlib
+import os
+import subprocess
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Sequence
+
+from .packages import apt_get_command
+
+APT_LOCK_ENV = "POP_SETUP_APT_LOCK"
+APT_STATE_ENV = "POP_SETUP_APT_STATE"
+APT_LOCK_NAME = "apt.lock"
+APT_STATE_NAME = "apt-sources.sha256"
+SOURCES_PATHS = (Path("/etc/apt/sources.list"), Path("/etc/apt/sources.list.d"))
+
+
+def apt_env(run_log_dir: Path) -> Dict[str, str]:
+    return {
+        APT_LOCK_ENV: str(run_log_dir / APT_LOCK_NAME),
+        APT_STATE_ENV: str(run_log_dir / APT_STATE_NAME),
+    }
+
+
+@contextmanager
+def apt_locked(lock_path: Optional[Path]) -> Iterator[None]:
+    # One flock per run, shared by the executor and every step's apt-get.
+    # Waiters sleep in the kernel and wake as soon as the holder releases it,
+    # so nothing polls fuser; apt-get's own DPkg::Lock::Timeout covers
+    # holders outside the run.
+    if lock_path is None:
+        yield
+        return
+    try:
+        handle = open(lock_path, "a")
+    except OSError:
+        yield
+        return
+    with handle:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+
+def sources_digest(paths: Sequence[Path] = SOURCES_PATHS) -> str:
+    digest = hashlib.sha256()
+    for path in paths:
+        files = sorted(path.iterdir()) if path.is_dir() else [path]
+        for source in files:
+            digest.update(str(source).encode() + b"\0")
+            try:
+                digest.update(source.read_bytes())
+            except OSError:
+                digest.update(b"<missing>")
+            digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def refresh_needed(state_path: Optional[Path], digest: str) -> bool:
+    # The package lists are current if this run already refreshed them
+    # against exactly these sources.
+    if state_path is None:
+        return True
+    try:
+        return state_path.read_text(encoding="utf-8").strip() != digest
+    except OSError:
+        return True
+
+
+def record_refresh(state_path: Optional[Path], digest: str) -> None:
+    if state_path is None:
+        return
+    try:
+        tmp_path = state_path.with_name(f".{state_path.name}.tmp")
+        tmp_path.write_text(digest + "\n", encoding="utf-8")
+        os.replace(tmp_path, state_path)
+    except OSError:
+        pass
+
+
+def run_apt_get(
+    args: Sequence[str],
+    lock_path: Optional[Path] = None,
+    state_path: Optional[Path] = None,
+) -> int:
+    with apt_locked(lock_path):
+        if not args or args[0] != "update":
+            return subprocess.call(apt_get_command(args))
+        # Hashed before the refresh: a source added while apt-get update runs
+        # leaves the recorded digest stale, so the next update still happens.
+        digest = sources_digest()
+        if not refresh_needed(state_path, digest):
+            print(
+                "apt sources unchanged since the last refresh; skipping apt-get update",
+                flush=True,
+            )
+            return 0
+        code = subprocess.call(apt_get_command(args))
+        if code == 0:
+            record_refresh(state_path, digest)
+        return code
+
+
+def run_locked(command: Sequence[str], lock_path: Optional[Path] = None) -> int:
+    with apt_locked(lock_path):
+        return subprocess.call(list(command))
+
+
+def _env_path(name: str) -> Optional[Path]:
+    value = os.environ.get(name)
+    return Path(value) if value else None
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m pop_setup_cli.apt_lock",
+        description="Run apt-get under the Pop Setup run's apt lock",
+    )
+    parser.add_argument(
+        "--run",
+        action="store_true",
+        help="Run the arguments as a command (e.g. sudo dpkg -i FILE) instead of apt-get",
+    )
+    parser.add_argument("args", nargs=argparse.REMAINDER)
+    args = parser.parse_args(argv)
+    if not args.args:
+        parser.error("nothing to run")
+    try:
+        if args.run:
+            return run_locked(args.args, _env_path(APT_LOCK_ENV))
+        return run_apt_get(args.args, _env_path(APT_LOCK_ENV), _env_path(APT_STATE_ENV))
+    except OSError as exc:
+        print(exc, file=sys.stderr)
+        return 127
+
+
+if __name__ == "__main__":
+    sys.exit(main())
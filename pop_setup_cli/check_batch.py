@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import os
+import re
+import secrets
+import selectors
+import shlex
+import signal
+import subprocess
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from .metrics import ResourceUsage, reap
+
+_CPU_TIME = re.compile(r"(\d+)m(\d+[.,]\d+)s")
+
+# (exit code, stdout, stderr, usage) as returned by Executor._run_path.
+CheckOutput = Tuple[int, str, str, ResourceUsage]
+
+
+class CheckShell:
+    # One long-lived bash that runs check scripts back to back, each sourced
+    # in its own subshell, so a check costs a fork instead of a fork + exec of
+    # a fresh bash. Every check is followed by a sentinel line on stdout
+    # (with its exit code and the shell's cumulative child CPU times from
+    # `times`) and on stderr. run() returns None whenever the shell cannot
+    # vouch for a result, and the caller runs that check on its own.
+    def __init__(self, base_path: Path, env: Optional[Dict[str, str]] = None) -> None:
+        self.base_path = base_path
+        self.env = env
+        self.fallbacks = 0
+        self._process: Optional[subprocess.Popen] = None
+        self._sentinel = ""
+        self._cpu = (0.0, 0.0)
+
+    def run(self, relative_path: str, timeout: float) -> Optional[CheckOutput]:
+        path = (self.base_path / relative_path).resolve()
+        if path.suffix == ".py" or not path.exists():
+            return None
+        if self._process is None and not self._start():
+            return None
+        assert self._process is not None and self._process.stdin is not None
+        quoted = shlex.quote(str(path))
+        command = (
+            f"( BASH_ARGV0={quoted}; . {quoted} ) </dev/null; "
+            f"printf '\\n{self._sentinel} %d\\n' \"$?\"; times; "
+            f"printf '\\n{self._sentinel}\\n' >&2\n"
+        )
+        started = time.monotonic()
+        try:
+            self._process.stdin.write(command.encode())
+            self._process.stdin.flush()
+        except OSError:
+            return self._misbehaved()
+        outcome = self._collect(started + timeout)
+        elapsed = time.monotonic() - started
+        if outcome == "timeout":
+            # The hung check may have children of its own; the whole session
+            # goes, and the next check gets a fresh shell.
+            self.close()
+            return 124, "", f"Timed out after {timeout:g}s", ResourceUsage(elapsed)
+        if outcome is None:
+            return self._misbehaved()
+        code, stdout, stderr, cpu = outcome
+        user, system = (max(0.0, now - before) for now, before in zip(cpu, self._cpu))
+        self._cpu = cpu
+        return code, stdout, stderr, ResourceUsage(elapsed, user, system, 0)
+
+    def close(self) -> None:
+        process, self._process = self._process, None
+        if process is None:
+            return
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except OSError:
+            pass
+        for stream in (process.stdin, process.stdout, process.stderr):
+            if stream:
+                try:
+                    stream.close()
+                except OSError:
+                    pass
+        reap(process)
+
+    def _start(self) -> bool:
+        self._sentinel = f"__POP_SETUP_CHECK_{secrets.token_hex(8)}__"
+        self._cpu = (0.0, 0.0)
+        try:
+            self._process = subprocess.Popen(
+                ["bash", "--noprofile", "--norc", "-s"],
+                cwd=self.base_path,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                env={**os.environ, **self.env} if self.env else None,
+                start_new_session=True,
+            )
+        except OSError:
+            self._process = None
+            return False
+        for stream in (self._process.stdout, self._process.stderr):
+            os.set_blocking(stream.fileno(), False)
+        return True
+
+    def _misbehaved(self) -> None:
+        # Counted so callers can tell how often batching had to give up.
+        self.fallbacks += 1
+        self.close()
+        return None
+
+    def _collect(self, deadline: float):
+        assert self._process is not None
+        out_marker = f"\n{self._sentinel} ".encode()
+        err_marker = f"\n{self._sentinel}\n".encode()
+        buffers = {"out": b"", "err": b""}
+        done = {"out": False, "err": False}
+        parsed: Optional[Tuple[int, bytes, Tuple[float, float]]] = None
+        with selectors.DefaultSelector() as selector:
+            selector.register(self._process.stdout, selectors.EVENT_READ, "out")
+            selector.register(self._process.stderr, selectors.EVENT_READ, "err")
+            while not (done["out"] and done["err"]):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return "timeout"
+                for key, _ in selector.select(remaining):
+                    chunk = os.read(key.fd, 65536)
+                    if not chunk:
+                        # The shell exited (e.g. a check ran `exec` or killed
+                        # its parent); nothing it printed can be trusted.
+                        return None
+                    buffers[key.data] += chunk
+                if not done["out"]:
+                    parsed = self._parse_stdout(buffers["out"], out_marker)
+                    done["out"] = parsed is not None
+                if not done["err"]:
+                    done["err"] = buffers["err"].endswith(err_marker)
+        assert parsed is not None
+        code, stdout, cpu = parsed
+        stderr = buffers["err"][: -len(err_marker)]
+        return (
+            code,
+            stdout.decode("utf-8", errors="replace"),
+            stderr.decode("utf-8", errors="replace"),
+            cpu,
+        )
+
+    @staticmethod
+    def _parse_stdout(buffer: bytes, marker: bytes):
+        # <output>\n<sentinel> <code>\n<shell times>\n<children times>\n
+        index = buffer.rfind(marker)
+        if index < 0:
+            return None
+        trailer = buffer[index + len(marker) :].decode("utf-8", errors="replace")
+        lines = trailer.split("\n")
+        if len(lines) < 4:
+            return None
+        children = _CPU_TIME.findall(lines[2])
+        cpu = tuple(
+            int(minutes) * 60 + float(seconds.replace(",", "."))
+            for minutes, seconds in children[:2]
+        )
+        if len(cpu) != 2:
+            cpu = (0.0, 0.0)
+        return int(lines[0]), buffer[:index], cpu
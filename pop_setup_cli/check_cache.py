@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import asdict, dataclass, fields
+from pathlib import Path
+from typing import Dict, Optional
+
+from .hardware import HardwareState
+from .models import ExecutionResult
+
+DEFAULT_CACHE_TTL = 900.0
+ALWAYS_KEYED_ENV = ("HOME", "PATH", "USER")
+_ENV_REFERENCE = re.compile(r"\$\{?([A-Za-z_][A-Za-z0-9_]*)")
+_RESULT_FIELDS = {f.name for f in fields(ExecutionResult)}
+
+
+def default_cache_dir() -> Path:
+    root = os.environ.get("XDG_CACHE_HOME") or "~/.cache"
+    return Path(root).expanduser() / "pop_setup"
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+
+    def reset(self) -> None:
+        self.hits = 0
+        self.misses = 0
+
+
+class CheckCache:
+    def __init__(
+        self,
+        cache_dir: Optional[Path] = None,
+        ttl: float = DEFAULT_CACHE_TTL,
+    ) -> None:
+        self.path = (cache_dir or default_cache_dir()) / "checks.json"
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._entries: Dict[str, dict] = self._load()
+        self._dirty = False
+
+    def key_for(self, script_path: Path, state: HardwareState) -> Optional[str]:
+        try:
+            content = script_path.read_bytes()
+        except OSError:
+            return None
+        names = set(ALWAYS_KEYED_ENV)
+        names.update(_ENV_REFERENCE.findall(content.decode("utf-8", "replace")))
+        digest = hashlib.sha256(content)
+        for name in sorted(names):
+            digest.update(f"\0{name}={os.environ.get(name, '')}".encode())
+        digest.update(f"\0{state.cache_token()}".encode())
+        return digest.hexdigest()
+
+    def get(self, script_id: str, key: str) -> Optional[ExecutionResult]:
+        with self._lock:
+            entry = self._entries.get(script_id)
+            fresh = (
+                entry is not None
+                and entry.get("key") == key
+                and time.time() - entry.get("stored_at", 0) < entry.get("ttl", self.ttl)
+            )
+            result = self._result(entry) if fresh else None
+            if result is None:
+                self.stats.misses += 1
+                return None
+            self.stats.hits += 1
+            return result
+
+    def put(self, key: str, result: ExecutionResult) -> None:
+        with self._lock:
+            self._entries[result.script_id] = {
+                "key": key,
+                "stored_at": time.time(),
+                "ttl": self.ttl,
+                "result": asdict(result),
+            }
+            self._dirty = True
+
+    def invalidate(self, script_id: str) -> None:
+        with self._lock:
+            if self._entries.pop(script_id, None) is not None:
+                self._dirty = True
+
+    def flush(self) -> None:
+        # Entries are written once per sweep or run rather than on every put.
+        with self._lock:
+            if self._dirty:
+                self._save()
+                self._dirty = False
+
+    @staticmethod
+    def _result(entry: dict) -> Optional[ExecutionResult]:
+        # The file outlives upgrades; a result written by another version of
+        # ExecutionResult is a miss, not an error.
+        stored = entry.get("result")
+        if not isinstance(stored, dict):
+            return None
+        try:
+            return ExecutionResult(
+                **{key: value for key, value in stored.items() if key in _RESULT_FIELDS}
+            )
+        except TypeError:
+            return None
+
+    def _load(self) -> Dict[str, dict]:
+        try:
+            data = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _save(self) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(self._entries))
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
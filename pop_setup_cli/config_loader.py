@@ -1,18 +1,47 @@
 from __future__ import annotations
 
+import hashlib
+import pickle
+from dataclasses import fields
 from pathlib import Path
-from typing import Dict, Tuple
-
-import yaml
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
+from .check_cache import default_cache_dir
+from .hardware import HardwareRequirement
 from .models import Profile, Script
+from .system_checks import CheckSpec
+
+CONFIG_CACHE_VERSION = 3
+# Modules whose code decides what a config parses into.
+_PARSER_MODULES = ("config_loader.py", "models.py", "hardware.py", "system_checks.py")
+
+
+def _parser_digest() -> str:
+    digest = hashlib.sha256()
+    for name in _PARSER_MODULES:
+        try:
+            digest.update(Path(__file__).with_name(name).read_bytes())
+        except OSError:
+            digest.update(name.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+# Field lists and the parser source are part of the key, so neither a model
+# change nor new validation ever unpickles stale objects.
+_CACHE_SCHEMA = (
+    CONFIG_CACHE_VERSION,
+    tuple(f.name for f in fields(Script)),
+    tuple(f.name for f in fields(Profile)),
+    _parser_digest(),
+)
 
 
 def load_scripts_config(config_path: Path | str) -> Dict[str, Script]:
     path = Path(config_path)
     if not path.exists():
         raise FileNotFoundError(f"Scripts config not found: {path}")
-    data = yaml.safe_load(path.read_text()) or {}
+    data = _read_yaml(path)
     entries = data.get("scripts", [])
     scripts: Dict[str, Script] = {}
     for entry in entries:
@@ -22,21 +51,104 @@ def load_scripts_config(config_path: Path | str) -> Dict[str, Script]:
             description=str(entry.get("description", "")),
             script_path=str(entry["script"]),
             check_path=entry.get("check"),
-            hardware=[str(tag) for tag in entry.get("hardware", []) or []],
+            check_timeout=_optional_seconds(entry, "check_timeout"),
+            hardware=_hardware_requirements(entry),
+            depends_on=_unique_strings(entry.get("depends_on", [])),
+            resources=_unique_strings(entry.get("resources", [])),
+            apt_packages=_unique_strings(entry.get("apt_packages", [])),
+            flatpak_packages=_unique_strings(entry.get("flatpak_packages", [])),
+            checks=_declarative_checks(entry),
         )
         scripts[script.id] = script
     if not scripts:
         raise ValueError("No scripts defined in config")
+    _validate_dependencies(scripts)
     return scripts
 
 
+def _read_yaml(path: Path) -> dict:
+    import yaml
+
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    return yaml.load(path.read_text(), Loader=loader) or {}
+
+
+def _hardware_requirements(entry: dict) -> List[str]:
+    requirements = [str(tag) for tag in entry.get("hardware", []) or []]
+    for requirement in requirements:
+        try:
+            HardwareRequirement.parse(requirement)
+        except ValueError as exc:
+            raise ValueError(f"Script '{entry['id']}': {exc}") from None
+    return requirements
+
+
+def _declarative_checks(entry: dict) -> List[Dict[str, Any]]:
+    checks = entry.get("checks") or []
+    if not isinstance(checks, list):
+        raise ValueError(f"Script '{entry['id']}': checks must be a list")
+    for check in checks:
+        try:
+            CheckSpec.parse(check)
+        except ValueError as exc:
+            raise ValueError(f"Script '{entry['id']}': {exc}") from None
+    return checks
+
+
+def _optional_seconds(entry: dict, key: str) -> Optional[float]:
+    value = entry.get(key)
+    if value is None:
+        return None
+    seconds = float(value)
+    if seconds <= 0:
+        raise ValueError(f"Script '{entry['id']}' has non-positive {key}: {value}")
+    return seconds
+
+
+def _unique_strings(values) -> List[str]:
+    unique: List[str] = []
+    for value in values or []:
+        text = str(value)
+        if text not in unique:
+            unique.append(text)
+    return unique
+
+
+def _validate_dependencies(scripts: Dict[str, Script]) -> None:
+    for script in scripts.values():
+        for dependency in script.depends_on:
+            if dependency not in scripts:
+                raise ValueError(
+                    f"Script '{script.id}' depends on unknown script '{dependency}'"
+                )
+            if dependency == script.id:
+                raise ValueError(f"Script '{script.id}' depends on itself")
+    visiting: set = set()
+    done: set = set()
+
+    def visit(script_id: str, trail: List[str]) -> None:
+        if script_id in done:
+            return
+        if script_id in visiting:
+            cycle = " -> ".join(trail[trail.index(script_id):] + [script_id])
+            raise ValueError(f"Dependency cycle detected: {cycle}")
+        visiting.add(script_id)
+        for dependency in scripts[script_id].depends_on:
+            visit(dependency, trail + [script_id])
+        visiting.discard(script_id)
+        done.add(script_id)
+
+    for script_id in scripts:
+        visit(script_id, [])
+
+
 def load_profiles_config(
     scripts: Dict[str, Script], config_path: Path | str
 ) -> Dict[str, Profile]:
     path = Path(config_path)
     if not path.exists():
         raise FileNotFoundError(f"Profiles config not found: {path}")
-    data = yaml.safe_load(path.read_text()) or {}
+    data = _read_yaml(path)
     entries = data.get("profiles", {})
     profiles: Dict[str, Profile] = {}
     for profile_id, entry in entries.items():
@@ -56,7 +168,79 @@ def load_profiles_config(
     return profiles
 
 
-def load_configs(base_path: Path) -> Tuple[Dict[str, Script], Dict[str, Profile]]:
-    scripts = load_scripts_config(base_path / "configs" / "scripts.yml")
-    profiles = load_profiles_config(scripts, base_path / "configs" / "profiles.yml")
+def default_config_cache_path() -> Path:
+    return default_cache_dir() / "configs.pickle"
+
+
+def load_configs(
+    base_path: Path, cache_path: Optional[Path] = None
+) -> Tuple[Dict[str, Script], Dict[str, Profile]]:
+    scripts_path = base_path / "configs" / "scripts.yml"
+    profiles_path = base_path / "configs" / "profiles.yml"
+    cache_path = cache_path or default_config_cache_path()
+    cached = _load_compiled(cache_path, (scripts_path, profiles_path))
+    if cached:
+        return cached
+    scripts = load_scripts_config(scripts_path)
+    profiles = load_profiles_config(scripts, profiles_path)
+    _save_compiled(cache_path, (scripts_path, profiles_path), (scripts, profiles))
     return scripts, profiles
+
+
+def _file_fingerprint(path: Path, digest: Optional[str] = None) -> Tuple[str, int, int, str]:
+    stat = path.stat()
+    if digest is None:
+        digest = hashlib.sha256(path.read_bytes()).hexdigest()
+    return str(path.resolve()), stat.st_mtime_ns, stat.st_size, digest
+
+
+def _load_compiled(
+    cache_path: Path, config_paths: Sequence[Path]
+) -> Optional[Tuple[Dict[str, Script], Dict[str, Profile]]]:
+    try:
+        with cache_path.open("rb") as handle:
+            entry = pickle.load(handle)
+    except (OSError, EOFError, ValueError, pickle.UnpicklingError, AttributeError, ImportError):
+        return None
+    if (
+        not isinstance(entry, dict)
+        or entry.get("schema") != _CACHE_SCHEMA
+        or len(entry.get("files", ())) != len(config_paths)
+    ):
+        return None
+    refreshed = False
+    try:
+        for path, recorded in zip(config_paths, entry["files"]):
+            stat = path.stat()
+            if (str(path.resolve()), stat.st_mtime_ns, stat.st_size) == tuple(recorded[:3]):
+                continue
+            # Touched but unchanged files (git checkout, rsync) still hit.
+            if _file_fingerprint(path)[3] != recorded[3]:
+                return None
+            refreshed = True
+    except OSError:
+        return None
+    configs = entry.get("configs")
+    if refreshed:
+        _save_compiled(cache_path, config_paths, configs)
+    return configs
+
+
+def _save_compiled(
+    cache_path: Path,
+    config_paths: Sequence[Path],
+    configs: Tuple[Dict[str, Script], Dict[str, Profile]],
+) -> None:
+    try:
+        entry = {
+            "schema": _CACHE_SCHEMA,
+            "files": [_file_fingerprint(path) for path in config_paths],
+            "configs": configs,
+        }
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_suffix(".tmp")
+        with tmp_path.open("wb") as handle:
+            pickle.dump(entry, handle, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp_path.replace(cache_path)
+    except OSError:
+        pass
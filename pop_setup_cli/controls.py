@@ -1,13 +1,15 @@
 from __future__ import annotations
 
-import select
+import os
+import selectors
 import sys
 import threading
-from queue import SimpleQueue, Empty
 from typing import Optional, TYPE_CHECKING
 
 from rich.console import Console
 
+from .wakeup import WakeQueue, Wakeup
+
 if TYPE_CHECKING:
     from .ui import InstallProgress
 
@@ -15,7 +17,8 @@ if TYPE_CHECKING:
 class InstallController:
     def __init__(self, console: Console) -> None:
         self.console = console
-        self._actions: SimpleQueue[str] = SimpleQueue()
+        self._actions: WakeQueue[str] = WakeQueue()
+        self._stop_wakeup = Wakeup()
         self._stop_event = threading.Event()
         self._thread: Optional[threading.Thread] = None
         self._tracker: Optional["InstallProgress"] = None
@@ -24,51 +27,75 @@ class InstallController:
         if self._thread and self._thread.is_alive():
             return
         self._stop_event.clear()
+        self._stop_wakeup.clear()
         self._thread = threading.Thread(target=self._prompt_loop, daemon=True)
         self._thread.start()
 
     def stop(self) -> None:
         self._stop_event.set()
+        self._stop_wakeup.set()
         if self._thread and self._thread.is_alive():
             self._thread.join(timeout=0.2)
 
+    def close(self) -> None:
+        self.stop()
+        if self._thread and self._thread.is_alive():
+            return
+        self._actions.close()
+        self._stop_wakeup.close()
+
     def set_tracker(self, tracker: "InstallProgress") -> None:
         self._tracker = tracker
 
+    def fileno(self) -> int:
+        return self._actions.fileno()
+
     def consume_action(self) -> Optional[str]:
-        try:
-            return self._actions.get_nowait()
-        except Empty:
-            return None
+        return self._actions.get_nowait()
 
     def _enqueue_action(self, action: str) -> None:
         self._actions.put(action)
 
     def _prompt_loop(self) -> None:
-        while not self._stop_event.is_set():
-            ready, _, _ = select.select([sys.stdin], [], [], 0.2)
-            if self._stop_event.is_set():
-                break
-            if not ready:
-                continue
-            line = sys.stdin.readline()
-            if line == "":
-                return
-            action = self._parse_action(line.strip().lower())
-            if not action:
-                continue
-            if action == "status":
-                tracker = self._tracker
-                if tracker:
-                    tracker.show_log_view()
-                continue
-            if action == "skip":
-                self.console.print(
-                    "[yellow]Skip requested. Attempting to skip current script...[/yellow]"
-                )
-            elif action == "cancel":
-                self.console.print("[red]Cancel requested. Stopping as soon as possible.[/red]")
-            self._enqueue_action(action)
+        stdin_fd = sys.stdin.fileno()
+        pending = b""
+        with selectors.DefaultSelector() as selector:
+            selector.register(stdin_fd, selectors.EVENT_READ)
+            selector.register(self._stop_wakeup, selectors.EVENT_READ)
+            while not self._stop_event.is_set():
+                selector.select()
+                if self._stop_event.is_set():
+                    break
+                # Read the fd directly so no complete line is left in a buffer
+                # the selector cannot see.
+                chunk = os.read(stdin_fd, 1024)
+                if not chunk:
+                    return
+                *lines, pending = (pending + chunk).split(b"\n")
+                for line in lines:
+                    self._handle_line(line.decode(errors="replace"))
+
+    def _handle_line(self, line: str) -> None:
+        action = self._parse_action(line.strip().lower())
+        if not action:
+            return
+        if action == "status":
+            tracker = self._tracker
+            if tracker:
+                tracker.show_log_view()
+            return
+        if action == "output":
+            tracker = self._tracker
+            if tracker:
+                tracker.toggle_log_pane()
+            return
+        if action == "skip":
+            self.console.print(
+                "[yellow]Skip requested. Attempting to skip current script...[/yellow]"
+            )
+        elif action == "cancel":
+            self.console.print("[red]Cancel requested. Stopping as soon as possible.[/red]")
+        self._enqueue_action(action)
 
     @staticmethod
     def _parse_action(value: str) -> Optional[str]:
@@ -78,4 +105,6 @@ class InstallController:
             return "skip"
         if value in {"3", "c", "cancel"}:
             return "cancel"
+        if value in {"4", "o", "output"}:
+            return "output"
         return None
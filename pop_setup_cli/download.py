@@ -0,0 +1,424 @@
+from __future__ import annotations
+
+import argparse
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+CHUNK_BYTES = 1 << 20
+MIN_SEGMENT_BYTES = 8 << 20
+REQUEST_TIMEOUT = 60
+USER_AGENT = "pop-setup"
+CACHE_ENV = "POP_SETUP_DOWNLOAD_CACHE"
+PYTHON_ENV = "POP_SETUP_PYTHON"
+SEGMENTS_ENV = "POP_SETUP_DOWNLOAD_SEGMENTS"
+STATS_ENV = "POP_SETUP_DOWNLOAD_STATS"
+
+
+class DownloadError(Exception):
+    pass
+
+
+def default_download_cache() -> Path:
+    override = os.environ.get(CACHE_ENV)
+    if override:
+        return Path(override).expanduser()
+    root = os.environ.get("XDG_CACHE_HOME") or "~/.cache"
+    return Path(root).expanduser() / "pop_setup" / "downloads"
+
+
+@dataclass
+class DownloadStats:
+    hits: int = 0
+    misses: int = 0
+    bytes_downloaded: int = 0
+    bytes_from_cache: int = 0
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["DownloadStats"]:
+        try:
+            lines = path.read_text(encoding="utf-8").splitlines()
+        except OSError:
+            return None
+        stats = cls()
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry.get("cached"):
+                stats.hits += 1
+                stats.bytes_from_cache += int(entry.get("size", 0))
+            else:
+                stats.misses += 1
+            stats.bytes_downloaded += int(entry.get("downloaded_bytes", 0))
+        return stats
+
+
+@dataclass
+class DownloadResult:
+    url: str
+    path: str
+    sha256: str
+    size: int
+    cached: bool
+    downloaded_bytes: int
+
+
+@dataclass
+class RemoteInfo:
+    size: Optional[int] = None
+    etag: str = ""
+    last_modified: str = ""
+    ranges: bool = False
+    reachable: bool = False
+
+    @classmethod
+    def from_headers(cls, headers) -> "RemoteInfo":
+        length = headers.get("Content-Length")
+        return cls(
+            size=int(length) if length and length.isdigit() else None,
+            etag=headers.get("ETag", ""),
+            last_modified=headers.get("Last-Modified", ""),
+            ranges=headers.get("Accept-Ranges", "").lower() == "bytes",
+            reachable=True,
+        )
+
+    def validators(self) -> Dict[str, object]:
+        return {"size": self.size, "etag": self.etag, "last_modified": self.last_modified}
+
+    def if_range(self) -> str:
+        # If-Range needs a strong ETag; a date is the fallback validator.
+        if self.etag and not self.etag.startswith("W/"):
+            return self.etag
+        return self.last_modified
+
+
+class DownloadCache:
+    def __init__(self, root: Optional[Path] = None) -> None:
+        self.root = root or default_download_cache()
+        self.objects = self.root / "sha256"
+        self.partials = self.root / "partial"
+        self.index_path = self.root / "index.json"
+
+    def object_path(self, digest: str) -> Path:
+        return self.objects / digest[:2] / digest
+
+    def partial_path(self, url: str) -> Path:
+        self.partials.mkdir(parents=True, exist_ok=True)
+        return self.partials / hashlib.sha256(url.encode()).hexdigest()
+
+    def lookup(self, url: str, sha256: Optional[str], remote: RemoteInfo) -> Optional[Path]:
+        if sha256:
+            path = self.object_path(sha256)
+            return path if path.exists() else None
+        with self._locked():
+            entry = self._read_index().get(url)
+        if not entry:
+            return None
+        path = self.object_path(entry["sha256"])
+        if not path.exists():
+            return None
+        # Without a pinned digest, trust the cached copy only while the server
+        # still reports the same validators (or cannot be reached at all).
+        if remote.reachable and entry.get("validators") != remote.validators():
+            return None
+        return path
+
+    def store(self, url: str, part: Path, digest: str, remote: RemoteInfo) -> Path:
+        target = self.object_path(digest)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(part, target)
+        target.chmod(0o444)
+        with self._locked():
+            index = self._read_index()
+            index[url] = {"sha256": digest, "validators": remote.validators()}
+            tmp_path = self.index_path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(index, indent=2))
+            os.replace(tmp_path, self.index_path)
+        return target
+
+    def _read_index(self) -> Dict[str, dict]:
+        try:
+            data = json.loads(self.index_path.read_text())
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    @contextmanager
+    def _locked(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        with (self.root / "index.lock").open("a") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def fetch(
+    url: str,
+    dest: Path,
+    sha256: Optional[str] = None,
+    segments: int = 1,
+    cache: Optional[DownloadCache] = None,
+) -> DownloadResult:
+    cache = cache or DownloadCache()
+    expected = sha256.lower() if sha256 else None
+    remote = probe(url)
+    cached = cache.lookup(url, expected, remote)
+    if cached:
+        _place(cached, dest)
+        return DownloadResult(
+            url=url,
+            path=str(dest),
+            sha256=cached.name,
+            size=cached.stat().st_size,
+            cached=True,
+            downloaded_bytes=0,
+        )
+    part = cache.partial_path(url)
+    if segments > 1 and remote.ranges and (remote.size or 0) >= 2 * MIN_SEGMENT_BYTES:
+        downloaded = _download_segmented(url, part, remote, segments)
+    else:
+        downloaded = _download_stream(url, part, remote)
+    _validators_path(part).unlink(missing_ok=True)
+    digest = _sha256_file(part)
+    if expected and digest != expected:
+        part.unlink(missing_ok=True)
+        raise DownloadError(f"SHA-256 mismatch for {url}: expected {expected}, got {digest}")
+    stored = cache.store(url, part, digest, remote)
+    _place(stored, dest)
+    return DownloadResult(
+        url=url,
+        path=str(dest),
+        sha256=digest,
+        size=stored.stat().st_size,
+        cached=False,
+        downloaded_bytes=downloaded,
+    )
+
+
+def probe(url: str) -> RemoteInfo:
+    import urllib.error
+    import urllib.request
+
+    request = urllib.request.Request(url, method="HEAD", headers={"User-Agent": USER_AGENT})
+    try:
+        with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT) as response:
+            return RemoteInfo.from_headers(response.headers)
+    except (urllib.error.URLError, OSError, ValueError):
+        return RemoteInfo()
+
+
+def _open_range(url: str, start: int, end: Optional[int] = None, if_range: str = ""):
+    import urllib.error
+    import urllib.request
+
+    headers = {"User-Agent": USER_AGENT}
+    if start or end is not None:
+        headers["Range"] = f"bytes={start}-{'' if end is None else end}"
+        if if_range:
+            # The server answers 200 with the whole new object if it changed.
+            headers["If-Range"] = if_range
+    request = urllib.request.Request(url, headers=headers)
+    try:
+        return urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT)
+    except (urllib.error.URLError, OSError) as exc:
+        raise DownloadError(f"Download failed for {url}: {exc}") from exc
+
+
+def _download_stream(url: str, part: Path, remote: RemoteInfo) -> int:
+    # A partial file is resumed only if it was started against the object the
+    # server reports now; otherwise old and new bytes would be spliced.
+    validators_path = _validators_path(part)
+    size = remote.size
+    offset = part.stat().st_size if part.exists() else 0
+    if offset and (
+        not remote.if_range() or _load_validators(validators_path) != remote.validators()
+    ):
+        offset = 0
+    if size is not None and offset == size:
+        return 0
+    if size is not None and offset > size:
+        offset = 0
+    if not offset:
+        _write_json_atomic(validators_path, remote.validators())
+    written = 0
+    with _open_range(url, offset, if_range=remote.if_range()) as response:
+        if offset and response.status != 206:
+            # A different object (or no range support): start over, and
+            # remember the validators of what is being written now.
+            offset = 0
+            fresh = RemoteInfo.from_headers(response.headers)
+            _write_json_atomic(validators_path, fresh.validators())
+        with part.open("ab" if offset else "wb") as handle:
+            while True:
+                chunk = response.read(CHUNK_BYTES)
+                if not chunk:
+                    break
+                handle.write(chunk)
+                written += len(chunk)
+    return written
+
+
+def _download_segmented(url: str, part: Path, remote: RemoteInfo, segments: int) -> int:
+    state_path = part.with_name(part.name + ".segments")
+    size = remote.size or 0
+    if_range = remote.if_range()
+    ranges = _load_segments(state_path, remote) if part.exists() and if_range else None
+    if ranges is None:
+        step = -(-size // segments)
+        ranges = [[start, min(start + step, size) - 1, 0] for start in range(0, size, step)]
+        with part.open("wb") as handle:
+            handle.truncate(size)
+    lock = threading.Lock()
+    errors: List[Exception] = []
+    written = [0]
+    changed = [False]
+
+    def save_state() -> None:
+        _write_json_atomic(
+            state_path, {"size": size, "validators": remote.validators(), "ranges": ranges}
+        )
+
+    def worker(segment: List[int]) -> None:
+        start, end, _ = segment
+        if start + segment[2] > end:
+            return
+        try:
+            fd = os.open(part, os.O_WRONLY)
+            try:
+                with _open_range(url, start + segment[2], end, if_range) as response:
+                    if response.status != 206:
+                        # With If-Range, a 200 means the object changed.
+                        changed[0] = True
+                        raise DownloadError(
+                            f"{url} changed on the server or ignored the range request"
+                        )
+                    while True:
+                        chunk = response.read(CHUNK_BYTES)
+                        if not chunk:
+                            break
+                        os.pwrite(fd, chunk, start + segment[2])
+                        with lock:
+                            segment[2] += len(chunk)
+                            written[0] += len(chunk)
+                            save_state()
+            finally:
+                os.close(fd)
+        except Exception as exc:
+            with lock:
+                errors.append(exc)
+
+    save_state()
+    threads = [threading.Thread(target=worker, args=(segment,)) for segment in ranges]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if changed[0]:
+        # None of the partial can be trusted; the next attempt starts over.
+        state_path.unlink(missing_ok=True)
+        part.unlink(missing_ok=True)
+    if errors:
+        raise DownloadError(str(errors[0]))
+    if any(start + done <= end for start, end, done in ranges):
+        raise DownloadError(f"Incomplete download for {url}")
+    state_path.unlink(missing_ok=True)
+    return written[0]
+
+
+def _load_segments(state_path: Path, remote: RemoteInfo) -> Optional[List[List[int]]]:
+    try:
+        state = json.loads(state_path.read_text())
+    except (OSError, ValueError):
+        return None
+    if state.get("size") != remote.size or state.get("validators") != remote.validators():
+        return None
+    return [list(map(int, segment)) for segment in state.get("ranges", [])]
+
+
+def _validators_path(part: Path) -> Path:
+    return part.with_name(part.name + ".validators")
+
+
+def _load_validators(path: Path) -> Optional[Dict[str, object]]:
+    try:
+        data = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _write_json_atomic(path: Path, data: object) -> None:
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(json.dumps(data))
+    os.replace(tmp_path, path)
+
+
+def _sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _place(source: Path, dest: Path) -> None:
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    if dest.exists() or dest.is_symlink():
+        dest.unlink()
+    try:
+        os.link(source, dest)
+    except OSError:
+        shutil.copyfile(source, dest)
+
+
+def _record_stats(result: DownloadResult) -> None:
+    stats_path = os.environ.get(STATS_ENV)
+    if not stats_path:
+        return
+    try:
+        with open(stats_path, "a", encoding="utf-8") as handle:
+            handle.write(json.dumps(asdict(result)) + "\n")
+    except OSError:
+        pass
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m pop_setup_cli.download",
+        description="Download a file through the Pop Setup artifact cache",
+    )
+    parser.add_argument("url")
+    parser.add_argument("-o", "--output", required=True, type=Path)
+    parser.add_argument("--sha256", default="", help="Expected SHA-256 digest")
+    parser.add_argument(
+        "--segments",
+        type=int,
+        default=int(os.environ.get(SEGMENTS_ENV, "1") or 1),
+        help="Parallel ranged segments for large files (default: 1)",
+    )
+    args = parser.parse_args(argv)
+    try:
+        result = fetch(args.url, args.output, args.sha256 or None, max(1, args.segments))
+    except (DownloadError, OSError) as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    _record_stats(result)
+    source = "cache" if result.cached else "network"
+    print(f"{args.output}: {result.size} bytes from {source} (sha256 {result.sha256})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import statistics
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from .journal import default_journal_path
+from .models import Script
+
+DEFAULT_STEP_SECONDS = 30.0
+# Weight of the newest run in the moving average; about the last five runs
+# dominate, so a faster mirror or a new machine shows up quickly.
+SMOOTHING = 0.3
+
+
+def default_history_path() -> Path:
+    return default_journal_path().with_name("durations.json")
+
+
+class DurationHistory:
+    # Exponentially weighted mean of how long each step's check + install
+    # took, keyed by script id and the hash of its script files. Runs where
+    # the check found the step already done are averaged separately: they
+    # take a fraction of an install, and a step that is installed usually
+    # stays that way, so its estimate follows whichever kind of run came last.
+    def __init__(self, path: Optional[Path] = None, base_path: Optional[Path] = None) -> None:
+        self.path = path or default_history_path()
+        self.base_path = base_path or Path.cwd()
+        self._lock = threading.Lock()
+        self._entries: Dict[str, dict] = self._load()
+        self._dirty = False
+
+    def content_hash(self, script: Script) -> str:
+        digest = hashlib.sha256()
+        for relative in (script.script_path, script.check_path):
+            if not relative:
+                continue
+            try:
+                digest.update((self.base_path / relative).read_bytes())
+            except OSError:
+                digest.update(relative.encode())
+            digest.update(b"\0")
+        return digest.hexdigest()[:16]
+
+    def known(self, script: Script) -> Optional[float]:
+        entry = self._entries.get(script.id)
+        if not entry:
+            return None
+        order = ("check_mean", "mean") if entry.get("last") == "check" else ("mean", "check_mean")
+        value = next((entry[key] for key in order if entry.get(key) is not None), None)
+        return float(value) if value is not None else None
+
+    def expected(self, scripts: Sequence[Script]) -> Dict[str, float]:
+        known = {script.id: self.known(script) for script in scripts}
+        # Steps that never ran are assumed to be typical installs for this
+        # catalog.
+        means = [
+            float(entry["mean"])
+            for entry in (self._entries.get(script.id) for script in scripts)
+            if entry and entry.get("mean") is not None
+        ]
+        fallback = statistics.median(means) if means else DEFAULT_STEP_SECONDS
+        return {
+            script_id: value if value is not None else fallback
+            for script_id, value in known.items()
+        }
+
+    def record(self, script: Script, seconds: float, check_only: bool = False) -> None:
+        content = self.content_hash(script)
+        mean_key, runs_key = ("check_mean", "check_runs") if check_only else ("mean", "runs")
+        with self._lock:
+            entry = self._entries.get(script.id)
+            if not entry or entry.get("hash") != content:
+                entry = {"hash": content}
+            if entry.get(mean_key) is None:
+                entry[mean_key], entry[runs_key] = seconds, 1
+            else:
+                entry[mean_key] += (seconds - entry[mean_key]) * SMOOTHING
+                entry[runs_key] += 1
+            entry[mean_key] = round(entry[mean_key], 3)
+            entry["last"] = "check" if check_only else "install"
+            self._entries[script.id] = entry
+            self._dirty = True
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = self.path.with_name(f".{self.path.name}.tmp")
+                tmp_path.write_text(json.dumps(self._entries, sort_keys=True), encoding="utf-8")
+                os.replace(tmp_path, self.path)
+                self._dirty = False
+            except OSError:
+                pass
+
+    def _load(self) -> Dict[str, dict]:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+
+def longest_first(scripts: Sequence[Script], expected: Dict[str, float]) -> List[Script]:
+    # Orders by the longest chain of expected seconds a step still has in
+    # front of it (itself plus its slowest dependent path), so long steps and
+    # the steps that unlock them start while the short ones fill idle slots.
+    # Dependencies are still honoured by the scheduler.
+    ids = {script.id for script in scripts}
+    dependents: Dict[str, List[str]] = {script.id: [] for script in scripts}
+    for script in scripts:
+        for dependency in script.depends_on:
+            if dependency in ids:
+                dependents[dependency].append(script.id)
+    chain: Dict[str, float] = {}
+
+    def length(script_id: str, seen: frozenset = frozenset()) -> float:
+        if script_id in chain:
+            return chain[script_id]
+        if script_id in seen:
+            return 0.0
+        tail = max(
+            (length(child, seen | {script_id}) for child in dependents[script_id]),
+            default=0.0,
+        )
+        chain[script_id] = expected.get(script_id, DEFAULT_STEP_SECONDS) + tail
+        return chain[script_id]
+
+    order = {script.id: index for index, script in enumerate(scripts)}
+    return sorted(scripts, key=lambda script: (-length(script.id), order[script.id]))
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+from .check_cache import default_cache_dir
+from .hardware import USB_MOUNT_ENV
+from .usb_sync import format_bytes
+
+CACHE_ENV = "POP_SETUP_ENV_CACHE"
+CACHE_KEY_VERSION = 1
+STAMP_NAME = ".pop_setup_env_key"
+EXIT_MISS = 3
+
+
+def cache_dirs() -> List[Path]:
+    # Restores look in every directory in order; saves go to the first one and
+    # are copied to the USB cache when that directory already exists.
+    override = os.environ.get(CACHE_ENV)
+    dirs = [Path(override).expanduser()] if override else [default_cache_dir() / "envs"]
+    usb_mount = os.environ.get(USB_MOUNT_ENV)
+    if usb_mount:
+        dirs.append(Path(usb_mount) / "pop_setup" / "envs")
+    return dirs
+
+
+def compute_key(kind: str, lockfile: Path, extras: Sequence[str] = ()) -> str:
+    digest = hashlib.sha256()
+    digest.update(f"v{CACHE_KEY_VERSION}\0{kind}\0{platform.machine()}\0".encode())
+    for extra in extras:
+        digest.update(f"{extra}\0".encode())
+    digest.update(lockfile.read_bytes())
+    return f"{kind}-{digest.hexdigest()[:32]}"
+
+
+def _compressor() -> Tuple[str, str]:
+    if shutil.which("zstd"):
+        return "zstd -T0", ".tar.zst"
+    return "gzip", ".tar.gz"
+
+
+def find_archive(key: str, dirs: Optional[Sequence[Path]] = None) -> Optional[Path]:
+    for directory in dirs or cache_dirs():
+        for suffix in (".tar.zst", ".tar.gz"):
+            candidate = directory / f"{key}{suffix}"
+            if candidate.is_file():
+                return candidate
+    return None
+
+
+def read_stamp(target: Path) -> str:
+    try:
+        return (target / STAMP_NAME).read_text(encoding="utf-8").strip()
+    except OSError:
+        return ""
+
+
+def restore(key: str, target: Path, dirs: Optional[Sequence[Path]] = None) -> Optional[str]:
+    if read_stamp(target) == key:
+        return f"{target} already matches {key}"
+    archive = find_archive(key, dirs)
+    if archive is None:
+        return None
+    if archive.suffix == ".zst" and not shutil.which("zstd"):
+        return None
+    started = time.monotonic()
+    staging = target.with_name(f".{target.name}.pop_setup_restore")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+    program = "zstd" if archive.suffix == ".zst" else "gzip"
+    # tar decompresses while it reads, so the archive streams straight from the
+    # USB drive without a local copy first.
+    try:
+        subprocess.run(
+            ["tar", f"--use-compress-program={program}", "-xf", str(archive), "-C", str(staging)],
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    if target.exists():
+        previous = target.with_name(f".{target.name}.pop_setup_old")
+        shutil.rmtree(previous, ignore_errors=True)
+        os.replace(target, previous)
+        os.replace(staging, target)
+        shutil.rmtree(previous, ignore_errors=True)
+    else:
+        os.replace(staging, target)
+    return (
+        f"Restored {target} from {archive} "
+        f"({format_bytes(archive.stat().st_size)}) in {time.monotonic() - started:.1f}s"
+    )
+
+
+def save(key: str, target: Path, dirs: Optional[Sequence[Path]] = None) -> Path:
+    dirs = list(dirs or cache_dirs())
+    local_dir = dirs[0]
+    local_dir.mkdir(parents=True, exist_ok=True)
+    (target / STAMP_NAME).write_text(f"{key}\n", encoding="utf-8")
+    program, suffix = _compressor()
+    archive = local_dir / f"{key}{suffix}"
+    tmp_path = archive.with_name(f".{archive.name}.tmp")
+    try:
+        subprocess.run(
+            ["tar", f"--use-compress-program={program}", "-cf", str(tmp_path), "-C", str(target), "."],
+            check=True,
+        )
+        os.replace(tmp_path, archive)
+    except (OSError, subprocess.CalledProcessError):
+        tmp_path.unlink(missing_ok=True)
+        raise
+    for mirror in dirs[1:]:
+        if mirror.is_dir() and os.access(mirror, os.W_OK):
+            mirror_tmp = mirror / tmp_path.name
+            try:
+                shutil.copyfile(archive, mirror_tmp)
+                os.replace(mirror_tmp, mirror / archive.name)
+            except OSError as exc:
+                mirror_tmp.unlink(missing_ok=True)
+                print(f"Unable to copy {archive.name} to {mirror}: {exc}", file=sys.stderr)
+    return archive
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m pop_setup_cli.env_cache",
+        description="Restore or store packed project environments keyed by lockfile hash",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    key_parser = commands.add_parser("key", help="Print the cache key for a lockfile")
+    key_parser.add_argument("--kind", required=True, help="Environment kind, e.g. npm or conda")
+    key_parser.add_argument("--lockfile", type=Path, required=True)
+    key_parser.add_argument(
+        "--extra",
+        action="append",
+        default=[],
+        help="Additional key input, e.g. the node version or the env prefix",
+    )
+    for name, help_text in (
+        ("restore", f"Unpack a cached environment (exit {EXIT_MISS} on a miss)"),
+        ("save", "Pack an environment into the cache"),
+    ):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("--key", required=True)
+        command.add_argument("--target", type=Path, required=True)
+    args = parser.parse_args(argv)
+    try:
+        if args.command == "key":
+            print(compute_key(args.kind, args.lockfile, args.extra))
+            return 0
+        if args.command == "restore":
+            message = restore(args.key, args.target)
+            if message is None:
+                print(f"No cached environment for {args.key}")
+                return EXIT_MISS
+            print(message)
+            return 0
+        archive = save(args.key, args.target)
+        print(f"Cached {args.target} as {archive} ({format_bytes(archive.stat().st_size)})")
+        return 0
+    except (OSError, subprocess.CalledProcessError) as exc:
+        print(f"Environment cache {args.command} failed: {exc}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
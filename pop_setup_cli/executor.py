@@ -1,16 +1,78 @@
 from __future__ import annotations
 
+import cProfile
+import os
+import pstats
+import queue
+import selectors
+import signal
 import subprocess
+import sys
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import replace
 from pathlib import Path
-from typing import Callable, Dict, List, Optional, Sequence, Protocol, Tuple
+from typing import Callable, Dict, List, Optional, Sequence, Set, Protocol, Tuple
 
-from .hardware import HardwareDetector, HardwareState
+from .apt_lock import (
+    APT_LOCK_NAME,
+    APT_STATE_NAME,
+    apt_env,
+    apt_locked,
+    record_refresh,
+    refresh_needed,
+    sources_digest,
+)
+from .check_batch import CheckShell
+from .check_cache import CacheStats, CheckCache
+from .download import PYTHON_ENV, STATS_ENV, DownloadStats
+from .durations import DurationHistory, longest_first
+from .hardware import HardwareDetector, HardwareState, unmet_requirement
+from .journal import JournalState, RunJournal
 from .log_buffer import LogBuffer
+from .metrics import ResourceUsage, reap, reap_within, write_reports
 from .models import ExecutionResult, Profile, Script
+from .output_capture import OutputCapture, default_log_root, new_run_log_dir
+from .packages import (
+    READY_ENV,
+    PackagePlan,
+    apt_available,
+    apt_install_command,
+    apt_update_command,
+    flatpak_available,
+    flatpak_install_command,
+    flatpak_remote_command,
+    installed_apt_packages,
+    installed_flatpak_apps,
+)
+from .system_checks import SystemIndex, evaluate_checks
+from .trace import TRACE_SUFFIX, bash_command, mark_end, write_run_report
+from .usb_sync import PROGRESS_FD_ENV
+from .wakeup import ProcessExit, WakeQueue
 
 ProgressHook = Callable[[str, int, int, Script, Optional[str]], None]
+CheckHook = Callable[[ExecutionResult, int, int], None]
+ResultHook = Callable[[ExecutionResult], None]
+ProgressCallback = Callable[[str], None]
+
+DEFAULT_CHECK_JOBS = 8
+DEFAULT_CHECK_TIMEOUT = 30.0
+TERMINATE_GRACE_SECONDS = 5.0
+OUTPUT_DRAIN_SECONDS = 2.0
+OUTPUT_CHUNK_BYTES = 65536
+# Used only for controllers that cannot expose a file descriptor to wait on.
+CONTROL_POLL_INTERVAL = 0.2
+# Scripts run in a process group of their own so a skip, cancel or timeout
+# reaches everything they started. The group stays in our session: sudo ties
+# its cached credentials to the terminal session.
+_OWN_PROCESS_GROUP: Dict[str, object] = (
+    {"process_group": 0} if sys.version_info >= (3, 11) else {"start_new_session": True}
+)
+
+# Resource tags not listed here are exclusive: one step holding them at a time.
+DEFAULT_RESOURCE_LIMITS: Dict[str, int] = {"network": 3}
+BLOCKING_STATUSES = {"FAIL", "CANCEL"}
 
 
 class InstallControl(Protocol):
@@ -18,6 +80,23 @@ class InstallControl(Protocol):
         ...
 
 
+class _StepControl:
+    def __init__(self) -> None:
+        self._actions: WakeQueue[str] = WakeQueue()
+
+    def request(self, action: str) -> None:
+        self._actions.put(action)
+
+    def fileno(self) -> int:
+        return self._actions.fileno()
+
+    def consume_action(self) -> Optional[str]:
+        return self._actions.get_nowait()
+
+    def close(self) -> None:
+        self._actions.close()
+
+
 class Executor:
     def __init__(
         self,
@@ -25,12 +104,43 @@ class Executor:
         profiles: Dict[str, Profile],
         base_path: Path,
         hardware_detector: Optional[HardwareDetector] = None,
+        jobs: int = 1,
+        resource_limits: Optional[Dict[str, int]] = None,
+        check_jobs: int = DEFAULT_CHECK_JOBS,
+        check_cache: Optional[CheckCache] = None,
+        log_root: Optional[Path] = None,
+        journal: Optional[RunJournal] = None,
+        report_path: Optional[Path] = None,
+        metrics_textfile: Optional[Path] = None,
+        durations: Optional[DurationHistory] = None,
+        longest_first: bool = False,
+        trace: bool = False,
+        batch_checks: bool = True,
     ) -> None:
         self.scripts = scripts
         self.profiles = profiles
         self.base_path = base_path
         self.hardware_detector = hardware_detector or HardwareDetector()
+        self.jobs = max(1, jobs)
+        self.check_jobs = max(1, check_jobs)
+        self.check_cache = check_cache
+        self.log_root = log_root or default_log_root()
+        self.journal = journal
+        self.report_path = report_path
+        self.metrics_textfile = metrics_textfile
+        self.durations = durations
+        self.longest_first = longest_first
+        self.trace = trace
+        self.batch_checks = batch_checks
+        self.trace_report: Optional[Path] = None
+        self._profiles: List[cProfile.Profile] = []
+        self._profiles_lock = threading.Lock()
+        self.resource_limits = dict(DEFAULT_RESOURCE_LIMITS)
+        if resource_limits:
+            self.resource_limits.update(resource_limits)
         self._hardware_state: Optional[HardwareState] = None
+        self._download_stats: Optional[DownloadStats] = None
+        self._system_index = SystemIndex()
 
     def run_profile(
         self,
@@ -38,15 +148,20 @@ class Executor:
         progress_hook: Optional[ProgressHook] = None,
         controller: Optional[InstallControl] = None,
         log_buffer: Optional[LogBuffer] = None,
+        jobs: Optional[int] = None,
+        result_hook: Optional[ResultHook] = None,
     ) -> List[ExecutionResult]:
         if profile_id not in self.profiles:
             raise ValueError(f"Unknown profile '{profile_id}'")
         profile = self.profiles[profile_id]
-        return self.run_scripts(
+        return self._run_steps(
             profile.scripts,
             progress_hook=progress_hook,
             controller=controller,
             log_buffer=log_buffer,
+            jobs=jobs,
+            profile_id=profile_id,
+            result_hook=result_hook,
         )
 
     def run_scripts(
@@ -55,69 +170,586 @@ class Executor:
         progress_hook: Optional[ProgressHook] = None,
         controller: Optional[InstallControl] = None,
         log_buffer: Optional[LogBuffer] = None,
+        jobs: Optional[int] = None,
+        result_hook: Optional[ResultHook] = None,
     ) -> List[ExecutionResult]:
-        results: List[ExecutionResult] = []
-        total = len(script_ids)
-        hardware_state = self.get_hardware_state()
-        for index, script_id in enumerate(script_ids, start=1):
+        return self._run_steps(
+            script_ids,
+            progress_hook=progress_hook,
+            controller=controller,
+            log_buffer=log_buffer,
+            jobs=jobs,
+            result_hook=result_hook,
+        )
+
+    def resumable_run(self) -> Optional[JournalState]:
+        if not self.journal:
+            return None
+        state = self.journal.load()
+        if not state:
+            return None
+        # Scripts removed or renamed since the run started are left out; the
+        # rest of the run can still be resumed.
+        state.dropped = [
+            script_id for script_id in state.script_ids if script_id not in self.scripts
+        ]
+        state.script_ids = [
+            script_id for script_id in state.script_ids if script_id in self.scripts
+        ]
+        if not state.remaining():
+            return None
+        return state
+
+    def resume_run(
+        self,
+        progress_hook: Optional[ProgressHook] = None,
+        controller: Optional[InstallControl] = None,
+        log_buffer: Optional[LogBuffer] = None,
+        jobs: Optional[int] = None,
+        result_hook: Optional[ResultHook] = None,
+    ) -> List[ExecutionResult]:
+        state = self.resumable_run()
+        if not state:
+            raise ValueError("No interrupted run to resume")
+        return self._run_steps(
+            state.script_ids,
+            progress_hook=progress_hook,
+            controller=controller,
+            log_buffer=log_buffer,
+            jobs=jobs,
+            profile_id=state.profile_id,
+            completed=state.finished(),
+            result_hook=result_hook,
+        )
+
+    def _run_steps(
+        self,
+        script_ids: Sequence[str],
+        progress_hook: Optional[ProgressHook] = None,
+        controller: Optional[InstallControl] = None,
+        log_buffer: Optional[LogBuffer] = None,
+        jobs: Optional[int] = None,
+        profile_id: Optional[str] = None,
+        completed: Optional[Dict[str, List[ExecutionResult]]] = None,
+        result_hook: Optional[ResultHook] = None,
+    ) -> List[ExecutionResult]:
+        ordered: List[Script] = []
+        for script_id in script_ids:
             script = self.scripts.get(script_id)
             if not script:
                 raise ValueError(f"Unknown script '{script_id}'")
-            action = self._consume_control_action(controller)
-            if action == "cancel":
-                cancel_result = self._user_cancel_result(script)
-                results.append(cancel_result)
-                if progress_hook:
-                    progress_hook("cancel", index, total, script, "CANCEL")
-                break
-            if action == "skip":
-                skip_result = self._user_skip_result(script)
-                results.append(skip_result)
-                if progress_hook:
-                    progress_hook("skip", index, total, script, "SKIP")
+            ordered.append(script)
+        total = len(ordered)
+        max_jobs = max(1, jobs or self.jobs)
+        hardware_state = self.get_hardware_state()
+        self._reset_cache_stats()
+        self._system_index.reset()
+        run_log_dir = new_run_log_dir(self.log_root)
+        self._download_stats = None
+        self.trace_report = None
+        step_env = {**hardware_state.as_env(), PYTHON_ENV: sys.executable}
+        if run_log_dir:
+            step_env[STATS_ENV] = str(run_log_dir / "downloads.jsonl")
+            step_env.update(apt_env(run_log_dir))
+        positions = {script.id: index for index, script in enumerate(ordered, start=1)}
+        pending: List[Script] = list(ordered)
+        if self.longest_first and self.durations:
+            pending = longest_first(pending, self.durations.expected(pending))
+        running: Dict[str, _StepControl] = {}
+        held: Dict[str, int] = {}
+        finished: Set[str] = set()
+        blocked: Set[str] = set()
+        step_results: Dict[str, List[ExecutionResult]] = {}
+        completions: WakeQueue[Tuple[str, List[ExecutionResult], Optional[str]]] = WakeQueue()
+        selector = selectors.DefaultSelector()
+        selector.register(completions, selectors.EVENT_READ)
+        control_timeout = self._register_control(selector, controller)
+        cancelled = False
+
+        def notify(event: str, script: Script, status: Optional[str]) -> None:
+            if progress_hook:
+                progress_hook(event, positions[script.id], total, script, status)
+
+        def emit(results: List[ExecutionResult]) -> None:
+            if result_hook:
+                for result in results:
+                    result_hook(result)
+
+        def record(results: List[ExecutionResult]) -> None:
+            if self.journal:
+                for result in results:
+                    self.journal.record(result)
+            emit(results)
+
+        def settle(script: Script, result: ExecutionResult, event: str) -> None:
+            pending.remove(script)
+            finished.add(script.id)
+            step_results[script.id] = [result]
+            record([result])
+            notify(event, script, result.status)
+
+        if self.journal:
+            if completed is None:
+                self.journal.begin(script_ids, profile_id)
+            else:
+                self.journal.resume()
+        for script in list(pending):
+            previous = (completed or {}).get(script.id)
+            if previous:
+                pending.remove(script)
+                finished.add(script.id)
+                last = previous[-1]
+                step_results[script.id] = [
+                    replace(last, message=f"{last.message} (previous run)")
+                ]
+                emit(step_results[script.id])
+                notify("end", script, last.status)
+        to_install = [
+            script
+            for script in pending
+            if not self._hardware_skip_reason(script, hardware_state)
+        ]
+        package_results, packages_ready, package_action = self._install_declared_packages(
+            to_install,
+            controller=controller,
+            log_buffer=log_buffer,
+            log_dir=run_log_dir,
+        )
+        for script in to_install:
+            emit(package_results.get(script.id, []))
+        if package_action == "cancel":
+            cancelled = True
+
+        profile = self._start_profile()
+        try:
+            while pending or running:
+                if cancelled and not running:
+                    # A run reports its cancellation once: on the step that
+                    # was stopped, or else on the next step that never ran.
+                    reported = any(
+                        result.status == "CANCEL"
+                        for results in step_results.values()
+                        for result in results
+                    )
+                    if pending and not reported:
+                        settle(pending[0], self._user_cancel_result(pending[0]), "cancel")
+                    break
+                action = self._consume_control_action(controller)
+                if action == "cancel":
+                    cancelled = True
+                    for control in running.values():
+                        control.request("cancel")
+                    continue
+                progressed = False
+                if action == "skip":
+                    if running:
+                        next(iter(running.values())).request("skip")
+                    elif pending:
+                        settle(pending[0], self._user_skip_result(pending[0]), "skip")
+                        progressed = True
+
+                for script in list(pending):
+                    if cancelled or len(running) >= max_jobs:
+                        break
+                    dependencies = [dep for dep in script.depends_on if dep in positions]
+                    failed = next((dep for dep in dependencies if dep in blocked), None)
+                    if failed:
+                        blocked.add(script.id)
+                        settle(script, self._dependency_skip_result(script, failed), "skip")
+                        progressed = True
+                        continue
+                    if any(dep not in finished for dep in dependencies):
+                        continue
+                    skip_reason = self._hardware_skip_reason(script, hardware_state)
+                    if skip_reason:
+                        settle(script, self._hardware_skip_result(script, skip_reason), "skip")
+                        progressed = True
+                        continue
+                    if not self._acquire_resources(script, held):
+                        continue
+                    pending.remove(script)
+                    control = _StepControl()
+                    running[script.id] = control
+                    notify("start", script, None)
+                    threading.Thread(
+                        target=self._run_step,
+                        args=(
+                            script,
+                            control,
+                            log_buffer,
+                            run_log_dir,
+                            {**step_env, READY_ENV: "1"}
+                            if script.id in packages_ready
+                            else step_env,
+                            completions,
+                            lambda text, script=script: notify("progress", script, text),
+                        ),
+                        daemon=True,
+                    ).start()
+                    progressed = True
+
+                if not running:
+                    if pending and not progressed:
+                        raise ValueError(
+                            "Unable to schedule scripts: "
+                            + ", ".join(script.id for script in pending)
+                        )
+                    continue
+                completion = completions.get_nowait()
+                if completion is None:
+                    selector.select(control_timeout)
+                    continue
+                script_id, script_results, script_action = completion
+                running.pop(script_id).close()
+                script = self.scripts[script_id]
+                self._release_resources(script, held)
+                finished.add(script_id)
+                step_results[script_id] = script_results
+                record(script_results)
+                final_status = script_results[-1].status if script_results else "DONE"
+                if final_status in BLOCKING_STATUSES:
+                    blocked.add(script_id)
+                if final_status in {"DONE", "OK"} and self.durations:
+                    self.durations.record(
+                        script,
+                        sum(result.wall_seconds or 0.0 for result in script_results),
+                        check_only=final_status == "OK",
+                    )
+                event = (
+                    "cancel"
+                    if script_action == "cancel"
+                    else ("skip" if final_status == "SKIP" else "end")
+                )
+                notify(event, script, final_status)
+                if script_action == "cancel" and not cancelled:
+                    cancelled = True
+                    for control in running.values():
+                        control.request("cancel")
+        finally:
+            selector.close()
+            # Leaving early (e.g. KeyboardInterrupt): scripts no longer share
+            # our process group, so stop them explicitly.
+            for control in running.values():
+                control.request("cancel")
+            if not running:
+                completions.close()
+            if self.journal:
+                self.journal.close()
+            if self.durations:
+                self.durations.save()
+            if self.check_cache:
+                self.check_cache.flush()
+            if profile:
+                profile.disable()
+            if run_log_dir:
+                self._download_stats = DownloadStats.load(run_log_dir / "downloads.jsonl")
+
+        results: List[ExecutionResult] = []
+        for script in ordered:
+            results.extend(package_results.get(script.id, []))
+            results.extend(step_results.get(script.id, []))
+        self._write_reports(results, run_log_dir)
+        if self.trace and run_log_dir:
+            self.trace_report = write_run_report(run_log_dir, self._collect_profiles())
+        return results
+
+    def _start_profile(self) -> Optional[cProfile.Profile]:
+        if not self.trace:
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler already owns this thread.
+            return None
+        with self._profiles_lock:
+            self._profiles.append(profile)
+        return profile
+
+    def _collect_profiles(self) -> Optional[pstats.Stats]:
+        with self._profiles_lock:
+            profiles, self._profiles = self._profiles, []
+        stats: Optional[pstats.Stats] = None
+        for profile in profiles:
+            try:
+                if stats is None:
+                    stats = pstats.Stats(profile)
+                else:
+                    stats.add(profile)
+            except TypeError:
+                # A profile that recorded nothing has no stats to merge.
                 continue
-            skip_reason = self._hardware_skip_reason(script, hardware_state)
-            if skip_reason:
-                results.append(self._hardware_skip_result(script, skip_reason))
-                if progress_hook:
-                    progress_hook("skip", index, total, script, "SKIP")
+        return stats
+
+    def _install_declared_packages(
+        self,
+        scripts: Sequence[Script],
+        controller: Optional[InstallControl] = None,
+        log_buffer: Optional[LogBuffer] = None,
+        log_dir: Optional[Path] = None,
+    ) -> Tuple[Dict[str, List[ExecutionResult]], Set[str], Optional[str]]:
+        plan = PackagePlan.for_scripts(scripts)
+        if not plan:
+            return {}, set(), None
+        details: Dict[str, List[str]] = {}
+        notes: Dict[str, str] = {}
+        states: Dict[str, Set[str]] = {}
+        action: Optional[str] = None
+        managers = (
+            ("apt", plan.apt, apt_available, installed_apt_packages),
+            ("flatpak", plan.flatpak, flatpak_available, installed_flatpak_apps),
+        )
+        for manager, owners, available, installed in managers:
+            if not owners:
                 continue
-            if progress_hook:
-                progress_hook("start", index, total, script, None)
-            script_results, script_action = self._run_install_flow(
+            usable = available()
+            present = installed(list(owners)) if usable else set()
+            missing = [package for package in owners if package not in present]
+            status_code, summary = 0, ""
+            if missing and not usable:
+                status_code, summary = 127, f"{manager} is not available"
+            elif missing and action is None:
+                status_code, summary, action = self._run_package_transaction(
+                    manager,
+                    missing,
+                    controller=controller,
+                    log_buffer=log_buffer,
+                    log_dir=log_dir,
+                )
+            for package, script_ids in owners.items():
+                if package in present:
+                    state = "present"
+                elif action:
+                    state = "skipped"
+                elif status_code == 0:
+                    state = "installed"
+                else:
+                    state = "failed"
+                for script_id in script_ids:
+                    details.setdefault(script_id, []).append(f"{manager} {package}: {state}")
+                    states.setdefault(script_id, set()).add(state)
+                    if state == "failed" and summary:
+                        notes[script_id] = summary
+
+        self._system_index.reset()
+        results: Dict[str, List[ExecutionResult]] = {}
+        ready: Set[str] = set()
+        for script in scripts:
+            if script.id not in details:
+                continue
+            script_states = states[script.id]
+            if script_states <= {"present", "installed"}:
+                ready.add(script.id)
+                status = "OK" if script_states == {"present"} else "DONE"
+                if status == "DONE" and self.check_cache:
+                    self.check_cache.invalidate(script.id)
+            else:
+                status = "SKIP" if "skipped" in script_states else "FAIL"
+            message = "; ".join(details[script.id])
+            if script.id in notes:
+                message = f"{message} ({notes[script.id]})"
+            results[script.id] = [
+                ExecutionResult(
+                    script_id=script.id,
+                    script_name=script.name,
+                    phase="packages",
+                    status=status,
+                    message=message,
+                )
+            ]
+        return results, ready, action
+
+    def _run_package_transaction(
+        self,
+        manager: str,
+        packages: List[str],
+        controller: Optional[InstallControl] = None,
+        log_buffer: Optional[LogBuffer] = None,
+        log_dir: Optional[Path] = None,
+    ) -> Tuple[int, str, Optional[str]]:
+        lock_path: Optional[Path] = None
+        state_path: Optional[Path] = None
+        if manager == "apt":
+            commands = [
+                ("apt-update", apt_update_command()),
+                ("apt-install", apt_install_command(packages)),
+            ]
+            if log_dir:
+                lock_path = log_dir / APT_LOCK_NAME
+                state_path = log_dir / APT_STATE_NAME
+        else:
+            commands = [
+                ("flatpak-remote", flatpak_remote_command()),
+                ("flatpak-install", flatpak_install_command(packages)),
+            ]
+        status_code = 0
+        summary = ""
+        # Steps' apt-get calls queue on the same lock, and their `apt-get
+        # update` is skipped while the sources match the refresh done here.
+        with apt_locked(lock_path):
+            for label, cmd in commands:
+                digest = ""
+                if label == "apt-update":
+                    digest = sources_digest()
+                    if not refresh_needed(state_path, digest):
+                        continue
+                status_code, capture, action, _ = self._run_streaming_command(
+                    cmd,
+                    log_buffer=log_buffer,
+                    controller=controller,
+                    log_path=log_dir / f"packages-{label}.log" if log_dir else None,
+                )
+                summary = capture.summary(failed=status_code != 0)
+                if action or status_code != 0:
+                    return status_code, summary, action
+                if digest:
+                    record_refresh(state_path, digest)
+        return status_code, summary, None
+
+    def _run_step(
+        self,
+        script: Script,
+        control: _StepControl,
+        log_buffer: Optional[LogBuffer],
+        log_dir: Optional[Path],
+        env: Optional[Dict[str, str]],
+        completions: WakeQueue,
+        progress: Optional[ProgressCallback] = None,
+    ) -> None:
+        # Step threads do the output capture, so they are profiled as well.
+        profile = self._start_profile()
+        try:
+            script_results, action = self._run_install_flow(
                 script,
-                controller=controller,
+                controller=control,
                 log_buffer=log_buffer,
+                log_dir=log_dir,
+                env=env,
+                progress=progress,
             )
-            results.extend(script_results)
-            final_status = script_results[-1].status if script_results else "DONE"
-            event = (
-                "cancel"
-                if script_action == "cancel"
-                else ("skip" if final_status == "SKIP" else "end")
-            )
-            if progress_hook:
-                progress_hook(event, index, total, script, final_status)
-            if script_action == "cancel":
-                break
-        return results
+        except Exception as exc:
+            script_results = [
+                ExecutionResult(
+                    script_id=script.id,
+                    script_name=script.name,
+                    phase="install",
+                    status="FAIL",
+                    message=str(exc) or exc.__class__.__name__,
+                )
+            ]
+            action = None
+        if profile:
+            profile.disable()
+        completions.put((script.id, script_results, action))
 
-    def run_all_checks(self) -> List[ExecutionResult]:
-        results: List[ExecutionResult] = []
+    def _acquire_resources(self, script: Script, held: Dict[str, int]) -> bool:
+        for tag in script.resources:
+            if held.get(tag, 0) >= self.resource_limits.get(tag, 1):
+                return False
+        for tag in script.resources:
+            held[tag] = held.get(tag, 0) + 1
+        return True
+
+    @staticmethod
+    def _release_resources(script: Script, held: Dict[str, int]) -> None:
+        for tag in script.resources:
+            held[tag] = max(0, held.get(tag, 0) - 1)
+
+    def run_all_checks(
+        self,
+        result_hook: Optional[CheckHook] = None,
+        jobs: Optional[int] = None,
+    ) -> List[ExecutionResult]:
         hardware_state = self.get_hardware_state()
-        for script in self.scripts.values():
+        self._reset_cache_stats()
+        self._system_index.reset()
+        catalog = list(self.scripts.values())
+        total = len(catalog)
+        by_id: Dict[str, ExecutionResult] = {}
+
+        def record(result: ExecutionResult) -> None:
+            by_id[result.script_id] = result
+            if result_hook:
+                result_hook(result, len(by_id), total)
+
+        to_check: List[Script] = []
+        for script in catalog:
             skip_reason = self._hardware_skip_reason(script, hardware_state)
             if skip_reason:
-                results.append(self._hardware_skip_result(script, skip_reason))
+                record(self._hardware_skip_result(script, skip_reason))
                 continue
-            results.append(self._run_check(script))
+            to_check.append(script)
+        try:
+            if to_check and self.batch_checks:
+                self._run_batched_checks(to_check, jobs or self.check_jobs, record)
+            elif to_check:
+                workers = min(max(1, jobs or self.check_jobs), len(to_check))
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    futures = [pool.submit(self._run_check, script) for script in to_check]
+                    for future in as_completed(futures):
+                        record(future.result())
+        finally:
+            if self.check_cache:
+                self.check_cache.flush()
+        results = [by_id[script.id] for script in catalog]
+        self._write_reports(results)
         return results
 
+    def _run_batched_checks(
+        self,
+        scripts: List[Script],
+        jobs: int,
+        record: Callable[[ExecutionResult], None],
+    ) -> None:
+        # Each lane keeps one CheckShell and pulls the next check from a shared
+        # queue; results are recorded on this thread as they arrive.
+        work: "queue.SimpleQueue[Script]" = queue.SimpleQueue()
+        for script in scripts:
+            work.put(script)
+        done: "queue.SimpleQueue[object]" = queue.SimpleQueue()
+        env = self.get_hardware_state().as_env()
+
+        def lane() -> None:
+            shell = CheckShell(self.base_path, env)
+            try:
+                while True:
+                    try:
+                        script = work.get_nowait()
+                    except queue.Empty:
+                        return
+                    done.put(self._run_check(script, shell))
+            except Exception as exc:
+                # Surfaced on the calling thread, as future.result() would.
+                done.put(exc)
+            finally:
+                shell.close()
+
+        workers = min(max(1, jobs), len(scripts))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            lanes = [pool.submit(lane) for _ in range(workers)]
+            for _ in scripts:
+                item = done.get()
+                if isinstance(item, Exception):
+                    raise item
+                record(item)
+            for future in lanes:
+                future.result()
+
+    def _write_reports(
+        self, results: List[ExecutionResult], run_log_dir: Optional[Path] = None
+    ) -> None:
+        if run_log_dir:
+            write_reports(results, json_path=run_log_dir / "report.json")
+        write_reports(results, json_path=self.report_path, textfile_path=self.metrics_textfile)
+
     def _run_install_flow(
         self,
         script: Script,
         controller: Optional[InstallControl] = None,
         log_buffer: Optional[LogBuffer] = None,
+        log_dir: Optional[Path] = None,
+        env: Optional[Dict[str, str]] = None,
+        progress: Optional[ProgressCallback] = None,
     ) -> Tuple[List[ExecutionResult], Optional[str]]:
         results: List[ExecutionResult] = []
         action: Optional[str] = None
@@ -134,34 +766,38 @@ class Executor:
                 message="Running install script",
             )
         )
-        if log_buffer:
-            log_buffer.clear()
         exec_result = self._run_streaming_path(
             script.script_path,
             log_buffer=log_buffer,
             controller=controller,
+            log_path=log_dir / f"{script.id}.log" if log_dir else None,
+            env=env,
+            progress=progress,
         )
-        status_code, stdout, stderr, action = exec_result
+        if self.check_cache:
+            self.check_cache.invalidate(script.id)
+        # Anything may have landed on PATH or in dpkg; later checks re-index.
+        self._system_index.reset()
+        status_code, capture, action, usage = exec_result
         if action == "skip":
-            results.append(self._user_skip_result(script))
+            result = self._user_skip_result(script)
         elif action == "cancel":
-            results.append(self._user_cancel_result(script))
+            result = self._user_cancel_result(script)
         else:
-            results.append(
-                ExecutionResult(
-                    script_id=script.id,
-                    script_name=script.name,
-                    phase="install",
-                    status="DONE" if status_code == 0 else "FAIL",
-                    message=self._format_message(stdout, stderr)
-                    if status_code != 0
-                    else stdout.strip() or "Completed",
-                )
+            result = ExecutionResult(
+                script_id=script.id,
+                script_name=script.name,
+                phase="install",
+                status="DONE" if status_code == 0 else "FAIL",
+                message=capture.summary(failed=status_code != 0),
             )
+        if capture.log_path:
+            result.log_path = str(capture.log_path)
+        results.append(usage.apply(result))
         return results, action
 
-    def _run_check(self, script: Script) -> ExecutionResult:
-        if not script.check_path:
+    def _run_check(self, script: Script, shell: Optional[CheckShell] = None) -> ExecutionResult:
+        if not script.check_path and not script.checks:
             return ExecutionResult(
                 script_id=script.id,
                 script_name=script.name,
@@ -169,93 +805,325 @@ class Executor:
                 status="SKIP",
                 message="No check defined",
             )
-        exec_result = self._run_path(script.check_path)
+        if script.checks:
+            # Declarative checks are answered from the shared index without a
+            # subprocess; a check script, if any, runs only once they pass.
+            started = time.monotonic()
+            passed, message = evaluate_checks(self._system_index, script.checks)
+            result = ResourceUsage(time.monotonic() - started).apply(
+                ExecutionResult(
+                    script_id=script.id,
+                    script_name=script.name,
+                    phase="check",
+                    status="OK" if passed else "FAIL",
+                    message=message,
+                )
+            )
+            if not passed or not script.check_path:
+                return result
+        cache_key = self._check_cache_key(script)
+        if cache_key:
+            cached = self.check_cache.get(script.id, cache_key)
+            if cached:
+                return replace(
+                    cached,
+                    message=f"{cached.message} (cached)",
+                    wall_seconds=0.0,
+                    user_seconds=None,
+                    system_seconds=None,
+                    max_rss_kb=None,
+                )
+        timeout = script.check_timeout or DEFAULT_CHECK_TIMEOUT
+        exec_result = shell.run(script.check_path, timeout) if shell else None
+        if exec_result is None:
+            exec_result = self._run_path(
+                script.check_path,
+                timeout=timeout,
+                env=self.get_hardware_state().as_env(),
+            )
         status = "OK" if exec_result[0] == 0 else "FAIL"
         message = exec_result[1].strip() or self._format_message(exec_result[1], exec_result[2])
         if status == "FAIL" and not message:
             message = "Check failed"
-        return ExecutionResult(
-            script_id=script.id,
-            script_name=script.name,
-            phase="check",
-            status=status,
-            message=message,
+        result = exec_result[3].apply(
+            ExecutionResult(
+                script_id=script.id,
+                script_name=script.name,
+                phase="check",
+                status=status,
+                message=message,
+            )
+        )
+        if cache_key and exec_result[0] != 124:
+            self.check_cache.put(cache_key, result)
+        return result
+
+    def _check_cache_key(self, script: Script) -> Optional[str]:
+        if not self.check_cache or not script.check_path:
+            return None
+        path = (self.base_path / script.check_path).resolve()
+        return self.check_cache.key_for(path, self.get_hardware_state())
+
+    def expected_durations(self, script_ids: Sequence[str]) -> Dict[str, float]:
+        if not self.durations:
+            return {}
+        return self.durations.expected(
+            [self.scripts[script_id] for script_id in script_ids if script_id in self.scripts]
         )
 
+    @property
+    def cache_stats(self) -> Optional[CacheStats]:
+        return self.check_cache.stats if self.check_cache else None
+
+    @property
+    def download_stats(self) -> Optional[DownloadStats]:
+        return self._download_stats
+
+    def _reset_cache_stats(self) -> None:
+        if self.check_cache:
+            self.check_cache.stats.reset()
+
     def _run_streaming_path(
         self,
         relative_path: str,
         log_buffer: Optional[LogBuffer] = None,
         controller: Optional[InstallControl] = None,
-    ) -> Tuple[int, str, str, Optional[str]]:
+        log_path: Optional[Path] = None,
+        env: Optional[Dict[str, str]] = None,
+        progress: Optional[ProgressCallback] = None,
+    ) -> Tuple[int, OutputCapture, Optional[str], ResourceUsage]:
         path = (self.base_path / relative_path).resolve()
         if not path.exists():
-            return 1, "", f"Script not found: {path}", None
-        cmd = self._build_command(path)
-        process = subprocess.Popen(
-            cmd,
-            cwd=self.base_path,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            bufsize=1,
-        )
-        stdout_lines: List[str] = []
-        stderr_lines: List[str] = []
-
-        def read_stream(stream, sink: List[str], push_to_buffer: bool = False) -> None:
-            if not stream:
-                return
-            for line in stream:
-                sink.append(line)
-                if push_to_buffer and log_buffer:
-                    log_buffer.append(line.rstrip("\n"))
-
-        stdout_thread = threading.Thread(
-            target=read_stream,
-            args=(process.stdout, stdout_lines, True),
-            daemon=True,
-        )
-        stderr_thread = threading.Thread(
-            target=read_stream,
-            args=(process.stderr, stderr_lines, False),
-            daemon=True,
+            capture = OutputCapture(log_path, log_buffer)
+            capture.feed("err", f"Script not found: {path}\n".encode())
+            capture.close()
+            return 1, capture, None, ResourceUsage(0.0)
+        if not (self.trace and log_path and path.suffix != ".py"):
+            return self._run_streaming_command(
+                self._build_command(path),
+                log_buffer=log_buffer,
+                controller=controller,
+                log_path=log_path,
+                env=env,
+                progress=progress,
+            )
+        # xtrace goes to its own file so it never mixes with the step output.
+        trace_fd = os.open(
+            log_path.with_suffix(TRACE_SUFFIX), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644
         )
-        stdout_thread.start()
-        stderr_thread.start()
+        try:
+            outcome = self._run_streaming_command(
+                bash_command(path, trace_fd),
+                log_buffer=log_buffer,
+                controller=controller,
+                log_path=log_path,
+                env=env,
+                progress=progress,
+                pass_fds=(trace_fd,),
+            )
+            mark_end(trace_fd)
+        finally:
+            os.close(trace_fd)
+        return outcome
+
+    def _run_streaming_command(
+        self,
+        cmd: List[str],
+        log_buffer: Optional[LogBuffer] = None,
+        controller: Optional[InstallControl] = None,
+        log_path: Optional[Path] = None,
+        env: Optional[Dict[str, str]] = None,
+        progress: Optional[ProgressCallback] = None,
+        pass_fds: Sequence[int] = (),
+    ) -> Tuple[int, OutputCapture, Optional[str], ResourceUsage]:
+        capture = OutputCapture(log_path, log_buffer)
+        progress_read, progress_write = os.pipe() if progress else (-1, -1)
+        if progress:
+            env = {**(env or {}), PROGRESS_FD_ENV: str(progress_write)}
+        started = time.monotonic()
+        try:
+            process = subprocess.Popen(
+                cmd,
+                cwd=self.base_path,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                env={**os.environ, **env} if env else None,
+                pass_fds=(*pass_fds, progress_write) if progress else tuple(pass_fds),
+                **_OWN_PROCESS_GROUP,
+            )
+        except OSError as exc:
+            capture.feed("err", f"Unable to run {cmd[0]}: {exc}\n".encode())
+            capture.close()
+            if progress:
+                os.close(progress_read)
+            return 127, capture, None, ResourceUsage(time.monotonic() - started)
+        finally:
+            if progress:
+                os.close(progress_write)
+        streams = {process.stdout.fileno(): "out", process.stderr.fileno(): "err"}
+        progress_tail = b""
         action: Optional[str] = None
+        exited_at: Optional[float] = None
+        rusage = None
+        exit_signal = ProcessExit(process)
         try:
-            while True:
-                if process.poll() is not None:
-                    break
-                action = self._consume_control_action(controller)
-                if action in {"skip", "cancel"}:
-                    process.terminate()
-                    try:
-                        process.wait(timeout=5)
-                    except subprocess.TimeoutExpired:
-                        process.kill()
-                    break
-                time.sleep(0.2)
+            with selectors.DefaultSelector() as selector:
+                for fd, stream in streams.items():
+                    os.set_blocking(fd, False)
+                    selector.register(fd, selectors.EVENT_READ, stream)
+                if progress:
+                    os.set_blocking(progress_read, False)
+                    selector.register(progress_read, selectors.EVENT_READ, "progress")
+                selector.register(exit_signal, selectors.EVENT_READ, "exit")
+                control_timeout = self._register_control(selector, controller)
+                while True:
+                    if exited_at is None:
+                        rusage = rusage or reap(process, block=False)
+                    if exited_at is None and process.returncode is not None:
+                        exited_at = time.monotonic()
+                        for key in list(selector.get_map().values()):
+                            if key.data in {"exit", "control"}:
+                                selector.unregister(key.fileobj)
+                    if exited_at is None:
+                        requested = self._consume_control_action(controller)
+                        if requested in {"skip", "cancel"}:
+                            action = requested
+                            rusage = self._terminate(process)
+                            continue
+                        timeout = control_timeout
+                    else:
+                        # Background children may keep the pipes open; stop
+                        # draining shortly after the script itself has exited.
+                        timeout = OUTPUT_DRAIN_SECONDS - (time.monotonic() - exited_at)
+                        if not streams or timeout <= 0:
+                            break
+                    for key, _ in selector.select(timeout):
+                        if key.data == "progress":
+                            progress_tail = self._read_progress(
+                                selector, key.fd, progress_tail, progress
+                            )
+                            continue
+                        if key.data not in {"out", "err"}:
+                            continue
+                        chunk = os.read(key.fd, OUTPUT_CHUNK_BYTES)
+                        if chunk:
+                            capture.feed(key.data, chunk)
+                        else:
+                            selector.unregister(key.fd)
+                            streams.pop(key.fd)
         finally:
-            stdout_thread.join()
-            stderr_thread.join()
-        return_code = process.wait()
-        return return_code, "".join(stdout_lines), "".join(stderr_lines), action
+            if progress:
+                os.close(progress_read)
+            exit_signal.close()
+            capture.close()
+            process.stdout.close()
+            process.stderr.close()
+        rusage = rusage or reap(process)
+        # Wall time ends when the script exits, not when its pipes are drained.
+        usage = ResourceUsage.from_rusage((exited_at or time.monotonic()) - started, rusage)
+        return process.returncode, capture, action, usage
+
+    @staticmethod
+    def _read_progress(
+        selector: selectors.BaseSelector,
+        fd: int,
+        tail: bytes,
+        progress: ProgressCallback,
+    ) -> bytes:
+        # Only the newest complete line matters; older ones are already stale.
+        chunk = os.read(fd, OUTPUT_CHUNK_BYTES)
+        if not chunk:
+            selector.unregister(fd)
+            return b""
+        *lines, tail = (tail + chunk).split(b"\n")
+        latest = next((line for line in reversed(lines) if line.strip()), None)
+        if latest is not None:
+            progress(latest.decode("utf-8", errors="replace").strip())
+        return tail[-OUTPUT_CHUNK_BYTES:]
+
+    @staticmethod
+    def _terminate(process: subprocess.Popen):
+        _signal_group(process, signal.SIGTERM)
+        rusage = reap_within(process, TERMINATE_GRACE_SECONDS)
+        # Children that outlive the script would keep the output pipes open
+        # and hold up the drain; the group id stays valid while any remain.
+        _signal_group(process, signal.SIGKILL)
+        if process.returncode is None:
+            rusage = reap(process)
+        return rusage
+
+    @staticmethod
+    def _register_control(
+        selector: selectors.BaseSelector,
+        controller: Optional[InstallControl],
+    ) -> Optional[float]:
+        if controller is None:
+            return None
+        fileno = getattr(controller, "fileno", None)
+        if fileno is None:
+            return CONTROL_POLL_INTERVAL
+        selector.register(fileno(), selectors.EVENT_READ, "control")
+        return None
 
-    def _run_path(self, relative_path: str) -> tuple[int, str, str]:
+    def _run_path(
+        self,
+        relative_path: str,
+        timeout: Optional[float] = None,
+        env: Optional[Dict[str, str]] = None,
+    ) -> Tuple[int, str, str, ResourceUsage]:
         path = (self.base_path / relative_path).resolve()
         if not path.exists():
-            return 1, "", f"Script not found: {path}"
+            return 1, "", f"Script not found: {path}", ResourceUsage(0.0)
         cmd = self._build_command(path)
-        result = subprocess.run(
-            cmd,
-            cwd=self.base_path,
-            capture_output=True,
-            text=True,
-            check=False,
-        )
-        return result.returncode, result.stdout, result.stderr
+        started = time.monotonic()
+        try:
+            process = subprocess.Popen(
+                cmd,
+                cwd=self.base_path,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                env={**os.environ, **env} if env else None,
+                **_OWN_PROCESS_GROUP,
+            )
+        except OSError as exc:
+            return 127, "", f"Unable to run {cmd[0]}: {exc}", ResourceUsage(0.0)
+        # communicate() reaps the child with waitpid(), which drops the rusage,
+        # so the pipes are drained here and the child is reaped with wait4().
+        chunks: Dict[str, List[bytes]] = {"out": [], "err": []}
+        deadline = started + timeout if timeout else None
+        timed_out = False
+        with selectors.DefaultSelector() as selector:
+            selector.register(process.stdout, selectors.EVENT_READ, "out")
+            selector.register(process.stderr, selectors.EVENT_READ, "err")
+            while selector.get_map():
+                remaining = deadline - time.monotonic() if deadline else None
+                if remaining is not None and remaining <= 0:
+                    timed_out = True
+                    break
+                for key, _ in selector.select(remaining):
+                    chunk = os.read(key.fd, OUTPUT_CHUNK_BYTES)
+                    if chunk:
+                        chunks[key.data].append(chunk)
+                    else:
+                        selector.unregister(key.fileobj)
+        process.stdout.close()
+        process.stderr.close()
+        if deadline is None:
+            rusage = reap(process)
+        else:
+            # A script may close its output early and keep running.
+            remaining = 0.0 if timed_out else max(0.0, deadline - time.monotonic())
+            rusage = reap_within(process, remaining)
+            if process.returncode is None:
+                timed_out = True
+                _signal_group(process, signal.SIGKILL)
+                rusage = reap(process)
+        usage = ResourceUsage.from_rusage(time.monotonic() - started, rusage)
+        if timed_out:
+            return 124, "", f"Timed out after {timeout:g}s", usage
+        stdout = b"".join(chunks["out"]).decode("utf-8", errors="replace")
+        stderr = b"".join(chunks["err"]).decode("utf-8", errors="replace")
+        return process.returncode, stdout, stderr, usage
 
     @staticmethod
     def _build_command(path: Path) -> List[str]:
@@ -280,7 +1148,11 @@ class Executor:
             if state.usb_present
             else "USB drive not detected"
         )
-        return f"{gpu_part}; {usb_part}"
+        system_part = (
+            f"{state.cpu_count} CPUs, {state.ram_gb:g} GB RAM, "
+            f"{state.disk_free_gb:g} GB free"
+        )
+        return f"{gpu_part}; {usb_part}; {system_part}"
 
     def get_hardware_state(self) -> HardwareState:
         if not self._hardware_state:
@@ -299,18 +1171,24 @@ class Executor:
             phase="hardware",
             status="SKIP",
             message=reason,
+            wall_seconds=0.0,
         )
 
     @staticmethod
     def _hardware_skip_reason(script: Script, state: HardwareState) -> Optional[str]:
         if not script.hardware:
             return None
-        requirements = {req.lower() for req in script.hardware}
-        if "gpu" in requirements and not state.has_nvidia_gpu:
-            return "Skipped: NVIDIA GPU not detected"
-        if "usb_drive" in requirements and not state.usb_present:
-            return "Skipped: required USB drive not detected"
-        return None
+        return unmet_requirement(script.hardware, state)
+
+    @staticmethod
+    def _dependency_skip_result(script: Script, dependency: str) -> ExecutionResult:
+        return ExecutionResult(
+            script_id=script.id,
+            script_name=script.name,
+            phase="dependency",
+            status="SKIP",
+            message=f"Skipped: dependency '{dependency}' did not complete",
+        )
 
     @staticmethod
     def _user_skip_result(script: Script) -> ExecutionResult:
@@ -339,3 +1217,10 @@ class Executor:
         if not controller:
             return None
         return controller.consume_action()
+
+
+def _signal_group(process: subprocess.Popen, signum: int) -> None:
+    try:
+        os.killpg(process.pid, signum)
+    except OSError:
+        pass
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+from .hardware import USB_MOUNT_ENV
+from .usb_sync import PROGRESS_FD_ENV
+
+DEFAULT_CLONE_JOBS = 3
+SEED_DIR_ENV = "POP_SETUP_GIT_SEEDS"
+
+
+@dataclass
+class CloneResult:
+    url: str
+    dest: Path
+    source: str
+    seconds: float = 0.0
+    error: str = ""
+    note: str = ""
+
+    @property
+    def name(self) -> str:
+        return repo_name(self.url)
+
+
+def repo_name(url: str) -> str:
+    name = url.rstrip("/").rsplit("/", 1)[-1].rsplit(":", 1)[-1]
+    return name[:-4] if name.endswith(".git") else name
+
+
+def default_seed_dir() -> Optional[Path]:
+    explicit = os.environ.get(SEED_DIR_ENV)
+    if explicit:
+        return Path(explicit)
+    usb_mount = os.environ.get(USB_MOUNT_ENV)
+    return Path(usb_mount) / "git" if usb_mount else None
+
+
+def find_seed(seed_dir: Optional[Path], url: str) -> Tuple[str, Optional[Path]]:
+    # A bundle is a full local copy; a mirror only lends its objects to a
+    # network clone through --reference.
+    if seed_dir is None or not seed_dir.is_dir():
+        return "network", None
+    name = repo_name(url)
+    bundle = seed_dir / f"{name}.bundle"
+    if bundle.is_file():
+        return "bundle", bundle
+    for candidate in (seed_dir / f"{name}.git", seed_dir / name):
+        if (candidate / "objects").is_dir() or (candidate / ".git").is_dir():
+            return "mirror", candidate
+    return "network", None
+
+
+def clone_repo(
+    url: str,
+    dest: Path,
+    depth: Optional[int] = None,
+    blob_filter: Optional[str] = None,
+    seed_dir: Optional[Path] = None,
+) -> CloneResult:
+    started = time.monotonic()
+    if (dest / ".git").is_dir():
+        return CloneResult(url, dest, "present")
+    source, seed = find_seed(seed_dir, url)
+    result = CloneResult(url, dest, source)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        if source == "bundle":
+            _git("clone", str(seed), str(dest))
+            _git("-C", str(dest), "remote", "set-url", "origin", url)
+            if _git("-C", str(dest), "fetch", "origin", check=False).returncode != 0:
+                result.note = "fetch failed, bundle contents only"
+            elif _git("-C", str(dest), "merge", "--ff-only", "@{upstream}", check=False).returncode != 0:
+                result.note = "not fast-forwarded"
+        else:
+            options = []
+            if source == "mirror":
+                options += ["--reference-if-able", str(seed), "--dissociate"]
+            if depth:
+                options += ["--depth", str(depth)]
+            if blob_filter:
+                options += [f"--filter={blob_filter}"]
+            _git("clone", *options, url, str(dest))
+    except subprocess.CalledProcessError as exc:
+        lines = (exc.stderr or "").strip().splitlines()
+        fatal = [line for line in lines if line.startswith("fatal:")]
+        result.error = (fatal or lines or [f"git exited with {exc.returncode}"])[0]
+    result.seconds = time.monotonic() - started
+    return result
+
+
+def clone_all(
+    repos: Sequence[Tuple[str, Path]],
+    jobs: int = DEFAULT_CLONE_JOBS,
+    depth: Optional[int] = None,
+    blob_filter: Optional[str] = None,
+    seed_dir: Optional[Path] = None,
+) -> List[CloneResult]:
+    progress_fd = os.environ.get(PROGRESS_FD_ENV, "")
+    lock = threading.Lock()
+    done: List[CloneResult] = []
+
+    def run(url: str, dest: Path) -> CloneResult:
+        result = clone_repo(url, dest, depth, blob_filter, seed_dir)
+        with lock:
+            done.append(result)
+            print(describe(result), flush=True)
+            if progress_fd.isdigit():
+                try:
+                    os.write(int(progress_fd), f"{len(done)}/{len(repos)} repositories\n".encode())
+                except OSError:
+                    pass
+        return result
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        futures = [pool.submit(run, url, dest) for url, dest in repos]
+        return [future.result() for future in futures]
+
+
+def describe(result: CloneResult) -> str:
+    if result.source == "present":
+        return f"{result.name}: already present at {result.dest}"
+    if result.error:
+        return f"{result.name}: clone failed after {result.seconds:.1f}s: {result.error}"
+    line = f"{result.name}: cloned from {result.source} in {result.seconds:.1f}s"
+    return f"{line} ({result.note})" if result.note else line
+
+
+def _timing(result: CloneResult) -> str:
+    if result.source == "present":
+        return f"{result.name} present"
+    return f"{result.name} {result.seconds:.1f}s ({result.source})"
+
+
+def _git(*args: str, check: bool = True) -> subprocess.CompletedProcess:
+    # Parallel clones must never stop to ask for credentials.
+    env = {**os.environ, "GIT_TERMINAL_PROMPT": "0"}
+    return subprocess.run(
+        ["git", *args],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        env=env,
+        check=check,
+    )
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m pop_setup_cli.git_clone",
+        description="Clone several repositories at once, seeded from local bundles or mirrors",
+    )
+    parser.add_argument(
+        "--repo",
+        nargs=2,
+        action="append",
+        metavar=("URL", "DEST"),
+        required=True,
+        help="Repository to clone; repeat for each one",
+    )
+    parser.add_argument("--jobs", type=int, default=DEFAULT_CLONE_JOBS)
+    parser.add_argument("--depth", type=int, default=None, help="Shallow clone depth")
+    parser.add_argument(
+        "--filter", dest="blob_filter", default=None, help="Partial clone filter, e.g. blob:none"
+    )
+    parser.add_argument(
+        "--seed-dir",
+        type=Path,
+        default=None,
+        help=(
+            "Directory with NAME.bundle files or NAME.git mirrors "
+            f"(default: ${SEED_DIR_ENV} or <USB mount>/git)"
+        ),
+    )
+    args = parser.parse_args(argv)
+    started = time.monotonic()
+    results = clone_all(
+        [(url, Path(dest).expanduser()) for url, dest in args.repo],
+        jobs=args.jobs,
+        depth=args.depth or None,
+        blob_filter=args.blob_filter or None,
+        seed_dir=args.seed_dir or default_seed_dir(),
+    )
+    failed = [result for result in results if result.error]
+    timings = ", ".join(_timing(result) for result in results)
+    if failed:
+        print(f"{len(failed)} of {len(results)} clones failed: {timings}", file=sys.stderr)
+        return 1
+    print(f"Repositories ready in {time.monotonic() - started:.1f}s: {timings}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,25 @@
 from __future__ import annotations
 
 import os
-import subprocess
-from dataclasses import dataclass
+import re
+from dataclasses import dataclass, field, replace
 from pathlib import Path
-from typing import List, Optional, Sequence, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple
+
+NVIDIA_VENDOR_ID = "0x10de"
+DEFAULT_USB_LABEL = "Samsung_USB"
+USB_MOUNT_ENV = "POP_SETUP_USB_MOUNT"
+PCI_IDS_PATHS = ("usr/share/misc/pci.ids", "usr/share/hwdata/pci.ids")
+# Decimal gigabytes, so a "16 GB" machine still satisfies ram_gb>=16 after
+# the kernel's reservations are taken out of MemTotal.
+BYTES_PER_GB = 1_000_000_000
+
+FLAG_FACTS = {"gpu", "usb_drive"}
+NUMERIC_FACTS = {"ram_gb", "cpu_count", "disk_free_gb"}
+LABEL_FACTS = {"usb_label"}
+_REQUIREMENT = re.compile(r"^\s*([A-Za-z_]+)\s*(?:(>=|<=|==|!=|=|>|<)\s*(.+?))?\s*$")
+_OCTAL_ESCAPE = re.compile(r"\\([0-7]{3})")
+_HEX_ESCAPE = re.compile(r"\\x([0-9a-fA-F]{2})")
 
 
 @dataclass
@@ -12,14 +27,113 @@ class HardwareState:
     has_nvidia_gpu: bool
     gpu_description: str = ""
     usb_mount: Optional[Path] = None
+    usb_label: str = ""
+    cpu_model: str = ""
+    cpu_count: int = 0
+    ram_gb: float = 0.0
+    disk_free_gb: float = 0.0
+    mount_labels: Dict[str, Path] = field(default_factory=dict)
 
     @property
     def usb_present(self) -> bool:
         return self.usb_mount is not None
 
+    def cache_token(self) -> str:
+        # Free disk space changes constantly and is left out on purpose.
+        labels = ",".join(f"{label}={path}" for label, path in sorted(self.mount_labels.items()))
+        return (
+            f"gpu={self.has_nvidia_gpu}:{self.gpu_description}"
+            f"\0usb={self.usb_mount or ''}:{self.usb_label}"
+            f"\0cpu={self.cpu_model}:{self.cpu_count}\0ram={self.ram_gb}\0labels={labels}"
+        )
+
+    def as_env(self) -> Dict[str, str]:
+        env = {
+            "POP_SETUP_NVIDIA_GPU": "1" if self.has_nvidia_gpu else "0",
+            "POP_SETUP_GPU_DESCRIPTION": self.gpu_description,
+            USB_MOUNT_ENV: str(self.usb_mount or ""),
+            "POP_SETUP_USB_LABEL": self.usb_label,
+            "POP_SETUP_CPU_MODEL": self.cpu_model,
+            "POP_SETUP_CPU_COUNT": str(self.cpu_count),
+            "POP_SETUP_RAM_GB": f"{self.ram_gb:.1f}",
+            "POP_SETUP_DISK_FREE_GB": f"{self.disk_free_gb:.1f}",
+        }
+        if self.usb_mount and "USB_DRIVE_PATH" not in os.environ:
+            env["USB_DRIVE_PATH"] = str(self.usb_mount)
+        return env
+
+
+@dataclass(frozen=True)
+class HardwareRequirement:
+    fact: str
+    op: str = ""
+    value: str = ""
+
+    @classmethod
+    def parse(cls, text: str) -> "HardwareRequirement":
+        match = _REQUIREMENT.match(str(text))
+        if not match:
+            raise ValueError(f"Invalid hardware requirement '{text}'")
+        fact, op, value = match.group(1).lower(), match.group(2) or "", match.group(3) or ""
+        if fact in FLAG_FACTS:
+            if op:
+                raise ValueError(f"Hardware requirement '{fact}' takes no comparison")
+        elif fact in NUMERIC_FACTS:
+            if not op:
+                raise ValueError(f"Hardware requirement '{fact}' needs a comparison, e.g. {fact}>=16")
+            try:
+                float(value)
+            except ValueError:
+                raise ValueError(f"Hardware requirement '{text}' needs a number") from None
+        elif fact in LABEL_FACTS:
+            if op not in {"=", "==", "!="}:
+                raise ValueError(f"Hardware requirement '{fact}' supports = and != only")
+        else:
+            raise ValueError(f"Unknown hardware fact '{fact}'")
+        return cls(fact, "=" if op == "==" else op, value)
+
+    def unmet_reason(self, state: HardwareState) -> Optional[str]:
+        if self.fact == "gpu":
+            return None if state.has_nvidia_gpu else "Skipped: NVIDIA GPU not detected"
+        if self.fact == "usb_drive":
+            return None if state.usb_present else "Skipped: required USB drive not detected"
+        if self.fact in LABEL_FACTS:
+            mounted = self.value in state.mount_labels
+            if self.op == "=" and not mounted:
+                return f"Skipped: no filesystem labelled '{self.value}' is mounted"
+            if self.op == "!=" and mounted:
+                return f"Skipped: filesystem labelled '{self.value}' is mounted"
+            return None
+        actual = float(getattr(state, self.fact))
+        expected = float(self.value)
+        passed = {
+            ">=": actual >= expected,
+            "<=": actual <= expected,
+            ">": actual > expected,
+            "<": actual < expected,
+            "=": actual == expected,
+            "!=": actual != expected,
+        }[self.op]
+        if passed:
+            return None
+        return f"Skipped: requires {self.fact}{self.op}{self.value} (found {actual:g})"
+
+
+def unmet_requirement(requirements: Sequence[str], state: HardwareState) -> Optional[str]:
+    for text in requirements:
+        reason = HardwareRequirement.parse(text).unmet_reason(state)
+        if reason:
+            return reason
+    return None
+
 
 class HardwareDetector:
-    def __init__(self, usb_candidates: Optional[Sequence[str | Path]] = None) -> None:
+    def __init__(
+        self,
+        usb_candidates: Optional[Sequence[str | Path]] = None,
+        usb_label: Optional[str] = None,
+        root: Path = Path("/"),
+    ) -> None:
         env_path = os.environ.get("USB_DRIVE_PATH")
         default_candidates: List[Path] = []
         if env_path:
@@ -37,49 +151,155 @@ class HardwareDetector:
                 continue
             seen.add(key)
             self.usb_candidates.append(resolved)
+        self.usb_label = usb_label or os.environ.get("USB_DRIVE_LABEL") or DEFAULT_USB_LABEL
+        self.root = root
+        self._cached: Optional[Tuple[tuple, HardwareState]] = None
 
     def detect(self) -> HardwareState:
-        has_gpu, description = self._detect_gpu()
-        usb_mount = self._detect_usb_mount()
-        return HardwareState(
+        # Everything comes from procfs/sysfs; nothing is forked. The parsed
+        # facts are reused until the PCI device list, the mount table or the
+        # filesystem labels change. Free disk space is always re-read.
+        mounts_text = self._read("proc/self/mounts")
+        pci_devices = self._listdir("sys/bus/pci/devices")
+        labels = self._device_labels()
+        fingerprint = (
+            mounts_text,
+            tuple(pci_devices),
+            tuple(sorted(labels.items())),
+            tuple(str(path) for path in self.usb_candidates if path.exists()),
+        )
+        if self._cached and self._cached[0] == fingerprint:
+            return replace(self._cached[1], disk_free_gb=self._disk_free_gb())
+        has_gpu, description = self._detect_gpu(pci_devices)
+        mount_labels = self._mount_labels(mounts_text, labels)
+        usb_mount = self._detect_usb_mount(mount_labels)
+        cpu_model, cpu_count = self._cpu_info()
+        state = HardwareState(
             has_nvidia_gpu=has_gpu,
             gpu_description=description,
             usb_mount=usb_mount,
+            usb_label=next(
+                (label for label, path in mount_labels.items() if path == usb_mount), ""
+            ),
+            cpu_model=cpu_model,
+            cpu_count=cpu_count,
+            ram_gb=self._ram_gb(),
+            disk_free_gb=self._disk_free_gb(),
+            mount_labels=mount_labels,
         )
+        self._cached = (fingerprint, state)
+        return state
 
-    def _detect_gpu(self) -> Tuple[bool, str]:
-        description = ""
+    def invalidate(self) -> None:
+        self._cached = None
+
+    def _path(self, relative: str) -> Path:
+        return self.root / relative
+
+    def _read(self, relative: str) -> str:
         try:
-            result = subprocess.run(
-                ["lspci"],
-                capture_output=True,
-                text=True,
-                check=False,
-            )
-            if result.returncode == 0:
-                for line in result.stdout.splitlines():
-                    if "nvidia" in line.lower():
-                        description = line.strip()
-                        return True, description
-        except FileNotFoundError:
-            pass
+            return self._path(relative).read_text(errors="replace")
+        except OSError:
+            return ""
 
+    def _listdir(self, relative: str) -> List[str]:
         try:
-            result = subprocess.run(
-                ["nvidia-smi", "-L"],
-                capture_output=True,
-                text=True,
-                check=False,
-            )
-            if result.returncode == 0 and result.stdout.strip():
-                return True, result.stdout.strip().splitlines()[0]
-        except FileNotFoundError:
+            return sorted(os.listdir(self._path(relative)))
+        except OSError:
+            return []
+
+    def _detect_gpu(self, pci_devices: Sequence[str]) -> Tuple[bool, str]:
+        for slot in pci_devices:
+            base = f"sys/bus/pci/devices/{slot}"
+            if self._read(f"{base}/vendor").strip().lower() != NVIDIA_VENDOR_ID:
+                continue
+            if not self._read(f"{base}/class").strip().startswith("0x03"):
+                continue
+            device_id = self._read(f"{base}/device").strip().lower().removeprefix("0x")
+            return True, self._gpu_name(slot, device_id)
+        return False, ""
+
+    def _gpu_name(self, slot: str, device_id: str) -> str:
+        information = self._read(f"proc/driver/nvidia/gpus/{slot}/information")
+        for line in information.splitlines():
+            key, _, value = line.partition(":")
+            if key.strip() == "Model" and value.strip():
+                return value.strip()
+        for relative in PCI_IDS_PATHS:
+            name = self._pci_ids_name(self._path(relative), device_id)
+            if name:
+                return f"NVIDIA {name}"
+        return f"NVIDIA device [10de:{device_id}] at {slot}"
+
+    @staticmethod
+    def _pci_ids_name(path: Path, device_id: str) -> str:
+        try:
+            with path.open(encoding="utf-8", errors="replace") as handle:
+                in_vendor = False
+                for line in handle:
+                    if not in_vendor:
+                        in_vendor = line.startswith("10de ")
+                        continue
+                    if not line.startswith("\t"):
+                        return ""
+                    if line.startswith(f"\t{device_id} "):
+                        return line.strip()[len(device_id):].strip()
+        except OSError:
             pass
+        return ""
+
+    def _device_labels(self) -> Dict[str, str]:
+        by_label = self._path("dev/disk/by-label")
+        labels: Dict[str, str] = {}
+        for name in self._listdir("dev/disk/by-label"):
+            label = _HEX_ESCAPE.sub(lambda m: chr(int(m.group(1), 16)), name)
+            labels[os.path.realpath(by_label / name)] = label
+        return labels
 
-        return False, description
+    def _mount_labels(self, mounts_text: str, labels: Dict[str, str]) -> Dict[str, Path]:
+        mount_labels: Dict[str, Path] = {}
+        for line in mounts_text.splitlines():
+            parts = line.split()
+            if len(parts) < 2 or not parts[0].startswith("/dev/"):
+                continue
+            device = os.path.realpath(self._path(_unescape_mount(parts[0]).lstrip("/")))
+            label = labels.get(device)
+            if label and label not in mount_labels:
+                mount_labels[label] = Path(_unescape_mount(parts[1]))
+        return mount_labels
 
-    def _detect_usb_mount(self) -> Optional[Path]:
+    def _detect_usb_mount(self, mount_labels: Dict[str, Path]) -> Optional[Path]:
         for candidate in self.usb_candidates:
             if candidate.exists():
                 return candidate
-        return None
+        return mount_labels.get(self.usb_label)
+
+    def _cpu_info(self) -> Tuple[str, int]:
+        model = ""
+        count = 0
+        for line in self._read("proc/cpuinfo").splitlines():
+            key, _, value = line.partition(":")
+            key = key.strip()
+            if key == "processor":
+                count += 1
+            elif key == "model name" and not model:
+                model = value.strip()
+        return model, count or (os.cpu_count() or 0)
+
+    def _ram_gb(self) -> float:
+        for line in self._read("proc/meminfo").splitlines():
+            if line.startswith("MemTotal:"):
+                kilobytes = int(line.split()[1])
+                return round(kilobytes * 1024 / BYTES_PER_GB, 1)
+        return 0.0
+
+    def _disk_free_gb(self) -> float:
+        try:
+            stats = os.statvfs(self.root)
+        except OSError:
+            return 0.0
+        return round(stats.f_bavail * stats.f_frsize / BYTES_PER_GB, 1)
+
+
+def _unescape_mount(field_text: str) -> str:
+    return _OCTAL_ESCAPE.sub(lambda m: chr(int(m.group(1), 8)), field_text)
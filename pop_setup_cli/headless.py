@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import argparse
+import json
+import signal
+import sys
+from dataclasses import asdict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .executor import Executor
+from .models import ExecutionResult, Script
+from .wakeup import WakeQueue
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_CANCELLED = 130
+
+
+class SignalController:
+    # SIGINT/SIGTERM become a regular "cancel" action so running steps are
+    # terminated and reported instead of the process dying mid-run.
+    def __init__(self) -> None:
+        self._actions: WakeQueue[str] = WakeQueue()
+        self._previous: Dict[int, object] = {}
+
+    def __enter__(self) -> "SignalController":
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            self._previous[signum] = signal.signal(signum, self._handle)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        for signum, handler in self._previous.items():
+            signal.signal(signum, handler)
+        self._actions.close()
+
+    def _handle(self, signum, frame) -> None:
+        self._actions.put("cancel")
+
+    def fileno(self) -> int:
+        return self._actions.fileno()
+
+    def consume_action(self) -> Optional[str]:
+        return self._actions.get_nowait()
+
+
+class EventWriter:
+    def __init__(self, json_output: bool) -> None:
+        self.json_output = json_output
+
+    def result(self, result: ExecutionResult) -> None:
+        if self.json_output:
+            self._write({"event": "result", **asdict(result)})
+            return
+        line = f"{result.status:<6} {result.script_id} [{result.phase}]"
+        message = result.message.strip().splitlines()
+        if message:
+            line += f" {message[-1]}"
+        self._print(line)
+
+    def progress(
+        self,
+        event: str,
+        index: int,
+        total: int,
+        script: Script,
+        final_status: Optional[str] = None,
+    ) -> None:
+        if event not in {"start", "progress"} or not self.json_output:
+            return
+        payload = {
+            "event": event,
+            "script_id": script.id,
+            "script_name": script.name,
+            "index": index,
+            "total": total,
+        }
+        if event == "progress":
+            payload["message"] = final_status
+        self._write(payload)
+
+    def summary(self, counts: Dict[str, int], exit_code: int) -> None:
+        if self.json_output:
+            self._write({"event": "summary", "counts": counts, "exit_code": exit_code})
+            return
+        parts = ", ".join(f"{count} {status}" for status, count in sorted(counts.items()))
+        self._print(f"Summary: {parts or 'nothing to do'}")
+
+    def _write(self, payload: dict) -> None:
+        self._print(json.dumps(payload))
+
+    @staticmethod
+    def _print(line: str) -> None:
+        sys.stdout.write(line + "\n")
+        sys.stdout.flush()
+
+
+def add_subcommands(parser: argparse.ArgumentParser) -> None:
+    subparsers = parser.add_subparsers(dest="command", metavar="COMMAND")
+    install = subparsers.add_parser("install", help="Run every step of a profile")
+    install.add_argument("--profile", required=True)
+    run = subparsers.add_parser("run", help="Run the given steps, e.g. run docker,git")
+    run.add_argument("script_ids", nargs="+", metavar="SCRIPT[,SCRIPT...]")
+    subparsers.add_parser("check", help="Run every check script")
+    subparsers.add_parser("resume", help="Continue the last interrupted run")
+    serve = subparsers.add_parser(
+        "serve", help="Keep configs loaded and accept JSON-RPC requests on a Unix socket"
+    )
+    serve.add_argument("--socket", type=Path, default=None, help="Socket path")
+    for command in (install, run, subparsers.choices["resume"]):
+        command.add_argument(
+            "--jobs",
+            "-j",
+            type=int,
+            default=argparse.SUPPRESS,
+            help="Maximum number of install steps to run at the same time",
+        )
+    for command in (install, run, subparsers.choices["check"], subparsers.choices["resume"]):
+        command.add_argument(
+            "--json",
+            action="store_true",
+            help="Emit one JSON event per line instead of plain text",
+        )
+
+
+def run_command(executor: Executor, args: argparse.Namespace) -> int:
+    if args.command == "serve":
+        from .server import serve
+
+        return serve(executor, args.socket)
+    writer = EventWriter(args.json)
+    if args.command == "check":
+        results = executor.run_all_checks(
+            result_hook=lambda result, completed, total: writer.result(result)
+        )
+        return _finish(writer, results)
+    if args.command == "install" and args.profile not in executor.profiles:
+        return _usage_error(f"Unknown profile '{args.profile}'")
+    if args.command == "run":
+        script_ids = _split_ids(args.script_ids)
+        unknown = [script_id for script_id in script_ids if script_id not in executor.scripts]
+        if unknown:
+            return _usage_error(f"Unknown script(s): {', '.join(unknown)}")
+    if args.command == "resume" and not executor.resumable_run():
+        return _usage_error("No interrupted run to resume")
+    options = dict(
+        progress_hook=writer.progress,
+        jobs=args.jobs,
+        result_hook=writer.result,
+    )
+    with SignalController() as controller:
+        if args.command == "install":
+            results = executor.run_profile(args.profile, controller=controller, **options)
+        elif args.command == "run":
+            results = executor.run_scripts(script_ids, controller=controller, **options)
+        else:
+            results = executor.resume_run(controller=controller, **options)
+    return _finish(writer, results)
+
+
+def summarize(results: Sequence[ExecutionResult]) -> Tuple[Dict[str, int], int]:
+    latest: Dict[str, ExecutionResult] = {}
+    for result in results:
+        latest[result.script_id] = result
+    counts: Dict[str, int] = {}
+    for result in latest.values():
+        counts[result.status] = counts.get(result.status, 0) + 1
+    if counts.get("CANCEL"):
+        exit_code = EXIT_CANCELLED
+    elif counts.get("FAIL"):
+        exit_code = EXIT_FAILED
+    else:
+        exit_code = EXIT_OK
+    return counts, exit_code
+
+
+def _finish(writer: EventWriter, results: Sequence[ExecutionResult]) -> int:
+    counts, exit_code = summarize(results)
+    writer.summary(counts, exit_code)
+    return exit_code
+
+
+def _split_ids(values: Sequence[str]) -> List[str]:
+    script_ids: List[str] = []
+    for value in values:
+        for script_id in value.split(","):
+            script_id = script_id.strip()
+            if script_id and script_id not in script_ids:
+                script_ids.append(script_id)
+    return script_ids
+
+
+def _usage_error(message: str) -> int:
+    print(message, file=sys.stderr)
+    return EXIT_USAGE
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field, fields
+from pathlib import Path
+from typing import IO, Dict, List, Optional, Sequence
+
+from .models import ExecutionResult
+
+FINISHED_STATUSES = {"OK", "DONE"}
+_RESULT_FIELDS = {f.name for f in fields(ExecutionResult)}
+
+
+def default_journal_path() -> Path:
+    root = os.environ.get("XDG_STATE_HOME") or "~/.local/state"
+    return Path(root).expanduser() / "pop_setup" / "journal.jsonl"
+
+
+@dataclass
+class JournalState:
+    script_ids: List[str]
+    profile_id: Optional[str] = None
+    started_at: float = 0.0
+    results: Dict[str, List[ExecutionResult]] = field(default_factory=dict)
+    # Scripts of the run that are no longer in the catalog.
+    dropped: List[str] = field(default_factory=list)
+
+    def finished(self) -> Dict[str, List[ExecutionResult]]:
+        return {
+            script_id: results
+            for script_id, results in self.results.items()
+            if results and results[-1].status in FINISHED_STATUSES
+        }
+
+    def remaining(self) -> List[str]:
+        done = self.finished()
+        return [script_id for script_id in self.script_ids if script_id not in done]
+
+
+class RunJournal:
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self.path = path or default_journal_path()
+        self._file: Optional[IO[str]] = None
+        self._lock = threading.Lock()
+
+    def begin(self, script_ids: Sequence[str], profile_id: Optional[str] = None) -> None:
+        self._open("w")
+        self._write(
+            {
+                "type": "run",
+                "profile": profile_id,
+                "scripts": list(script_ids),
+                "started_at": time.time(),
+            }
+        )
+
+    def resume(self) -> None:
+        self._open("a")
+        self._write({"type": "resume", "at": time.time()})
+
+    def record(self, result: ExecutionResult) -> None:
+        self._write({"type": "result", **asdict(result)})
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    def load(self) -> Optional[JournalState]:
+        try:
+            lines = self.path.read_text(encoding="utf-8").splitlines()
+        except OSError:
+            return None
+        state: Optional[JournalState] = None
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # A crash can leave the last line half written.
+                continue
+            kind = entry.get("type")
+            if kind == "run":
+                state = JournalState(
+                    script_ids=[str(item) for item in entry.get("scripts", [])],
+                    profile_id=entry.get("profile"),
+                    started_at=float(entry.get("started_at", 0.0)),
+                )
+            elif kind == "result" and state is not None:
+                result = ExecutionResult(
+                    **{key: value for key, value in entry.items() if key in _RESULT_FIELDS}
+                )
+                state.results.setdefault(result.script_id, []).append(result)
+        return state
+
+    def _open(self, mode: str) -> None:
+        self.close()
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = self.path.open(mode, encoding="utf-8")
+        except OSError:
+            self._file = None
+
+    def _write(self, entry: dict) -> None:
+        with self._lock:
+            if not self._file:
+                return
+            self._file.write(json.dumps(entry) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
@@ -1,26 +1,191 @@
 from __future__ import annotations
 
-from collections import deque
+import heapq
+from pathlib import Path
 from threading import Lock
-from typing import Deque, List
+from typing import Callable, Dict, List, Optional, Tuple
+
+DEFAULT_SEGMENT = "output"
+DEFAULT_BUDGET_BYTES = 8 << 20
+
+# (line index within the segment, buffer-wide sequence number, encoded line)
+_Slot = Tuple[int, int, bytes]
+
+
+class LogSegment:
+    # Fixed-size ring of encoded lines. Only the writer (holding the buffer
+    # lock) mutates it; readers walk back from the newest slot without a lock
+    # and stop at the first slot that has already been recycled.
+    def __init__(
+        self,
+        name: str,
+        capacity: int,
+        log_path: Optional[Path] = None,
+        flush: Optional[Callable[[], None]] = None,
+    ) -> None:
+        self.name = name
+        self.log_path = log_path
+        # Pushes the step log's buffered writes to disk before paging from it.
+        self.flush = flush
+        self.closed = False
+        self.bytes = 0
+        self.paged = 0
+        self._slots: List[Optional[_Slot]] = [None] * max(1, capacity)
+        self._next = 0
+        self._first = 0
+
+    @property
+    def retained(self) -> int:
+        return self._next - self._first
+
+    @property
+    def line_count(self) -> int:
+        return self._next
+
+    def entries(self, count: int) -> List[Tuple[int, bytes]]:
+        capacity = len(self._slots)
+        end = self._next
+        found: List[Tuple[int, bytes]] = []
+        for index in range(end - 1, max(end - count, 0) - 1, -1):
+            slot = self._slots[index % capacity]
+            if slot is None or slot[0] != index:
+                break
+            found.append((slot[1], slot[2]))
+        found.reverse()
+        return found
+
+    def tail(self, count: int) -> List[str]:
+        lines = [_decode(data) for _, data in self.entries(count)]
+        missing = count - len(lines)
+        if missing > 0 and self.paged and self.log_path:
+            # Lines evicted from memory are still in the step's log file,
+            # though the newest of them may still sit in its write buffer.
+            if self.flush:
+                self.flush()
+            paged = _read_logged_lines(self.log_path, self.paged)
+            lines = paged[-missing:] + lines
+        return lines
+
+    def _push(self, sequence: int, data: bytes) -> int:
+        freed = 0
+        if self.retained == len(self._slots):
+            freed = self._drop_oldest()
+        self._slots[self._next % len(self._slots)] = (self._next, sequence, data)
+        self._next += 1
+        self.bytes += len(data)
+        return len(data) - freed
+
+    def _drop_oldest(self) -> int:
+        index = self._first % len(self._slots)
+        slot = self._slots[index]
+        self._slots[index] = None
+        self._first += 1
+        self.paged += 1
+        size = len(slot[2]) if slot else 0
+        self.bytes -= size
+        return size
 
 
 class LogBuffer:
-    def __init__(self, max_lines: int = 2000) -> None:
+    def __init__(self, max_lines: int = 2000, max_bytes: int = DEFAULT_BUDGET_BYTES) -> None:
         self.max_lines = max_lines
-        self._buffer: Deque[str] = deque(maxlen=max_lines)
+        self.max_bytes = max_bytes
+        self._segments: Dict[str, LogSegment] = {}
+        self._sequence = 0
+        self._bytes = 0
         self._lock = Lock()
 
-    def append(self, line: str) -> None:
+    def open_segment(
+        self,
+        name: str,
+        log_path: Optional[Path] = None,
+        flush: Optional[Callable[[], None]] = None,
+    ) -> LogSegment:
         with self._lock:
-            self._buffer.append(line)
+            segment = self._segments.get(name)
+            if segment is None or segment.log_path != log_path:
+                if segment is not None:
+                    self._bytes -= segment.bytes
+                    del self._segments[name]
+                segment = LogSegment(name, self.max_lines, log_path)
+                self._segments[name] = segment
+            segment.flush = flush
+            segment.closed = False
+            return segment
 
-    def clear(self) -> None:
+    def close_segment(self, name: str) -> None:
+        segment = self._segments.get(name)
+        if segment is not None:
+            segment.closed = True
+
+    def append(self, line: str, segment: str = DEFAULT_SEGMENT) -> None:
+        data = line.encode("utf-8", errors="replace")
         with self._lock:
-            self._buffer.clear()
+            target = self._segments.get(segment)
+            if target is None:
+                target = self._segments[segment] = LogSegment(segment, self.max_lines)
+            self._bytes += target._push(self._sequence, data)
+            self._sequence += 1
+            while self._bytes > self.max_bytes and self._evict(target):
+                pass
 
-    def tail(self, count: int = 50) -> List[str]:
+    def clear(self) -> None:
         with self._lock:
-            if count <= 0:
-                return []
-            return list(self._buffer)[-count:]
+            self._segments = {}
+            self._bytes = 0
+
+    @property
+    def line_count(self) -> int:
+        return self._sequence
+
+    def segments(self) -> List[LogSegment]:
+        return list(self._segments.values())
+
+    def segment(self, name: str) -> Optional[LogSegment]:
+        return self._segments.get(name)
+
+    def tail(self, count: int = 50, segment: Optional[str] = None) -> List[str]:
+        if count <= 0:
+            return []
+        if segment is not None:
+            target = self._segments.get(segment)
+            return target.tail(count) if target else []
+        newest = heapq.merge(*(part.entries(count) for part in self.segments()))
+        return [_decode(data) for _, data in list(newest)[-count:]]
+
+    def _evict(self, writing: LogSegment) -> bool:
+        # Finished segments are paged out first, oldest first; after that the
+        # biggest running segment gives up its oldest lines.
+        candidates = [part for part in self._segments.values() if part.retained]
+        closed = [part for part in candidates if part.closed]
+        if closed:
+            victim = closed[0]
+        elif candidates:
+            victim = max(candidates, key=lambda part: part.bytes)
+        else:
+            return False
+        if victim is writing and victim.retained <= 1:
+            return False
+        self._bytes -= victim._drop_oldest()
+        return True
+
+
+def _decode(data: bytes) -> str:
+    return data.decode("utf-8", errors="replace")
+
+
+def _read_logged_lines(log_path: Path, count: int) -> List[str]:
+    # Captured stdout lines are written as "HH:MM:SS.mmm [out] text"; return
+    # the first `count` of them, which are the ones no longer held in memory.
+    lines: List[str] = []
+    try:
+        with log_path.open(encoding="utf-8", errors="replace") as handle:
+            for raw in handle:
+                stamp, marker, text = raw.partition(" [out] ")
+                if marker and len(stamp) == 12:
+                    lines.append(text.rstrip("\n"))
+                    if len(lines) >= count:
+                        break
+    except OSError:
+        return []
+    return lines
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import json
+import os
+import socket
+import subprocess
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from .models import ExecutionResult
+
+REAP_POLL_SECONDS = 0.001
+REAP_POLL_MAX_SECONDS = 0.05
+_PROM_ESCAPES = str.maketrans({"\\": "\\\\", '"': '\\"', "\n": "\\n"})
+
+
+@dataclass
+class ResourceUsage:
+    wall_seconds: float
+    user_seconds: float = 0.0
+    system_seconds: float = 0.0
+    max_rss_kb: int = 0
+
+    @classmethod
+    def from_rusage(cls, wall_seconds: float, rusage) -> "ResourceUsage":
+        if rusage is None:
+            return cls(wall_seconds)
+        # ru_maxrss is in kilobytes on Linux and covers the largest process
+        # in the child's tree that was waited for.
+        return cls(wall_seconds, rusage.ru_utime, rusage.ru_stime, rusage.ru_maxrss)
+
+    def apply(self, result: ExecutionResult) -> ExecutionResult:
+        result.wall_seconds = round(self.wall_seconds, 3)
+        result.user_seconds = round(self.user_seconds, 3)
+        result.system_seconds = round(self.system_seconds, 3)
+        result.max_rss_kb = self.max_rss_kb
+        return result
+
+
+def reap(process: subprocess.Popen, block: bool = True):
+    # Reaps the child with wait4() instead of Popen.wait()/poll(), which use
+    # waitpid() and discard the rusage. Returns None if the child is still
+    # running or was already reaped.
+    if process.returncode is not None:
+        return None
+    try:
+        pid, status, rusage = os.wait4(process.pid, 0 if block else os.WNOHANG)
+    except ChildProcessError:
+        process.wait()
+        return None
+    if pid == 0:
+        return None
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return rusage
+
+
+def reap_within(process: subprocess.Popen, timeout: float):
+    # A child that just closed its pipes is usually gone within a millisecond,
+    # so polling starts fast and backs off for ones that linger.
+    deadline = time.monotonic() + timeout
+    interval = REAP_POLL_SECONDS
+    while True:
+        rusage = reap(process, block=False)
+        if rusage is not None or process.returncode is not None:
+            return rusage
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        time.sleep(min(interval, remaining))
+        interval = min(interval * 2, REAP_POLL_MAX_SECONDS)
+
+
+def build_report(results: Sequence[ExecutionResult]) -> Dict[str, object]:
+    steps = [asdict(result) for result in results]
+    measured = [result for result in results if result.wall_seconds is not None]
+    return {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "host": socket.gethostname(),
+        "steps": steps,
+        "totals": {
+            "wall_seconds": round(sum(r.wall_seconds or 0.0 for r in measured), 3),
+            "user_seconds": round(sum(r.user_seconds or 0.0 for r in measured), 3),
+            "system_seconds": round(sum(r.system_seconds or 0.0 for r in measured), 3),
+            "max_rss_kb": max((r.max_rss_kb or 0 for r in measured), default=0),
+        },
+    }
+
+
+def prometheus_text(results: Sequence[ExecutionResult]) -> str:
+    samples: Dict[str, List[str]] = {
+        "pop_setup_step_wall_seconds": [],
+        "pop_setup_step_cpu_seconds": [],
+        "pop_setup_step_max_rss_bytes": [],
+    }
+    for result in results:
+        if result.wall_seconds is None:
+            continue
+        labels = (
+            f'script="{_label(result.script_id)}",phase="{_label(result.phase)}",'
+            f'status="{_label(result.status)}"'
+        )
+        samples["pop_setup_step_wall_seconds"].append(f"{{{labels}}} {result.wall_seconds}")
+        samples["pop_setup_step_cpu_seconds"].append(
+            f'{{{labels},mode="user"}} {result.user_seconds or 0.0}'
+        )
+        samples["pop_setup_step_cpu_seconds"].append(
+            f'{{{labels},mode="system"}} {result.system_seconds or 0.0}'
+        )
+        samples["pop_setup_step_max_rss_bytes"].append(
+            f"{{{labels}}} {(result.max_rss_kb or 0) * 1024}"
+        )
+    help_text = {
+        "pop_setup_step_wall_seconds": "Wall-clock time of a Pop Setup step phase.",
+        "pop_setup_step_cpu_seconds": "CPU time of a step phase's process tree.",
+        "pop_setup_step_max_rss_bytes": "Peak resident set size of a step phase's process tree.",
+    }
+    lines: List[str] = []
+    for name, values in samples.items():
+        lines.append(f"# HELP {name} {help_text[name]}")
+        lines.append(f"# TYPE {name} gauge")
+        lines.extend(f"{name}{value}" for value in values)
+    lines.append("# HELP pop_setup_last_run_timestamp_seconds When the report was written.")
+    lines.append("# TYPE pop_setup_last_run_timestamp_seconds gauge")
+    lines.append(f"pop_setup_last_run_timestamp_seconds {time.time():.0f}")
+    return "\n".join(lines) + "\n"
+
+
+def write_reports(
+    results: Sequence[ExecutionResult],
+    json_path: Optional[Path] = None,
+    textfile_path: Optional[Path] = None,
+) -> None:
+    if json_path:
+        _write_atomic(json_path, json.dumps(build_report(results), indent=2) + "\n")
+    if textfile_path:
+        # node_exporter's textfile collector may read at any moment, so the
+        # file is replaced in one rename.
+        _write_atomic(textfile_path, prometheus_text(results))
+
+
+def _label(value: str) -> str:
+    return value.translate(_PROM_ESCAPES)
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        tmp_path.write_text(text, encoding="utf-8")
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
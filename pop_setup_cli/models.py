@@ -1,5 +1,5 @@
 from dataclasses import dataclass, field
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 
 @dataclass
@@ -10,6 +10,12 @@ class Script:
     script_path: str
     check_path: Optional[str] = None
     hardware: List[str] = field(default_factory=list)
+    depends_on: List[str] = field(default_factory=list)
+    resources: List[str] = field(default_factory=list)
+    check_timeout: Optional[float] = None
+    apt_packages: List[str] = field(default_factory=list)
+    flatpak_packages: List[str] = field(default_factory=list)
+    checks: List[Dict[str, Any]] = field(default_factory=list)
 
 
 @dataclass
@@ -26,3 +32,8 @@ class ExecutionResult:
     phase: str
     status: str
     message: str = ""
+    log_path: Optional[str] = None
+    wall_seconds: Optional[float] = None
+    user_seconds: Optional[float] = None
+    system_seconds: Optional[float] = None
+    max_rss_kb: Optional[int] = None
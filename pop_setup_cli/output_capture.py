@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import IO, Deque, Dict, List, Optional
+
+from .log_buffer import DEFAULT_SEGMENT, LogBuffer
+
+SUMMARY_LINES = 5
+LOG_RUNS_KEPT = 20
+# Output with no line break for this long is emitted as a line of its own.
+PARTIAL_LINE_CAP = 64 << 10
+
+
+def default_log_root() -> Path:
+    root = os.environ.get("XDG_STATE_HOME") or "~/.local/state"
+    return Path(root).expanduser() / "pop_setup" / "logs"
+
+
+def new_run_log_dir(root: Path) -> Optional[Path]:
+    try:
+        root.mkdir(parents=True, exist_ok=True)
+        run_dir = Path(
+            tempfile.mkdtemp(prefix=time.strftime("%Y%m%d-%H%M%S-"), dir=root)
+        )
+    except OSError:
+        return None
+    older = sorted(path for path in root.iterdir() if path.is_dir() and path != run_dir)
+    for stale in older[: max(0, len(older) - (LOG_RUNS_KEPT - 1))]:
+        shutil.rmtree(stale, ignore_errors=True)
+    return run_dir
+
+
+class OutputCapture:
+    def __init__(
+        self,
+        log_path: Optional[Path] = None,
+        log_buffer: Optional[LogBuffer] = None,
+    ) -> None:
+        self.log_buffer = log_buffer
+        self.log_path: Optional[Path] = None
+        self.line_count = 0
+        self.byte_count = 0
+        self._file: Optional[IO[str]] = None
+        # The log buffer may flush the file from a reader thread.
+        self._file_lock = threading.Lock()
+        self._partial: Dict[str, bytearray] = {"out": bytearray(), "err": bytearray()}
+        self._tails: Dict[str, Deque[str]] = {
+            "out": deque(maxlen=SUMMARY_LINES),
+            "err": deque(maxlen=SUMMARY_LINES),
+        }
+        if log_path:
+            try:
+                log_path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = log_path.open("w", encoding="utf-8")
+                self.log_path = log_path
+            except OSError:
+                self._file = None
+        self.segment = log_path.stem if log_path else DEFAULT_SEGMENT
+        if log_buffer:
+            log_buffer.open_segment(self.segment, self.log_path, self._flush_log)
+
+    def feed(self, stream: str, chunk: bytes) -> None:
+        self.byte_count += len(chunk)
+        pending = self._partial[stream]
+        if b"\n" not in chunk and b"\r" not in chunk and not pending.endswith(b"\r"):
+            # Appending in place keeps output without line breaks linear.
+            pending += chunk
+            if len(pending) >= PARTIAL_LINE_CAP:
+                self._emit(stream, bytes(pending))
+                pending.clear()
+            return
+        data = (bytes(pending) + chunk).replace(b"\r\n", b"\n")
+        # A lone \r (wget/curl/apt progress bars) ends a line as well. A
+        # trailing one is held back in case the next chunk starts with \n.
+        held = data.endswith(b"\r")
+        if held:
+            data = data[:-1]
+        *lines, rest = data.replace(b"\r", b"\n").split(b"\n")
+        for line in lines:
+            self._emit(stream, line)
+        pending[:] = rest + b"\r" if held else rest
+        if len(pending) >= PARTIAL_LINE_CAP:
+            self._emit(stream, bytes(pending))
+            pending.clear()
+
+    def close(self) -> None:
+        for stream, rest in self._partial.items():
+            if rest:
+                self._emit(stream, bytes(rest))
+                rest.clear()
+        with self._file_lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+        if self.log_buffer:
+            self.log_buffer.close_segment(self.segment)
+
+    def tail(self, stream: str) -> List[str]:
+        return list(self._tails[stream])
+
+    def summary(self, failed: bool) -> str:
+        if failed:
+            lines = self.tail("err") or self.tail("out")
+            return "\n".join(lines)
+        return "\n".join(self.tail("out")[-1:]) or "Completed"
+
+    def _emit(self, stream: str, raw: bytes) -> None:
+        line = raw.decode("utf-8", errors="replace").rstrip("\r")
+        self.line_count += 1
+        if line.strip():
+            self._tails[stream].append(line)
+        # Written to the file first, so any line the buffer evicts is already
+        # in the log (at worst in its write buffer, see _flush_log).
+        with self._file_lock:
+            if self._file:
+                now = time.time()
+                stamp = time.strftime("%H:%M:%S", time.localtime(now))
+                self._file.write(f"{stamp}.{int(now * 1000) % 1000:03d} [{stream}] {line}\n")
+        if stream == "out" and self.log_buffer:
+            self.log_buffer.append(line, self.segment)
+
+    def _flush_log(self) -> None:
+        with self._file_lock:
+            if self._file:
+                try:
+                    self._file.flush()
+                except OSError:
+                    pass
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import shutil
+import subprocess
+from dataclasses import dataclass, field
+from typing import Dict, List, Sequence, Set
+
+from .models import Script
+
+FLATHUB_URL = "https://flathub.org/repo/flathub.flatpakrepo"
+READY_ENV = "POP_SETUP_PACKAGES_READY"
+# apt-get waits this long for a dpkg lock held outside Pop Setup (e.g.
+# unattended-upgrades) instead of failing straight away.
+APT_LOCK_TIMEOUT = 600
+
+
+@dataclass
+class PackagePlan:
+    apt: Dict[str, List[str]] = field(default_factory=dict)
+    flatpak: Dict[str, List[str]] = field(default_factory=dict)
+
+    @classmethod
+    def for_scripts(cls, scripts: Sequence[Script]) -> "PackagePlan":
+        plan = cls()
+        for script in scripts:
+            for package in script.apt_packages:
+                plan.apt.setdefault(package, []).append(script.id)
+            for app in script.flatpak_packages:
+                plan.flatpak.setdefault(app, []).append(script.id)
+        return plan
+
+    def __bool__(self) -> bool:
+        return bool(self.apt or self.flatpak)
+
+
+def apt_available() -> bool:
+    return shutil.which("apt-get") is not None and shutil.which("dpkg-query") is not None
+
+
+def flatpak_available() -> bool:
+    return shutil.which("flatpak") is not None
+
+
+def installed_apt_packages(packages: Sequence[str]) -> Set[str]:
+    if not packages:
+        return set()
+    try:
+        result = subprocess.run(
+            ["dpkg-query", "-W", "-f=${Package}\t${db:Status-Abbrev}\n", *packages],
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+    except FileNotFoundError:
+        return set()
+    installed: Set[str] = set()
+    for line in result.stdout.splitlines():
+        name, _, status = line.partition("\t")
+        if status.startswith("ii"):
+            installed.add(name.split(":", 1)[0])
+    return installed
+
+
+def installed_flatpak_apps(apps: Sequence[str]) -> Set[str]:
+    if not apps:
+        return set()
+    try:
+        result = subprocess.run(
+            ["flatpak", "list", "--system", "--app", "--columns=application"],
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+    except FileNotFoundError:
+        return set()
+    listed = {line.strip() for line in result.stdout.splitlines()}
+    return {app for app in apps if app in listed}
+
+
+def apt_get_command(args: Sequence[str]) -> List[str]:
+    return [
+        "sudo",
+        "DEBIAN_FRONTEND=noninteractive",
+        "apt-get",
+        "-o",
+        f"DPkg::Lock::Timeout={APT_LOCK_TIMEOUT}",
+        *args,
+    ]
+
+
+def apt_update_command() -> List[str]:
+    return apt_get_command(["update"])
+
+
+def apt_install_command(packages: Sequence[str]) -> List[str]:
+    return apt_get_command(["install", "-y", *packages])
+
+
+def flatpak_remote_command() -> List[str]:
+    return [
+        "sudo",
+        "flatpak",
+        "remote-add",
+        "--system",
+        "--if-not-exists",
+        "flathub",
+        FLATHUB_URL,
+    ]
+
+
+def flatpak_install_command(apps: Sequence[str]) -> List[str]:
+    return [
+        "sudo",
+        "flatpak",
+        "install",
+        "--system",
+        "--noninteractive",
+        "-y",
+        "flathub",
+        *apps,
+    ]
@@ -0,0 +1,452 @@
+from __future__ import annotations
+
+import json
+import os
+import queue
+import signal
+import socket
+import socketserver
+import sys
+import threading
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from .executor import Executor
+from .headless import summarize
+from .log_buffer import DEFAULT_SEGMENT, LogBuffer
+from .models import ExecutionResult, Script
+from .wakeup import WakeQueue
+
+OUTBOX_LIMIT = 10000
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+SERVER_ERROR = -32000
+
+
+def default_socket_path() -> Path:
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime:
+        return Path(runtime) / "pop_setup.sock"
+    root = os.environ.get("XDG_STATE_HOME") or "~/.local/state"
+    return Path(root).expanduser() / "pop_setup" / "pop_setup.sock"
+
+
+class RpcError(Exception):
+    def __init__(self, code: int, message: str) -> None:
+        super().__init__(message)
+        self.code = code
+
+
+class _RunControl:
+    def __init__(self) -> None:
+        self._actions: WakeQueue[str] = WakeQueue()
+
+    def request(self, action: str) -> None:
+        self._actions.put(action)
+
+    def fileno(self) -> int:
+        return self._actions.fileno()
+
+    def consume_action(self) -> Optional[str]:
+        return self._actions.get_nowait()
+
+    def close(self) -> None:
+        self._actions.close()
+
+
+class _BroadcastLogBuffer(LogBuffer):
+    def __init__(self, on_line: Callable[[str, str], None]) -> None:
+        super().__init__()
+        self._on_line = on_line
+
+    def append(self, line: str, segment: str = DEFAULT_SEGMENT) -> None:
+        super().append(line, segment)
+        self._on_line(line, segment)
+
+
+@dataclass
+class _Run:
+    run_id: int
+    kind: str
+    script_ids: List[str]
+    profile_id: Optional[str] = None
+    control: _RunControl = field(default_factory=_RunControl)
+    thread: Optional[threading.Thread] = None
+    results: List[ExecutionResult] = field(default_factory=list)
+    running: List[str] = field(default_factory=list)
+    finished: bool = False
+    exit_code: Optional[int] = None
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "run_id": self.run_id,
+            "kind": self.kind,
+            "profile": self.profile_id,
+            "scripts": self.script_ids,
+            "running": list(self.running),
+            "finished": self.finished,
+            "exit_code": self.exit_code,
+        }
+
+
+class _Client:
+    # Each client gets its own outbox and writer thread, so a slow reader can
+    # only ever drop its own events and never stalls the run.
+    def __init__(self, wfile) -> None:
+        self.wfile = wfile
+        self.logs = False
+        self.subscribed = False
+        self.dropped = 0
+        self._outbox: "queue.Queue[Optional[str]]" = queue.Queue(maxsize=OUTBOX_LIMIT)
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def send(self, payload: Dict[str, Any]) -> None:
+        try:
+            self._outbox.put_nowait(json.dumps(payload) + "\n")
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self) -> None:
+        try:
+            self._outbox.put(None, timeout=1)
+        except queue.Full:
+            pass
+        self._writer.join(timeout=1)
+
+    def _write_loop(self) -> None:
+        while True:
+            line = self._outbox.get()
+            if line is None:
+                return
+            try:
+                self.wfile.write(line.encode())
+                self.wfile.flush()
+            except OSError:
+                return
+
+
+class ControlServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, executor: Executor, socket_path: Path) -> None:
+        self.executor = executor
+        self.socket_path = socket_path
+        self._lock = threading.Lock()
+        self._clients: Set[_Client] = set()
+        self._run: Optional[_Run] = None
+        self._run_count = 0
+        # A status sweep shares the executor with runs, so the two (and two
+        # sweeps) never overlap.
+        self._checking = False
+        self._methods: Dict[str, Callable[[_Client, Dict[str, Any]], Any]] = {
+            "run": self._rpc_run,
+            "check": self._rpc_check,
+            "skip": self._rpc_skip,
+            "cancel": self._rpc_cancel,
+            "subscribe": self._rpc_subscribe,
+            "unsubscribe": self._rpc_unsubscribe,
+            "status": self._rpc_status,
+        }
+        _remove_stale_socket(socket_path)
+        socket_path.parent.mkdir(parents=True, exist_ok=True)
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(str(socket_path), _RpcHandler)
+        finally:
+            os.umask(old_umask)
+
+    def server_close(self) -> None:
+        super().server_close()
+        try:
+            self.socket_path.unlink()
+        except OSError:
+            pass
+
+    def attach(self, client: _Client) -> None:
+        with self._lock:
+            self._clients.add(client)
+
+    def detach(self, client: _Client) -> None:
+        with self._lock:
+            self._clients.discard(client)
+        client.close()
+
+    def dispatch(self, client: _Client, line: bytes) -> None:
+        try:
+            request = json.loads(line)
+        except ValueError:
+            client.send(_error(None, PARSE_ERROR, "Parse error"))
+            return
+        if not isinstance(request, dict) or not isinstance(request.get("method"), str):
+            client.send(_error(None, INVALID_REQUEST, "Invalid request"))
+            return
+        request_id = request.get("id")
+        handler = self._methods.get(request["method"])
+        if handler is None:
+            client.send(_error(request_id, METHOD_NOT_FOUND, f"Unknown method '{request['method']}'"))
+            return
+        params = request.get("params") or {}
+        if not isinstance(params, dict):
+            client.send(_error(request_id, INVALID_PARAMS, "params must be an object"))
+            return
+        try:
+            result = handler(client, params)
+        except RpcError as exc:
+            client.send(_error(request_id, exc.code, str(exc)))
+            return
+        except ValueError as exc:
+            client.send(_error(request_id, SERVER_ERROR, str(exc)))
+            return
+        if request_id is not None:
+            client.send({"jsonrpc": "2.0", "id": request_id, "result": result})
+
+    def shutdown_run(self, timeout: float = 10.0) -> None:
+        with self._lock:
+            run = self._run
+        if run and not run.finished:
+            run.control.request("cancel")
+            if run.thread:
+                run.thread.join(timeout)
+
+    def _broadcast(self, event: Dict[str, Any], logs: bool = False) -> None:
+        payload = {"jsonrpc": "2.0", "method": "event", "params": event}
+        with self._lock:
+            clients = [
+                client
+                for client in self._clients
+                if client.subscribed and (client.logs or not logs)
+            ]
+        for client in clients:
+            client.send(payload)
+
+    def _start_run(
+        self,
+        kind: str,
+        script_ids: List[str],
+        params: Dict[str, Any],
+        profile_id: Optional[str] = None,
+    ) -> _Run:
+        with self._lock:
+            self._ensure_idle()
+            self._run_count += 1
+            run = _Run(self._run_count, kind, script_ids, profile_id)
+            self._run = run
+        run.thread = threading.Thread(
+            target=self._execute, args=(run, params.get("jobs")), daemon=True
+        )
+        run.thread.start()
+        return run
+
+    def _ensure_idle(self) -> None:
+        # Called with self._lock held.
+        if self._run and not self._run.finished:
+            raise RpcError(SERVER_ERROR, f"Run {self._run.run_id} is still in progress")
+        if self._checking:
+            raise RpcError(SERVER_ERROR, "A check sweep is still in progress")
+
+    def _execute(self, run: _Run, jobs: Optional[int]) -> None:
+        def on_progress(
+            event: str,
+            index: int,
+            total: int,
+            script: Script,
+            final_status: Optional[str] = None,
+        ) -> None:
+            if event == "start":
+                run.running.append(script.id)
+            elif event != "progress" and script.id in run.running:
+                run.running.remove(script.id)
+            self._broadcast(
+                {
+                    "event": event,
+                    "run_id": run.run_id,
+                    "script_id": script.id,
+                    "script_name": script.name,
+                    "index": index,
+                    "total": total,
+                    "status": final_status,
+                }
+            )
+
+        def on_result(result: ExecutionResult) -> None:
+            run.results.append(result)
+            self._broadcast({"event": "result", "run_id": run.run_id, **asdict(result)})
+
+        def on_line(line: str, segment: str) -> None:
+            self._broadcast(
+                {"event": "log", "run_id": run.run_id, "segment": segment, "line": line},
+                logs=True,
+            )
+
+        executor = self.executor
+        options = dict(
+            progress_hook=on_progress,
+            controller=run.control,
+            log_buffer=_BroadcastLogBuffer(on_line),
+            jobs=jobs,
+            result_hook=on_result,
+        )
+        error: Optional[str] = None
+        try:
+            executor.refresh_hardware_state()
+            if run.kind == "resume":
+                executor.resume_run(**options)
+            elif run.profile_id:
+                executor.run_profile(run.profile_id, **options)
+            else:
+                executor.run_scripts(run.script_ids, **options)
+        except Exception as exc:
+            error = str(exc)
+        counts, run.exit_code = summarize(run.results)
+        run.running.clear()
+        run.finished = True
+        run.control.close()
+        self._broadcast(
+            {
+                "event": "finished",
+                "run_id": run.run_id,
+                "counts": counts,
+                "exit_code": run.exit_code,
+                "error": error,
+            }
+        )
+
+    def _rpc_run(self, client: _Client, params: Dict[str, Any]) -> Dict[str, Any]:
+        jobs = params.get("jobs")
+        if jobs is not None and (not isinstance(jobs, int) or jobs < 1):
+            raise RpcError(INVALID_PARAMS, "jobs must be a positive integer")
+        if params.get("resume"):
+            state = self.executor.resumable_run()
+            if not state:
+                raise RpcError(SERVER_ERROR, "No interrupted run to resume")
+            return self._start_run(
+                "resume", state.script_ids, params, state.profile_id
+            ).describe()
+        profile_id = params.get("profile")
+        script_ids = params.get("scripts")
+        if profile_id is not None:
+            profile = self.executor.profiles.get(str(profile_id))
+            if not profile:
+                raise RpcError(INVALID_PARAMS, f"Unknown profile '{profile_id}'")
+            profile_id, script_ids = profile.id, profile.scripts
+        if not isinstance(script_ids, list) or not script_ids:
+            raise RpcError(INVALID_PARAMS, "Pass a profile, a list of scripts or resume")
+        if not all(isinstance(sid, str) for sid in script_ids):
+            raise RpcError(INVALID_PARAMS, "scripts must be a list of script ids")
+        unknown = [sid for sid in script_ids if sid not in self.executor.scripts]
+        if unknown:
+            raise RpcError(INVALID_PARAMS, f"Unknown script(s): {', '.join(unknown)}")
+        return self._start_run("install", list(script_ids), params, profile_id).describe()
+
+    def _rpc_check(self, client: _Client, params: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            self._ensure_idle()
+            self._checking = True
+        try:
+            self.executor.refresh_hardware_state()
+            results = self.executor.run_all_checks(
+                result_hook=lambda result, completed, total: self._broadcast(
+                    {"event": "check", "completed": completed, "total": total, **asdict(result)}
+                )
+            )
+        finally:
+            with self._lock:
+                self._checking = False
+        counts, exit_code = summarize(results)
+        return {
+            "results": [asdict(result) for result in results],
+            "counts": counts,
+            "exit_code": exit_code,
+        }
+
+    def _rpc_skip(self, client: _Client, params: Dict[str, Any]) -> Dict[str, Any]:
+        return self._control("skip")
+
+    def _rpc_cancel(self, client: _Client, params: Dict[str, Any]) -> Dict[str, Any]:
+        return self._control("cancel")
+
+    def _control(self, action: str) -> Dict[str, Any]:
+        with self._lock:
+            run = self._run
+        if not run or run.finished:
+            raise RpcError(SERVER_ERROR, "No run in progress")
+        run.control.request(action)
+        return run.describe()
+
+    def _rpc_subscribe(self, client: _Client, params: Dict[str, Any]) -> Dict[str, Any]:
+        client.logs = bool(params.get("logs", True))
+        client.subscribed = True
+        return self._rpc_status(client, params)
+
+    def _rpc_unsubscribe(self, client: _Client, params: Dict[str, Any]) -> Dict[str, Any]:
+        client.subscribed = False
+        return {"dropped": client.dropped}
+
+    def _rpc_status(self, client: _Client, params: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            run = self._run
+        if not run:
+            return {"run": None, "results": []}
+        return {
+            "run": run.describe(),
+            "results": [asdict(result) for result in list(run.results)],
+        }
+
+
+class _RpcHandler(socketserver.StreamRequestHandler):
+    server: ControlServer
+
+    def handle(self) -> None:
+        client = _Client(self.wfile)
+        self.server.attach(client)
+        try:
+            for line in self.rfile:
+                if line.strip():
+                    self.server.dispatch(client, line)
+        except OSError:
+            pass
+        finally:
+            self.server.detach(client)
+
+
+def _error(request_id: Any, code: int, message: str) -> Dict[str, Any]:
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+
+def _remove_stale_socket(path: Path) -> None:
+    if not path.exists():
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(str(path))
+    except OSError:
+        path.unlink()
+        return
+    finally:
+        probe.close()
+    raise RpcError(SERVER_ERROR, f"Another server is already listening on {path}")
+
+
+def serve(executor: Executor, socket_path: Optional[Path] = None) -> int:
+    path = socket_path or default_socket_path()
+    try:
+        server = ControlServer(executor, path)
+    except (RpcError, OSError) as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    previous = signal.signal(signal.SIGTERM, signal.default_int_handler)
+    print(f"Listening on {path}", file=sys.stderr, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+        server.shutdown_run()
+        server.server_close()
+    return 0
@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import os
+import shutil
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+DPKG_STATUS = Path("/var/lib/dpkg/status")
+FLATPAK_SYSTEM_DIR = Path("/var/lib/flatpak")
+TARGET_KINDS = ("command", "package", "flatpak", "file", "directory", "path")
+
+
+@dataclass
+class CheckSpec:
+    kind: str
+    target: str = ""
+    contains: Optional[str] = None
+    alternatives: List["CheckSpec"] = field(default_factory=list)
+
+    @classmethod
+    def parse(cls, entry) -> "CheckSpec":
+        if not isinstance(entry, dict):
+            raise ValueError(
+                f"Invalid check '{entry}': expected a mapping such as {{command: git}}"
+            )
+        if "any" in entry:
+            options = entry["any"]
+            if not isinstance(options, list) or not options or len(entry) != 1:
+                raise ValueError("Check 'any' needs a non-empty list and no other keys")
+            return cls("any", alternatives=[cls.parse(option) for option in options])
+        kinds = [kind for kind in TARGET_KINDS if kind in entry]
+        if len(kinds) != 1:
+            raise ValueError(
+                f"Check {entry} needs exactly one of: {', '.join(TARGET_KINDS)} or any"
+            )
+        kind = kinds[0]
+        unknown = set(entry) - {kind, "contains"}
+        if unknown:
+            raise ValueError(f"Check {entry} has unknown keys: {', '.join(sorted(unknown))}")
+        if "contains" in entry and kind != "file":
+            raise ValueError(f"Check {entry}: 'contains' only applies to file checks")
+        target = str(entry[kind] or "").strip()
+        if not target:
+            raise ValueError(f"Check {entry} has an empty {kind}")
+        contains = entry.get("contains")
+        return cls(kind, target, None if contains is None else str(contains))
+
+
+class SystemIndex:
+    # PATH, dpkg and flatpak lookups shared by every declarative check in a
+    # run. Each index is built on first use, from a directory listing or one
+    # read of the dpkg status file, so a whole status sweep needs no
+    # subprocesses. Call reset() once something may have been installed.
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._commands: Optional[Dict[str, str]] = None
+        self._packages: Optional[Dict[str, str]] = None
+        self._flatpaks: Optional[Set[str]] = None
+
+    def reset(self) -> None:
+        with self._lock:
+            self._commands = self._packages = self._flatpaks = None
+
+    def command(self, name: str) -> Optional[str]:
+        if os.sep in name:
+            return name if os.access(name, os.X_OK) else None
+        with self._lock:
+            if self._commands is None:
+                self._commands = _index_path()
+            found = self._commands.get(name)
+        if found and os.access(found, os.X_OK):
+            return found
+        # A non-executable file shadows a later one on PATH; let which() decide.
+        return shutil.which(name) if found else None
+
+    def package_version(self, name: str) -> Optional[str]:
+        with self._lock:
+            if self._packages is None:
+                self._packages = _index_dpkg(DPKG_STATUS)
+            return self._packages.get(name)
+
+    def flatpak_installed(self, app_id: str) -> bool:
+        with self._lock:
+            if self._flatpaks is None:
+                self._flatpaks = _index_flatpaks()
+            return app_id in self._flatpaks
+
+    def evaluate(self, spec: CheckSpec) -> Tuple[bool, str]:
+        if spec.kind == "any":
+            failures: List[str] = []
+            for option in spec.alternatives:
+                passed, message = self.evaluate(option)
+                if passed:
+                    return True, message
+                failures.append(message)
+            return False, " and ".join(failures)
+        if spec.kind == "command":
+            found = self.command(spec.target)
+            if found:
+                return True, f"{spec.target} found at {found}"
+            return False, f"{spec.target} not found"
+        if spec.kind == "package":
+            version = self.package_version(spec.target)
+            if version:
+                return True, f"{spec.target} {version} installed"
+            return False, f"package {spec.target} not installed"
+        if spec.kind == "flatpak":
+            if self.flatpak_installed(spec.target):
+                return True, f"{spec.target} installed"
+            return False, f"Flatpak app {spec.target} not installed"
+        path = Path(os.path.expandvars(spec.target)).expanduser()
+        exists = {
+            "file": path.is_file,
+            "directory": path.is_dir,
+            "path": path.exists,
+        }[spec.kind]()
+        if not exists:
+            return False, f"Missing {spec.kind}: {path}"
+        if spec.contains is not None:
+            try:
+                with path.open(encoding="utf-8", errors="replace") as handle:
+                    found = any(spec.contains in line for line in handle)
+            except OSError as exc:
+                return False, f"Unable to read {path}: {exc.strerror}"
+            if not found:
+                return False, f"'{spec.contains}' not found in {path}"
+        return True, f"{path} present"
+
+
+def evaluate_checks(index: SystemIndex, entries: List[dict]) -> Tuple[bool, str]:
+    # Every entry must pass; the message of the first failure is returned,
+    # or all the passing messages when everything is in place.
+    messages: List[str] = []
+    for entry in entries:
+        passed, message = index.evaluate(CheckSpec.parse(entry))
+        if not passed:
+            return False, message
+        messages.append(message)
+    return True, "; ".join(messages)
+
+
+def _index_path() -> Dict[str, str]:
+    commands: Dict[str, str] = {}
+    for directory in os.environ.get("PATH", os.defpath).split(os.pathsep):
+        try:
+            entries = os.scandir(directory or ".")
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                commands.setdefault(entry.name, entry.path)
+    return commands
+
+
+def _index_dpkg(status_path: Path) -> Dict[str, str]:
+    # Package name -> version for every stanza whose status is
+    # "install ok installed"; multi-arch copies share a name.
+    packages: Dict[str, str] = {}
+    name = version = status = ""
+    try:
+        handle = status_path.open(encoding="utf-8", errors="replace")
+    except OSError:
+        return packages
+    with handle:
+        for line in handle:
+            if line == "\n":
+                if name and status == "install ok installed":
+                    packages[name] = version
+                name = version = status = ""
+            elif line.startswith("Package: "):
+                name = line[9:].strip()
+            elif line.startswith("Status: "):
+                status = line[8:].strip()
+            elif line.startswith("Version: "):
+                version = line[9:].strip()
+    if name and status == "install ok installed":
+        packages[name] = version
+    return packages
+
+
+def _index_flatpaks() -> Set[str]:
+    installations = [FLATPAK_SYSTEM_DIR, Path("~/.local/share/flatpak").expanduser()]
+    apps: Set[str] = set()
+    for installation in installations:
+        try:
+            entries = os.scandir(installation / "app")
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                # An app is installed once its "current" deployment link exists.
+                if os.path.exists(os.path.join(entry.path, "current")):
+                    apps.add(entry.name)
+    return apps
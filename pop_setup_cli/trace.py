@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import io
+import os
+import pstats
+import re
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+TRACE_SUFFIX = ".trace"
+TOP_LINES = 10
+TOP_FUNCTIONS = 25
+# Tab-separated (written for $'...' quoting) so commands and paths with spaces
+# stay parseable; bash repeats the leading "+" once per nesting level.
+PS4 = r"+\t${EPOCHREALTIME}\t${BASH_SOURCE[0]}:${LINENO}\t${FUNCNAME[*]}\t"
+_TRACE_LINE = re.compile(r"^\++\t(\d+[.,]\d+)\t([^\t]*)\t([^\t]*)\t(.*)$")
+# Frames added by the wrapper itself, not by the script.
+_WRAPPER_FRAMES = {"source", "main"}
+_END_LOCATION = ":end"
+
+
+@dataclass
+class TraceSample:
+    location: str
+    stack: Tuple[str, ...]
+    command: str
+    seconds: float
+
+
+@dataclass
+class LineTotal:
+    location: str
+    seconds: float
+    count: int
+    command: str
+
+
+def bash_command(path: Path, trace_fd: int) -> List[str]:
+    # The script is sourced by a wrapper shell so PS4 and BASH_XTRACEFD are
+    # set even where bash ignores them in the environment (e.g. as root).
+    # "$0" stays the script path, so dirname "$0" lookups still work.
+    wrapper = f"PS4=$'{PS4}'; BASH_XTRACEFD={trace_fd}; set -x; . \"$0\" \"$@\""
+    return ["bash", "-c", wrapper, str(path)]
+
+
+def mark_end(trace_fd: int) -> None:
+    os.write(trace_fd, f"+\t{time.time():.6f}\t{_END_LOCATION}\t\t\n".encode())
+
+
+def parse_trace(trace_path: Path) -> List[TraceSample]:
+    # Each xtrace line is stamped when the command starts, so a line is
+    # charged with the time until the next traced command anywhere in the
+    # script, and the last one with the time until the step ended.
+    entries: List[Tuple[float, str, Tuple[str, ...], str]] = []
+    ended_at: Optional[float] = None
+    try:
+        with trace_path.open(encoding="utf-8", errors="replace") as handle:
+            for raw in handle:
+                match = _TRACE_LINE.match(raw.rstrip("\n"))
+                if not match:
+                    continue
+                raw_stamp, location, functions, command = match.groups()
+                # EPOCHREALTIME follows the locale's decimal separator.
+                stamp = float(raw_stamp.replace(",", "."))
+                if location == _END_LOCATION:
+                    ended_at = stamp
+                if location.startswith(":"):
+                    continue
+                stack = tuple(
+                    name for name in reversed(functions.split()) if name not in _WRAPPER_FRAMES
+                )
+                entries.append((stamp, location, stack, command))
+    except OSError:
+        return []
+    entries.sort(key=lambda entry: entry[0])
+    if ended_at is None:
+        ended_at = entries[-1][0] if entries else 0.0
+    samples: List[TraceSample] = []
+    for index, (stamp, location, stack, command) in enumerate(entries):
+        following = entries[index + 1][0] if index + 1 < len(entries) else ended_at
+        samples.append(TraceSample(location, stack, command, max(0.0, following - stamp)))
+    return samples
+
+
+def slowest_lines(samples: Sequence[TraceSample], top: int = TOP_LINES) -> List[LineTotal]:
+    totals: Dict[str, LineTotal] = {}
+    for sample in samples:
+        total = totals.get(sample.location)
+        if total is None:
+            total = totals[sample.location] = LineTotal(sample.location, 0.0, 0, sample.command)
+        total.seconds += sample.seconds
+        total.count += 1
+    return sorted(totals.values(), key=lambda total: total.seconds, reverse=True)[:top]
+
+
+def folded_stacks(script_id: str, samples: Sequence[TraceSample]) -> Dict[str, int]:
+    # Brendan Gregg's folded format, weighted in microseconds, so the output
+    # feeds flamegraph.pl or speedscope and two machines can be diffed.
+    folded: Dict[str, int] = {}
+    for sample in samples:
+        frames = [script_id, *sample.stack, sample.location]
+        key = ";".join(frame.replace(";", ":").replace(" ", "_") for frame in frames)
+        folded[key] = folded.get(key, 0) + int(sample.seconds * 1_000_000)
+    return folded
+
+
+def write_run_report(
+    run_log_dir: Path,
+    profile: Optional[pstats.Stats] = None,
+    top: int = TOP_LINES,
+) -> Optional[Path]:
+    traces = sorted(run_log_dir.glob(f"*{TRACE_SUFFIX}"))
+    if not traces and profile is None:
+        return None
+    lines = [f"Pop Setup trace report ({time.strftime('%Y-%m-%d %H:%M:%S')})", ""]
+    folded: Dict[str, int] = {}
+    for trace_path in traces:
+        script_id = trace_path.stem
+        samples = parse_trace(trace_path)
+        traced = sum(sample.seconds for sample in samples)
+        lines.append(f"== {script_id}: {traced:.1f}s in {len(samples)} traced commands")
+        for total in slowest_lines(samples, top):
+            command = " ".join(total.command.split())
+            if len(command) > 80:
+                command = command[:77] + "..."
+            lines.append(
+                f"  {total.seconds:9.3f}s  {total.count:5d}x  {total.location:<40}  {command}"
+            )
+        lines.append("")
+        for key, micros in folded_stacks(script_id, samples).items():
+            folded[key] = folded.get(key, 0) + micros
+    if folded:
+        (run_log_dir / "trace.folded").write_text(
+            "".join(f"{key} {micros}\n" for key, micros in sorted(folded.items()) if micros),
+            encoding="utf-8",
+        )
+    if profile is not None:
+        profile.dump_stats(str(run_log_dir / "orchestrator.prof"))
+        stream = io.StringIO()
+        profile.stream = stream
+        profile.sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+        lines.append("== orchestrator (cProfile, cumulative)")
+        lines.extend(f"  {line}" for line in stream.getvalue().strip().splitlines())
+        lines.append("")
+    report = run_log_dir / "trace-report.txt"
+    report.write_text("\n".join(lines), encoding="utf-8")
+    return report
@@ -1,32 +1,39 @@
 from __future__ import annotations
 
+import os
+import threading
+import time
 from contextlib import contextmanager
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Sequence
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
 
-from rich.console import Console, Group
-from rich.live import Live
+from rich.console import Console, ConsoleOptions, Group, RenderResult
+from rich.markup import escape
+from rich.measure import Measurement
 from rich.panel import Panel
-from rich.progress import (
-    BarColumn,
-    Progress,
-    SpinnerColumn,
-    TaskID,
-    TextColumn,
-    TimeElapsedColumn,
-    TimeRemainingColumn,
-)
+from rich.segment import Segment
 from rich.table import Table
-
 from rich.text import Text
 
+from .check_cache import CacheStats
 from .controls import InstallController
+from .download import DownloadStats
 from .hardware import HardwareState
 from .log_buffer import LogBuffer
 from .models import ExecutionResult, Script
 
+if TYPE_CHECKING:
+    from rich.live import Live
+    from rich.progress import Progress, TaskID
+
 console = Console()
 
+FRAME_RATE = 8
+PLAIN_PROGRESS_INTERVAL = 5.0
+LOG_PANE_LINES = 12
+OPEN_STATUSES = {"PENDING", "RUN"}
+
 STATUS_STYLES = {
     "OK": "green",
     "DONE": "green",
@@ -55,6 +62,7 @@ def prompt_main_menu() -> str:
     console.print("1) Install all", style="bold")
     console.print("2) Install selected", style="bold")
     console.print("3) Check system status", style="bold")
+    console.print("4) Resume last run", style="bold")
     console.print("q) Quit", style="bold")
     value = _read_input("\n[bold]Select an option:[/bold] ")
     if value is None:
@@ -118,35 +126,98 @@ def display_results(results: Sequence[ExecutionResult], heading: str | None = No
     table.add_column("Status", style="bold")
     table.add_column("Script", min_width=24)
     table.add_column("Phase", style="cyan")
+    table.add_column("Time", justify="right")
+    table.add_column("CPU", justify="right")
+    table.add_column("Peak RSS", justify="right")
     table.add_column("Details", overflow="fold")
     for result in results:
         status = result.status.upper()
         style = STATUS_STYLES.get(status, "white")
         message = " ".join(result.message.split()) if result.message else ""
+        cpu = (
+            None
+            if result.user_seconds is None
+            else result.user_seconds + (result.system_seconds or 0.0)
+        )
         table.add_row(
             f"[{style}]{status}[/{style}]",
             result.script_name,
             result.phase,
+            _format_seconds(result.wall_seconds),
+            _format_seconds(cpu),
+            _format_bytes(result.max_rss_kb * 1024) if result.max_rss_kb else "-",
             message,
         )
     console.print(table)
+    log_dirs = sorted({str(Path(r.log_path).parent) for r in results if r.log_path})
+    for log_dir in log_dirs:
+        console.print(f"[dim]Full output logs: {log_dir}[/dim]")
 
 
-def print_run_summary(results: Sequence[ExecutionResult]) -> None:
+def print_run_summary(
+    results: Sequence[ExecutionResult],
+    cache_stats: Optional[CacheStats] = None,
+    download_stats: Optional[DownloadStats] = None,
+    trace_report: Optional[Path] = None,
+) -> None:
     latest: Dict[str, ExecutionResult] = {}
     for result in results:
         latest[result.script_id] = result
     successes = sum(1 for r in latest.values() if r.status in {"OK", "DONE"})
     failures = sum(1 for r in latest.values() if r.status == "FAIL")
     console.print(f"\n[bold green]Summary:[/bold green] {successes} success, {failures} failed")
+    _print_cache_stats(cache_stats)
+    _print_download_stats(download_stats)
+    if trace_report:
+        console.print(f"[dim]Trace report: {trace_report}[/dim]")
 
 
-def print_check_summary(results: Sequence[ExecutionResult]) -> None:
+def print_check_summary(
+    results: Sequence[ExecutionResult], cache_stats: Optional[CacheStats] = None
+) -> None:
     installed = sum(1 for r in results if r.status == "OK")
     missing = sum(1 for r in results if r.status != "OK")
     console.print(
         f"\n[bold green]System status:[/bold green] {installed} installed, {missing} missing/unknown"
     )
+    _print_cache_stats(cache_stats)
+
+
+def _print_cache_stats(cache_stats: Optional[CacheStats]) -> None:
+    if cache_stats is None:
+        return
+    console.print(
+        f"[dim]Check cache: {cache_stats.hits} hits, {cache_stats.misses} misses[/dim]"
+    )
+
+
+def _print_download_stats(download_stats: Optional[DownloadStats]) -> None:
+    if download_stats is None:
+        return
+    console.print(
+        f"[dim]Downloads: {download_stats.hits} cached "
+        f"({_format_bytes(download_stats.bytes_from_cache)}), "
+        f"{download_stats.misses} fetched "
+        f"({_format_bytes(download_stats.bytes_downloaded)})[/dim]"
+    )
+
+
+def _format_bytes(count: int) -> str:
+    size = float(count)
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+def _format_seconds(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "-"
+    if seconds < 60:
+        return f"{seconds:.1f}s"
+    minutes, rest = divmod(int(seconds), 60)
+    return f"{minutes}m{rest:02d}s"
 
 
 def wait_for_enter() -> None:
@@ -179,15 +250,104 @@ def show_hardware_summary(state: HardwareState) -> None:
         if state.usb_present
         else "[yellow]USB drive not detected[/yellow]"
     )
+    system_line = (
+        f"{state.cpu_model or 'CPU'} x{state.cpu_count}, "
+        f"{state.ram_gb:g} GB RAM, {state.disk_free_gb:g} GB free on /"
+    )
     console.print(
         Panel.fit(
-            f"{gpu_line}\n{usb_line}",
+            f"{gpu_line}\n{usb_line}\n{system_line}",
             border_style="magenta",
             title="Hardware Check",
         )
     )
 
 
+class _StatusView:
+    # Rebuilds the status table only when a status changed since the last
+    # frame and otherwise replays the lines rendered for that width.
+    def __init__(self, tracker: "InstallProgress") -> None:
+        self.tracker = tracker
+        self.rebuilds = 0
+        self._key: Optional[tuple] = None
+        self._lines: List[List[Segment]] = []
+        self._table: Optional[Tuple[int, Table]] = None
+
+    def table(self) -> Table:
+        if self._table is None or self._table[0] != self.tracker.version:
+            self._table = (self.tracker.version, self.tracker._status_table())
+            self.rebuilds += 1
+        return self._table[1]
+
+    def __rich_measure__(self, console: Console, options: ConsoleOptions) -> Measurement:
+        return Measurement.get(console, options, self.table())
+
+    def __rich_console__(self, console: Console, options: ConsoleOptions) -> RenderResult:
+        key = (self.tracker.version, options.max_width)
+        if key != self._key:
+            self._lines = console.render_lines(self.table(), options, pad=False)
+            self._key = key
+        for line in self._lines:
+            yield from line
+            yield Segment.line()
+
+
+class _LogTailView:
+    # Samples the newest lines once per frame. Output is ingested by the
+    # reader threads into the LogBuffer without ever waiting on this view;
+    # lines that arrive and scroll away between two frames are counted as
+    # dropped rather than drawn.
+    def __init__(self, log_buffer: LogBuffer, lines: int = LOG_PANE_LINES) -> None:
+        self.log_buffer = log_buffer
+        self.lines = lines
+        self.dropped = 0
+        self.rate = 0.0
+        self._seen = log_buffer.line_count
+        self._sampled_at = time.monotonic()
+
+    def __rich_console__(self, console: Console, options: ConsoleOptions) -> RenderResult:
+        now = time.monotonic()
+        total = self.log_buffer.line_count
+        fresh = total - self._seen
+        if fresh > self.lines:
+            self.dropped += fresh - self.lines
+        elapsed = now - self._sampled_at
+        if elapsed > 0:
+            # Smooth over roughly a second of frames so the counter is readable.
+            weight = min(1.0, elapsed)
+            self.rate += (fresh / elapsed - self.rate) * weight
+        self._seen, self._sampled_at = total, now
+        tail = self.log_buffer.tail(self.lines)
+        body = Text(no_wrap=True, overflow="ellipsis")
+        for index in range(self.lines):
+            if index:
+                body.append("\n")
+            offset = index - (self.lines - len(tail))
+            if offset >= 0:
+                body.append(tail[offset])
+        title = f"Output  {self.rate:,.0f} lines/s"
+        if self.dropped:
+            title += f"  {self.dropped:,} not shown"
+        yield Panel(body, border_style="blue", title=title, title_align="left")
+
+
+class _ProgressView:
+    # Moves the bar by the elapsed time of running steps on every frame, so a
+    # fifteen-minute step advances the bar instead of holding it still.
+    def __init__(self, tracker: "InstallProgress") -> None:
+        self.tracker = tracker
+
+    def __rich_console__(self, console: Console, options: ConsoleOptions) -> RenderResult:
+        self.tracker.sync_progress()
+        yield self.tracker.progress
+
+
+@dataclass
+class DisplayOptions:
+    plain: bool = False
+    log_pane: bool = False
+
+
 @dataclass
 class InstallProgress:
     progress: Progress
@@ -197,10 +357,24 @@ class InstallProgress:
     live: Optional[Live] = None
     log_buffer: Optional[LogBuffer] = None
     controller: Optional[InstallController] = None
+    version: int = 0
+    log_pane: bool = False
+    estimates: Dict[str, float] = field(default_factory=dict)
+    jobs: int = 1
 
     def __post_init__(self) -> None:
         for script in self.scripts:
             self.statuses[script.id] = "PENDING"
+        self._open = len(self.statuses)
+        self._started: Dict[str, float] = {}
+        # The executor reports from its own thread while Rich's refresh thread
+        # computes the ETA from the same maps.
+        self._lock = threading.Lock()
+        self._finished = 0
+        self._done_weight = 0.0
+        self.status_view = _StatusView(self)
+        self.log_view = _LogTailView(self.log_buffer) if self.log_buffer else None
+        self._view = self._build_view()
         if self.controller:
             self.controller.set_tracker(self)
 
@@ -217,30 +391,84 @@ class InstallProgress:
         if event == "start":
             description = f"[cyan]{script.name}[/cyan] ({index}/{total})"
             self.progress.update(self.overall_task, description=description)
+            with self._lock:
+                self._started[script.id] = time.monotonic()
             self._set_status(script.id, "RUN")
+        elif event == "progress":
+            description = f"[cyan]{script.name}[/cyan] ({index}/{total}) {escape(final_status or '')}"
+            self.progress.update(self.overall_task, description=description)
         elif event == "end":
-            self.progress.advance(self.overall_task)
+            self._advance(script.id)
             resolved_status = final_status or "DONE"
             self._set_status(script.id, resolved_status)
-            if index == total:
+            if self._is_complete():
                 self.progress.update(self.overall_task, description="[green]Install complete[/green]")
         elif event == "skip":
             description = f"[yellow]{script.name}[/yellow] ({index}/{total})"
             self.progress.update(self.overall_task, description=description)
-            self.progress.advance(self.overall_task)
+            self._advance(script.id)
             self._set_status(script.id, final_status or "SKIP")
-            if index == total:
+            if self._is_complete():
                 self.progress.update(self.overall_task, description="[green]Install complete[/green]")
         elif event == "cancel":
-            self.progress.advance(self.overall_task)
+            self._advance(script.id)
             self._set_status(script.id, "CANCEL")
             self.progress.update(self.overall_task, description="[red]Install cancelled[/red]")
-        self.refresh()
+
+    def _is_complete(self) -> bool:
+        return self._open == 0
+
+    def _weight(self, script_id: str) -> float:
+        return self.estimates.get(script_id, 1.0) if self.estimates else 1.0
+
+    def _advance(self, script_id: str) -> None:
+        with self._lock:
+            self._started.pop(script_id, None)
+            self._finished += 1
+            self._done_weight += self._weight(script_id)
+            completed, finished = self._done_weight, self._finished
+        self.progress.update(
+            self.overall_task,
+            completed=completed,
+            steps=f"{finished}/{len(self.scripts)}",
+        )
+
+    def sync_progress(self) -> None:
+        if not self.estimates:
+            return
+        with self._lock:
+            running = list(self._started.items())
+            pending = [
+                script_id for script_id, status in self.statuses.items() if status == "PENDING"
+            ]
+            done_weight, still_open = self._done_weight, self._open
+        now = time.monotonic()
+        left: List[float] = []
+        partial = 0.0
+        for script_id, started in running:
+            expected = self._weight(script_id)
+            elapsed = now - started
+            # A step never counts as finished before it is; one that overruns
+            # its estimate is assumed to be nearly done.
+            partial += min(elapsed, expected * 0.95)
+            left.append(max(expected - elapsed, expected * 0.05))
+        queued = sum(self._weight(script_id) for script_id in pending)
+        remaining = max(max(left, default=0.0), (queued + sum(left)) / max(1, self.jobs))
+        self.progress.update(
+            self.overall_task,
+            completed=done_weight + partial,
+            remaining=f"~{_format_seconds(remaining)}" if still_open else "",
+        )
 
     def _set_status(self, script_id: str, status: str) -> None:
-        if script_id not in self.statuses:
+        previous = self.statuses.get(script_id)
+        if previous is None:
             return
-        self.statuses[script_id] = status.upper()
+        status = status.upper()
+        with self._lock:
+            self._open += (status in OPEN_STATUSES) - (previous in OPEN_STATUSES)
+            self.statuses[script_id] = status
+            self.version += 1
 
     def _status_table(self) -> Table:
         table = Table(show_header=True, header_style="bold magenta")
@@ -253,30 +481,44 @@ class InstallProgress:
             table.add_row(script.name, label)
         return table
 
-    def render(self):
+    def _build_view(self) -> Group:
         controls_message = Text(
-            "Controls: 1 = Status  |  2 = Skip  |  3 = Cancel",
+            "Controls: 1 = Status  |  2 = Skip  |  3 = Cancel  |  4 = Output",
             style="dim",
         )
         status_panel = Panel(
-            Group(self._status_table(), controls_message),
+            Group(self.status_view, controls_message),
             border_style="magenta",
             title="Script Status",
+            expand=not self.log_pane,
         )
-        progress_panel = Panel(
-            self.progress,
-            border_style="cyan",
-            title="Install Progress",
-        )
-        return Group(progress_panel, status_panel)
+        progress_panel = Panel(_ProgressView(self), border_style="cyan", title="Install Progress")
+        if not (self.log_pane and self.log_view):
+            return Group(progress_panel, status_panel)
+        body = Table.grid(expand=True, padding=(0, 1))
+        body.add_column()
+        body.add_column(ratio=1)
+        body.add_row(status_panel, self.log_view)
+        return Group(progress_panel, body)
+
+    def toggle_log_pane(self) -> None:
+        self.log_pane = not self.log_pane
+        self._view = self._build_view()
+        if self.live:
+            self.live.update(self._view, refresh=True)
+
+    def render(self):
+        return self._view
 
     def set_live(self, live: Live) -> None:
         self.live = live
-        self.refresh()
+        live.update(self._view)
 
     def refresh(self) -> None:
+        # Hooks only change state; Live repaints at FRAME_RATE, so a burst of
+        # events costs a single frame.
         if self.live:
-            self.live.update(self.render())
+            self.live.refresh()
 
     def show_log_view(self, lines: int = 50) -> None:
         if not self.live or not self.log_buffer:
@@ -300,44 +542,196 @@ class InstallProgress:
         self.refresh()
 
 
+@dataclass
+class PlainInstallProgress:
+    # One line per state change and no cursor movement, for SSH sessions and
+    # terminals where redrawing a live panel costs more than it shows.
+    scripts: Sequence[Script]
+    output: Console
+    log_buffer: Optional[LogBuffer] = None
+    controller: Optional[InstallController] = None
+    finished: int = 0
+    _progress_shown: Dict[str, float] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        if self.controller:
+            self.controller.set_tracker(self)
+
+    def hook(
+        self,
+        event: str,
+        index: int,
+        total: int,
+        script: Script,
+        final_status: Optional[str] = None,
+    ) -> None:
+        if total <= 0:
+            return
+        if event == "progress":
+            now = time.monotonic()
+            if now - self._progress_shown.get(script.id, 0.0) < PLAIN_PROGRESS_INTERVAL:
+                return
+            self._progress_shown[script.id] = now
+            self._print(f"[{self.finished}/{total}] ...    {script.name}: {final_status}")
+            return
+        if event == "start":
+            status = "START"
+        else:
+            self.finished += 1
+            status = "CANCEL" if event == "cancel" else (final_status or event).upper()
+        self._print(f"[{self.finished}/{total}] {status:<6} {script.name}")
+
+    def toggle_log_pane(self) -> None:
+        self.show_log_view(LOG_PANE_LINES)
+
+    def show_log_view(self, lines: int = 50) -> None:
+        if not self.log_buffer:
+            return
+        log_lines = self.log_buffer.tail(lines)
+        self._print(f"--- last {len(log_lines)} lines ---")
+        for line in log_lines:
+            self._print(line)
+        self._print("---")
+
+    def _print(self, line: str) -> None:
+        self.output.print(line, markup=False, highlight=False, soft_wrap=True)
+
+
+def plain_output_wanted(display: str = "auto") -> bool:
+    if display != "auto":
+        return display == "plain"
+    return (
+        not console.is_terminal
+        or console.is_dumb_terminal
+        or bool(os.environ.get("SSH_CONNECTION") or os.environ.get("SSH_TTY"))
+    )
+
+
 @contextmanager
-def install_progress(scripts_to_run: Sequence[Script]):
+def install_progress(
+    scripts_to_run: Sequence[Script],
+    display: Optional[DisplayOptions] = None,
+    output: Optional[Console] = None,
+    controls: bool = True,
+    estimates: Optional[Dict[str, float]] = None,
+    jobs: int = 1,
+):
     total_scripts = len(scripts_to_run)
     if total_scripts <= 0:
         yield None
         return
+    display = display or DisplayOptions()
+    output = output or console
+    log_buffer = LogBuffer()
+    controller = InstallController(output) if controls else None
+    if display.plain:
+        try:
+            if controller:
+                controller.start()
+            yield PlainInstallProgress(
+                scripts_to_run,
+                output,
+                log_buffer=log_buffer,
+                controller=controller,
+            )
+        finally:
+            if controller:
+                controller.close()
+        return
+    from rich.live import Live
+    from rich.progress import (
+        BarColumn,
+        Progress,
+        SpinnerColumn,
+        TextColumn,
+        TimeElapsedColumn,
+        TimeRemainingColumn,
+    )
+
+    estimates = estimates or {}
     columns = (
         SpinnerColumn(),
         TextColumn("[progress.description]{task.description}"),
         BarColumn(bar_width=None),
-        TextColumn("{task.completed}/{task.total}"),
+        TextColumn("{task.fields[steps]}"),
         TextColumn("{task.percentage:>3.0f}%"),
         TimeElapsedColumn(),
-        TimeRemainingColumn(),
+        # With expected durations the bar is measured in seconds of work and
+        # the tracker computes the remaining time itself; rate-based guesses
+        # stall while a long step has not finished yet.
+        TextColumn("[progress.remaining]{task.fields[remaining]}")
+        if estimates
+        else TimeRemainingColumn(),
     )
-    progress = Progress(*columns, console=console, transient=True)
+    progress = Progress(*columns, console=output, transient=True)
     overall_task = progress.add_task(
         "[cyan]Preparing install[/cyan]",
-        total=total_scripts,
+        total=(
+            sum(estimates.get(script.id, 1.0) for script in scripts_to_run)
+            if estimates
+            else total_scripts
+        ),
+        steps=f"0/{total_scripts}",
+        remaining="",
     )
-    log_buffer = LogBuffer()
-    controller = InstallController(console)
     tracker = InstallProgress(
         progress,
         overall_task,
         scripts_to_run,
         log_buffer=log_buffer,
         controller=controller,
+        log_pane=display.log_pane,
+        estimates=estimates,
+        jobs=jobs,
     )
     try:
         with Live(
             tracker.render(),
-            console=console,
-            refresh_per_second=8,
+            console=output,
+            refresh_per_second=FRAME_RATE,
             transient=True,
         ) as live:
             tracker.set_live(live)
-            controller.start()
+            if controller:
+                controller.start()
             yield tracker
     finally:
-        controller.stop()
+        if controller:
+            controller.close()
+
+
+@contextmanager
+def check_progress(total_checks: int):
+    if total_checks <= 0:
+        yield None
+        return
+    from rich.progress import (
+        BarColumn,
+        Progress,
+        SpinnerColumn,
+        TextColumn,
+        TimeElapsedColumn,
+    )
+
+    progress = Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        BarColumn(bar_width=None),
+        TextColumn("{task.completed}/{task.total}"),
+        TimeElapsedColumn(),
+        console=console,
+        transient=True,
+    )
+    task = progress.add_task("[cyan]Running checks[/cyan]", total=total_checks)
+
+    def hook(result: ExecutionResult, completed: int, total: int) -> None:
+        status = result.status.upper()
+        style = STATUS_STYLES.get(status, "white")
+        progress.update(
+            task,
+            completed=completed,
+            description=f"[{style}]{status}[/{style}] {result.script_name}",
+        )
+
+    with progress:
+        yield hook
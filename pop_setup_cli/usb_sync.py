@@ -0,0 +1,474 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from stat import S_ISREG
+from typing import Dict, List, Optional, Sequence, Tuple
+
+MANIFEST_NAME = ".pop_setup_manifest.json"
+MANIFEST_VERSION = 1
+COPY_CHUNK_BYTES = 8 << 20
+DEFAULT_COPY_JOBS = 4
+PROGRESS_INTERVAL = 0.5
+PROGRESS_FD_ENV = "POP_SETUP_PROGRESS_FD"
+
+FileEntry = List  # [size, mtime_ns, sha256 or ""]
+
+
+def default_state_dir() -> Path:
+    root = os.environ.get("XDG_STATE_HOME") or "~/.local/state"
+    return Path(root).expanduser() / "pop_setup" / "usb_sync"
+
+
+@dataclass
+class Manifest:
+    files: Dict[str, FileEntry] = field(default_factory=dict)
+    dirs: Dict[str, dict] = field(default_factory=dict)
+    source_tree: str = ""
+
+    def tree_id(self) -> str:
+        digest = hashlib.sha256()
+        for rel in sorted(self.files):
+            size, mtime_ns = self.files[rel][:2]
+            digest.update(f"{rel}\0{size}\0{mtime_ns}\n".encode())
+        return digest.hexdigest()
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["Manifest"]:
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION:
+            return None
+        return cls(
+            files=data.get("files", {}),
+            dirs=data.get("dirs", {}),
+            source_tree=data.get("source_tree", ""),
+        )
+
+    def dump(self) -> str:
+        return json.dumps(
+            {
+                "version": MANIFEST_VERSION,
+                "source_tree": self.source_tree,
+                "dirs": self.dirs,
+                "files": self.files,
+            }
+        )
+
+
+@dataclass
+class SyncReport:
+    copied_files: int = 0
+    copied_bytes: int = 0
+    unchanged_files: int = 0
+    skipped_tree: bool = False
+    seconds: float = 0.0
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def rate(self) -> float:
+        return self.copied_bytes / self.seconds if self.seconds > 0 else 0.0
+
+
+def scan_tree(root: Path, previous: Optional[Manifest] = None) -> Manifest:
+    # A directory whose mtime matches the previous manifest still has the same
+    # entries, so it is not listed again. Its files are still stat'ed: writing
+    # a file in place does not touch the directory's mtime.
+    manifest = Manifest()
+    stack = [""]
+    while stack:
+        rel_dir = stack.pop()
+        path = root / rel_dir if rel_dir else root
+        mtime_ns = os.stat(path).st_mtime_ns
+        known = previous.dirs.get(rel_dir) if previous else None
+        listed = None
+        if known and known.get("mtime") == mtime_ns:
+            listed = _stat_listing(path, rel_dir, known.get("files", []), previous)
+        if listed is not None:
+            names = list(known["files"])
+            subdirs = list(known.get("subdirs", []))
+            manifest.files.update(listed)
+        else:
+            names, subdirs = [], []
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if not rel_dir and entry.name == MANIFEST_NAME:
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.name)
+                    elif entry.is_file(follow_symlinks=False):
+                        stat = entry.stat(follow_symlinks=False)
+                        names.append(entry.name)
+                        manifest.files[_join(rel_dir, entry.name)] = [
+                            stat.st_size,
+                            stat.st_mtime_ns,
+                            "",
+                        ]
+        manifest.dirs[rel_dir] = {"mtime": mtime_ns, "files": names, "subdirs": subdirs}
+        stack.extend(_join(rel_dir, name) for name in subdirs)
+    return manifest
+
+
+def _stat_listing(
+    path: Path, rel_dir: str, names: Sequence[str], previous: Manifest
+) -> Optional[Dict[str, FileEntry]]:
+    # None when a listed file is gone or no longer a regular file, so the
+    # caller lists the directory afresh. A cached digest is kept only while
+    # size and mtime still match.
+    files: Dict[str, FileEntry] = {}
+    for name in names:
+        rel = _join(rel_dir, name)
+        try:
+            stat = os.stat(path / name, follow_symlinks=False)
+        except OSError:
+            return None
+        if not S_ISREG(stat.st_mode):
+            return None
+        entry = [stat.st_size, stat.st_mtime_ns, ""]
+        cached = previous.files.get(rel)
+        if cached and cached[:2] == entry[:2]:
+            entry[2] = cached[2]
+        files[rel] = entry
+    return files
+
+
+class _Progress:
+    def __init__(self, total_files: int, total_bytes: int) -> None:
+        self.total_files = total_files
+        self.total_bytes = total_bytes
+        self.files = 0
+        self.bytes = 0
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._fd = _progress_fd()
+        self._thread: Optional[threading.Thread] = None
+        if self._fd is not None:
+            self._thread = threading.Thread(target=self._report_loop, daemon=True)
+            self._thread.start()
+
+    def add_bytes(self, count: int) -> None:
+        with self._lock:
+            self.bytes += count
+
+    def add_file(self) -> None:
+        with self._lock:
+            self.files += 1
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self._report()
+
+    def _report_loop(self) -> None:
+        while not self._stop.wait(PROGRESS_INTERVAL):
+            self._report()
+
+    def _report(self) -> None:
+        if self._fd is None:
+            return
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        with self._lock:
+            line = (
+                f"{self.files}/{self.total_files} files, "
+                f"{format_bytes(self.bytes)}/{format_bytes(self.total_bytes)} "
+                f"at {format_bytes(self.bytes / elapsed)}/s\n"
+            )
+        try:
+            os.write(self._fd, line.encode())
+        except OSError:
+            self._fd = None
+
+
+def sync_tree(
+    source: Path,
+    dest: Path,
+    jobs: int = DEFAULT_COPY_JOBS,
+    verify: bool = False,
+    with_hash: bool = False,
+    state_dir: Optional[Path] = None,
+) -> SyncReport:
+    started = time.monotonic()
+    report = SyncReport()
+    source_manifest_path = _source_manifest_path(source, state_dir)
+    previous = None if verify else _load_source_manifest(source, state_dir)
+    manifest = scan_tree(source, previous)
+    tree_id = manifest.tree_id()
+    dest_manifest_path = _dest_manifest_path(dest, state_dir)
+    dest_manifest = Manifest.load(dest_manifest_path) or Manifest()
+    if not verify and dest_manifest.source_tree == tree_id and dest.is_dir():
+        report.skipped_tree = True
+        report.unchanged_files = len(manifest.files)
+        report.seconds = time.monotonic() - started
+        _save_source_manifest(source, source_manifest_path, manifest, previous)
+        return report
+
+    plan: List[Tuple[str, FileEntry]] = []
+    for rel, entry in manifest.files.items():
+        target = dest / rel
+        copied = dest_manifest.files.get(rel)
+        if not verify and copied and copied[:2] == entry[:2]:
+            if target.exists():
+                report.unchanged_files += 1
+                continue
+        else:
+            try:
+                stat = target.stat()
+                if stat.st_size == entry[0] and stat.st_mtime_ns == entry[1]:
+                    dest_manifest.files[rel] = list(entry)
+                    report.unchanged_files += 1
+                    continue
+            except OSError:
+                pass
+        plan.append((rel, entry))
+    plan.sort(key=lambda item: item[1][0], reverse=True)
+
+    progress = _Progress(len(plan), sum(entry[0] for _, entry in plan))
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        futures = {
+            pool.submit(_copy_file, source / rel, dest / rel, entry, with_hash, progress): rel
+            for rel, entry in plan
+        }
+        for future in as_completed(futures):
+            rel = futures[future]
+            try:
+                digest = future.result()
+            except OSError as exc:
+                report.errors.append(f"{rel}: {exc}")
+                dest_manifest.files.pop(rel, None)
+                continue
+            entry = manifest.files[rel]
+            if digest:
+                entry[2] = digest
+            dest_manifest.files[rel] = list(entry)
+            report.copied_files += 1
+            report.copied_bytes += entry[0]
+            progress.add_file()
+    progress.stop()
+
+    dest_manifest.source_tree = "" if report.errors else tree_id
+    _write_json(dest_manifest_path, dest_manifest.dump())
+    _save_source_manifest(source, source_manifest_path, manifest, previous)
+    report.seconds = time.monotonic() - started
+    return report
+
+
+def sync_file(source: Path, dest_dir: Path) -> SyncReport:
+    started = time.monotonic()
+    report = SyncReport()
+    stat = source.stat()
+    target = dest_dir / source.name
+    try:
+        current = target.stat()
+        if current.st_size == stat.st_size and current.st_mtime_ns == stat.st_mtime_ns:
+            report.unchanged_files = 1
+            report.seconds = time.monotonic() - started
+            return report
+    except OSError:
+        pass
+    progress = _Progress(1, stat.st_size)
+    _copy_file(source, target, [stat.st_size, stat.st_mtime_ns, ""], False, progress)
+    progress.add_file()
+    progress.stop()
+    report.copied_files = 1
+    report.copied_bytes = stat.st_size
+    report.seconds = time.monotonic() - started
+    return report
+
+
+def _copy_file(
+    source: Path,
+    target: Path,
+    entry: FileEntry,
+    with_hash: bool,
+    progress: _Progress,
+) -> str:
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = target.with_name(f".{target.name}.pop_setup_tmp")
+    digest = hashlib.sha256() if with_hash else None
+    try:
+        with source.open("rb") as reader, tmp_path.open("wb") as writer:
+            if digest is not None or not _copy_range(reader.fileno(), writer.fileno(), progress):
+                reader.seek(0)
+                writer.seek(0)
+                writer.truncate()
+                buffer = bytearray(COPY_CHUNK_BYTES)
+                view = memoryview(buffer)
+                while True:
+                    count = reader.readinto(buffer)
+                    if not count:
+                        break
+                    writer.write(view[:count])
+                    if digest is not None:
+                        digest.update(view[:count])
+                    progress.add_bytes(count)
+        shutil.copymode(source, tmp_path)
+        os.utime(tmp_path, ns=(entry[1], entry[1]))
+        os.replace(tmp_path, target)
+    except OSError:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return digest.hexdigest() if digest is not None else ""
+
+
+def _copy_range(source_fd: int, target_fd: int, progress: _Progress) -> bool:
+    copy_file_range = getattr(os, "copy_file_range", None)
+    if copy_file_range is None:
+        return False
+    copied = 0
+    while True:
+        try:
+            count = copy_file_range(source_fd, target_fd, COPY_CHUNK_BYTES)
+        except OSError:
+            # Cross-filesystem copies are refused by some kernels; redo the
+            # file with plain reads instead.
+            progress.add_bytes(-copied)
+            return False
+        if count == 0:
+            return True
+        copied += count
+        progress.add_bytes(count)
+
+
+def _load_source_manifest(source: Path, state_dir: Optional[Path]) -> Optional[Manifest]:
+    return Manifest.load(source / MANIFEST_NAME) or Manifest.load(
+        _fallback_manifest_path(source, state_dir)
+    )
+
+
+def _save_source_manifest(
+    source: Path,
+    path: Path,
+    manifest: Manifest,
+    previous: Optional[Manifest],
+) -> None:
+    if previous and previous.dirs == manifest.dirs and previous.files == manifest.files:
+        return
+    if path.parent != source:
+        _write_json(path, manifest.dump())
+        return
+    created = not path.exists()
+    if not _write_in_place(path, manifest.dump()):
+        _write_json(_fallback_manifest_path(source, None), manifest.dump())
+    elif created:
+        # Creating the manifest bumped the root directory's mtime; record the
+        # new value so the next scan can still reuse the root listing.
+        manifest.dirs[""]["mtime"] = os.stat(source).st_mtime_ns
+        _write_in_place(path, manifest.dump())
+
+
+def _source_manifest_path(source: Path, state_dir: Optional[Path]) -> Path:
+    if os.access(source, os.W_OK):
+        return source / MANIFEST_NAME
+    return _fallback_manifest_path(source, state_dir)
+
+
+def _fallback_manifest_path(source: Path, state_dir: Optional[Path]) -> Path:
+    key = hashlib.sha256(str(source.resolve()).encode()).hexdigest()[:32]
+    return (state_dir or default_state_dir()) / f"source-{key}.json"
+
+
+def _dest_manifest_path(dest: Path, state_dir: Optional[Path]) -> Path:
+    key = hashlib.sha256(str(dest.resolve()).encode()).hexdigest()[:32]
+    return (state_dir or default_state_dir()) / f"dest-{key}.json"
+
+
+def _write_in_place(path: Path, text: str) -> bool:
+    # Rewriting an existing file in place leaves its directory's mtime alone,
+    # unlike a temp file plus rename.
+    try:
+        with path.open("w", encoding="utf-8") as handle:
+            handle.write(text)
+        return True
+    except OSError:
+        return False
+
+
+def _write_json(path: Path, text: str) -> None:
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(text, encoding="utf-8")
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+def _progress_fd() -> Optional[int]:
+    value = os.environ.get(PROGRESS_FD_ENV, "")
+    return int(value) if value.isdigit() else None
+
+
+def _join(rel_dir: str, name: str) -> str:
+    return f"{rel_dir}/{name}" if rel_dir else name
+
+
+def format_bytes(count: float) -> str:
+    size = float(count)
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024 or unit == "GiB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m pop_setup_cli.usb_sync",
+        description="Copy a directory tree (or one file) from the USB drive",
+    )
+    parser.add_argument("source", type=Path)
+    parser.add_argument("dest", type=Path, help="Destination directory")
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=DEFAULT_COPY_JOBS,
+        help=f"Files copied at the same time (default: {DEFAULT_COPY_JOBS})",
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="Ignore saved manifests and stat every file on both sides",
+    )
+    parser.add_argument(
+        "--hash", action="store_true", help="Record SHA-256 digests of copied files"
+    )
+    args = parser.parse_args(argv)
+    if not args.source.exists():
+        print(f"Source missing, skipping: {args.source}")
+        return 0
+    try:
+        if args.source.is_file():
+            report = sync_file(args.source, args.dest)
+        else:
+            report = sync_tree(args.source, args.dest, args.jobs, args.verify, args.hash)
+    except OSError as exc:
+        print(f"Sync failed: {exc}", file=sys.stderr)
+        return 1
+    for error in report.errors:
+        print(f"Copy failed: {error}", file=sys.stderr)
+    if report.skipped_tree:
+        print(f"{args.source}: unchanged ({report.unchanged_files} files, manifest match)")
+    else:
+        print(
+            f"{args.source}: copied {report.copied_files} files "
+            f"({format_bytes(report.copied_bytes)}) in {report.seconds:.1f}s "
+            f"at {format_bytes(report.rate)}/s, {report.unchanged_files} unchanged"
+        )
+    return 1 if report.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
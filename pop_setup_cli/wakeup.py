@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import threading
+from queue import Empty, SimpleQueue
+from typing import Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class Wakeup:
+    def __init__(self) -> None:
+        self._read_fd, self._write_fd = os.pipe()
+        os.set_blocking(self._read_fd, False)
+        os.set_blocking(self._write_fd, False)
+        self._closed = False
+
+    def fileno(self) -> int:
+        return self._read_fd
+
+    def set(self) -> None:
+        if self._closed:
+            return
+        try:
+            os.write(self._write_fd, b"\0")
+        except (BlockingIOError, OSError):
+            pass
+
+    def clear(self) -> None:
+        try:
+            while os.read(self._read_fd, 512):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        os.close(self._read_fd)
+        os.close(self._write_fd)
+
+
+class WakeQueue(Generic[T]):
+    # The pipe stays readable for as long as items are queued, so a selector
+    # registered on fileno() never sleeps past a pending item.
+    def __init__(self) -> None:
+        self._items: SimpleQueue[T] = SimpleQueue()
+        self._wakeup = Wakeup()
+
+    def fileno(self) -> int:
+        return self._wakeup.fileno()
+
+    def put(self, item: T) -> None:
+        self._items.put(item)
+        self._wakeup.set()
+
+    def get_nowait(self) -> Optional[T]:
+        try:
+            item = self._items.get_nowait()
+        except Empty:
+            self._wakeup.clear()
+            try:
+                item = self._items.get_nowait()
+            except Empty:
+                return None
+        if not self._items.empty():
+            self._wakeup.set()
+        return item
+
+    def close(self) -> None:
+        self._wakeup.close()
+
+
+class ProcessExit:
+    def __init__(self, process: subprocess.Popen) -> None:
+        self._pidfd: Optional[int] = None
+        self._wakeup: Optional[Wakeup] = None
+        self._lock = threading.Lock()
+        self._exited = False
+        self._closed = False
+        pidfd_open = getattr(os, "pidfd_open", None)
+        if pidfd_open:
+            try:
+                self._pidfd = pidfd_open(process.pid)
+            except OSError:
+                self._pidfd = None
+        if self._pidfd is None:
+            self._wakeup = Wakeup()
+            threading.Thread(target=self._wait, args=(process,), daemon=True).start()
+
+    def _wait(self, process: subprocess.Popen) -> None:
+        # WNOWAIT leaves the child a zombie: reaping belongs to the caller's
+        # wait4(), which needs the exit status and rusage. A Popen.wait()
+        # here could win that race and record a failed step as exit code 0.
+        try:
+            os.waitid(os.P_PID, process.pid, os.WEXITED | os.WNOWAIT)
+        except ChildProcessError:
+            # Already reaped.
+            pass
+        assert self._wakeup is not None
+        with self._lock:
+            self._exited = True
+            if self._closed:
+                self._wakeup.close()
+            else:
+                self._wakeup.set()
+
+    def fileno(self) -> int:
+        if self._pidfd is not None:
+            return self._pidfd
+        assert self._wakeup is not None
+        return self._wakeup.fileno()
+
+    def close(self) -> None:
+        if self._pidfd is not None:
+            os.close(self._pidfd)
+            self._pidfd = None
+        if self._wakeup:
+            # The waiter thread may still write to the pipe; let it close it.
+            with self._lock:
+                self._closed = True
+                if self._exited:
+                    self._wakeup.close()
@@ -10,6 +10,20 @@ REPO_URL_V1="${REPO_URL_V1:-https://github.com/CloudGod93/Mw_RibbingCut.git}"
 REPO_URL_V2="${REPO_URL_V2:-https://github.com/CloudGod93/RibbingApp.git}"
 REPO_URL_CC="${REPO_URL_CC:-https://github.com/CloudGod93/Mw_CattleClassification.git}"
 
+CLONE_JOBS="${CLONE_JOBS:-3}"
+CLONE_DEPTH="${CLONE_DEPTH:-}"
+CLONE_FILTER="${CLONE_FILTER:-}"
+
+if [[ -n "${POP_SETUP_PYTHON:-}" ]]; then
+  exec "$POP_SETUP_PYTHON" -m pop_setup_cli.git_clone \
+    --jobs "$CLONE_JOBS" \
+    ${CLONE_DEPTH:+--depth "$CLONE_DEPTH"} \
+    ${CLONE_FILTER:+--filter "$CLONE_FILTER"} \
+    --repo "$REPO_URL_V2" "$V2_DIR" \
+    --repo "$REPO_URL_V1" "$V1_DIR" \
+    --repo "$REPO_URL_CC" "$CC_DIR"
+fi
+
 clone_repo() {
   local url="$1" dest="$2"
   if [[ -d "$dest/.git" ]]; then
@@ -17,7 +31,7 @@ clone_repo() {
     return
   fi
   mkdir -p "$(dirname "$dest")"
-  git clone "$url" "$dest"
+  git clone ${CLONE_DEPTH:+--depth "$CLONE_DEPTH"} ${CLONE_FILTER:+--filter="$CLONE_FILTER"} "$url" "$dest"
 }
 
 clone_repo "$REPO_URL_V2" "$V2_DIR"
@@ -5,9 +5,21 @@ MINICONDA_PREFIX="${MINICONDA_PREFIX:-$HOME/miniconda3}"
 INSTALLER_URL="${MINICONDA_INSTALLER_URL:-https://repo.anaconda.com/miniconda/Miniconda3-latest-Linux-x86_64.sh}"
 INSTALLER_PATH="/tmp/miniconda.sh"
 
+download() {
+  local url="$1" dest="$2" sha256="${3:-}"
+  if [[ -n "${POP_SETUP_PYTHON:-}" ]]; then
+    "$POP_SETUP_PYTHON" -m pop_setup_cli.download "$url" -o "$dest" ${sha256:+--sha256 "$sha256"}
+  else
+    curl -fL "$url" -o "$dest"
+    if [[ -n "$sha256" ]]; then
+      echo "$sha256  $dest" | sha256sum -c -
+    fi
+  fi
+}
+
 if [[ ! -d "$MINICONDA_PREFIX" ]]; then
   echo "Downloading Miniconda installer"
-  curl -fsSL "$INSTALLER_URL" -o "$INSTALLER_PATH"
+  download "$INSTALLER_URL" "$INSTALLER_PATH" "${MINICONDA_SHA256:-}"
   echo "Installing Miniconda to $MINICONDA_PREFIX"
   bash "$INSTALLER_PATH" -b -p "$MINICONDA_PREFIX"
 fi
@@ -1,17 +1,12 @@
 #!/usr/bin/env bash
 set -euo pipefail
 
-wait_for_apt_lock() {
-  while fuser /var/lib/dpkg/lock-frontend >/dev/null 2>&1 || \
-        fuser /var/lib/apt/lists/lock >/dev/null 2>&1; do
-    echo "Waiting for apt lock to clear..."
-    sleep 5
-  done
-}
-
 apt_exec() {
-  wait_for_apt_lock
-  sudo DEBIAN_FRONTEND=noninteractive apt-get "$@"
+  if [[ -n "${POP_SETUP_PYTHON:-}" ]]; then
+    "$POP_SETUP_PYTHON" -m pop_setup_cli.apt_lock "$@"
+  else
+    sudo DEBIAN_FRONTEND=noninteractive apt-get -o DPkg::Lock::Timeout=600 "$@"
+  fi
 }
 
 if command -v docker >/dev/null 2>&1; then
@@ -16,12 +16,19 @@ fi
 echo "Ensuring system-level Flathub remote exists"
 sudo flatpak remote-add --system --if-not-exists flathub https://flathub.org/repo/flathub.flatpakrepo
 
+APPS_TO_INSTALL=()
 for app in "${APP_LIST[@]}"; do
   trimmed="$(echo "$app" | xargs)"
   [[ -z "$trimmed" ]] && continue
-  echo "Installing Flatpak app: $trimmed"
-  sudo flatpak install --system -y flathub "$trimmed"
+  APPS_TO_INSTALL+=("$trimmed")
 done
 
+if [[ "${POP_SETUP_PACKAGES_READY:-0}" == "1" && -z "${FLATPAK_APPS:-}" ]]; then
+  echo "Flatpak apps already installed by Pop Setup"
+elif ((${#APPS_TO_INSTALL[@]} > 0)); then
+  echo "Installing Flatpak apps: ${APPS_TO_INSTALL[*]}"
+  sudo flatpak install --system -y flathub "${APPS_TO_INSTALL[@]}"
+fi
+
 echo "Updating all system Flatpak apps"
 sudo flatpak update -y
@@ -1,17 +1,24 @@
 #!/usr/bin/env bash
 set -euo pipefail
 
-wait_for_apt_lock() {
-  while fuser /var/lib/dpkg/lock-frontend >/dev/null 2>&1 || \
-        fuser /var/lib/apt/lists/lock >/dev/null 2>&1; do
-    echo "Waiting for apt lock to clear..."
-    sleep 5
-  done
+apt_exec() {
+  if [[ -n "${POP_SETUP_PYTHON:-}" ]]; then
+    "$POP_SETUP_PYTHON" -m pop_setup_cli.apt_lock "$@"
+  else
+    sudo DEBIAN_FRONTEND=noninteractive apt-get -o DPkg::Lock::Timeout=600 "$@"
+  fi
 }
 
-apt_exec() {
-  wait_for_apt_lock
-  sudo DEBIAN_FRONTEND=noninteractive apt-get "$@"
+download() {
+  local url="$1" dest="$2" sha256="${3:-}"
+  if [[ -n "${POP_SETUP_PYTHON:-}" ]]; then
+    "$POP_SETUP_PYTHON" -m pop_setup_cli.download "$url" -o "$dest" ${sha256:+--sha256 "$sha256"}
+  else
+    curl -fL "$url" -o "$dest"
+    if [[ -n "$sha256" ]]; then
+      echo "$sha256  $dest" | sha256sum -c -
+    fi
+  fi
 }
 
 if command -v google-chrome-stable >/dev/null 2>&1; then
@@ -20,8 +27,10 @@ if command -v google-chrome-stable >/dev/null 2>&1; then
 fi
 
 sudo install -m 0755 -d /usr/share/keyrings
-curl -fsSL https://dl.google.com/linux/linux_signing_key.pub | \
-  sudo gpg --dearmor -o /usr/share/keyrings/google-chrome.gpg
+KEY_PATH="/tmp/google-chrome-signing-key.pub"
+download https://dl.google.com/linux/linux_signing_key.pub "$KEY_PATH" "${CHROME_KEY_SHA256:-}"
+sudo gpg --batch --yes --dearmor -o /usr/share/keyrings/google-chrome.gpg "$KEY_PATH"
+rm -f "$KEY_PATH"
 
 cat <<'REPO' | sudo tee /etc/apt/sources.list.d/google-chrome.list >/dev/null
 deb [arch=amd64 signed-by=/usr/share/keyrings/google-chrome.gpg] http://dl.google.com/linux/chrome/deb/ stable main
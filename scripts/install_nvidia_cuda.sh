@@ -7,17 +7,20 @@ CUDA_KEY_URL="https://developer.download.nvidia.com/compute/cuda/repos/ubuntu220
 CUDA_KEY_DEB="/tmp/cuda-keyring.deb"
 CUDNN_VERSION="8.6.0.163-1+cuda11.8"
 
-wait_for_apt_lock() {
-  while fuser /var/lib/dpkg/lock-frontend >/dev/null 2>&1 || \
-        fuser /var/lib/apt/lists/lock >/dev/null 2>&1; do
-    echo "Waiting for apt lock to clear..."
-    sleep 5
-  done
+apt_exec() {
+  if [[ -n "${POP_SETUP_PYTHON:-}" ]]; then
+    "$POP_SETUP_PYTHON" -m pop_setup_cli.apt_lock "$@"
+  else
+    sudo DEBIAN_FRONTEND=noninteractive apt-get -o DPkg::Lock::Timeout=600 "$@"
+  fi
 }
 
-apt_exec() {
-  wait_for_apt_lock
-  sudo DEBIAN_FRONTEND=noninteractive apt-get "$@"
+dpkg_exec() {
+  if [[ -n "${POP_SETUP_PYTHON:-}" ]]; then
+    "$POP_SETUP_PYTHON" -m pop_setup_cli.apt_lock --run sudo "$@"
+  else
+    sudo "$@"
+  fi
 }
 
 install_nvidia_driver() {
@@ -30,7 +33,7 @@ install_nvidia_driver() {
   if grep -qi 'pop' /etc/os-release 2>/dev/null; then
     apt_exec install -y system76-driver-nvidia
   else
-    sudo ubuntu-drivers autoinstall
+    dpkg_exec ubuntu-drivers autoinstall
   fi
 }
 
@@ -43,7 +46,7 @@ install_cuda_toolkit() {
   echo "Downloading CUDA keyring"
   curl -fsSL "$CUDA_KEY_URL" -o "$CUDA_KEY_DEB"
   echo "Installing CUDA keyring"
-  sudo dpkg -i "$CUDA_KEY_DEB"
+  dpkg_exec dpkg -i "$CUDA_KEY_DEB"
   apt_exec update
   echo "Installing CUDA Toolkit ${CUDA_VERSION}"
   apt_exec install -y "cuda-toolkit-11-8"
@@ -51,7 +54,7 @@ install_cuda_toolkit() {
   apt_exec install -y \
     "libcudnn8=${CUDNN_VERSION}" \
     "libcudnn8-dev=${CUDNN_VERSION}"
-  sudo apt-mark hold libcudnn8 libcudnn8-dev
+  dpkg_exec apt-mark hold libcudnn8 libcudnn8-dev
 }
 
 install_nvidia_driver
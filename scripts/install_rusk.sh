@@ -4,17 +4,12 @@ set -euo pipefail
 REPO="rustdesk/rustdesk"
 API_URL="https://api.github.com/repos/${REPO}/releases/latest"
 
-wait_for_apt_lock() {
-  while fuser /var/lib/dpkg/lock-frontend >/dev/null 2>&1 || \
-        fuser /var/lib/apt/lists/lock >/dev/null 2>&1; do
-    echo "Waiting for apt lock to clear..."
-    sleep 5
-  done
-}
-
 apt_exec() {
-  wait_for_apt_lock
-  sudo DEBIAN_FRONTEND=noninteractive apt-get "$@"
+  if [[ -n "${POP_SETUP_PYTHON:-}" ]]; then
+    "$POP_SETUP_PYTHON" -m pop_setup_cli.apt_lock "$@"
+  else
+    sudo DEBIAN_FRONTEND=noninteractive apt-get -o DPkg::Lock::Timeout=600 "$@"
+  fi
 }
 
 if [[ "$(id -u)" -eq 0 ]]; then
@@ -43,9 +38,11 @@ case "${ARCH}" in
     ;;
 esac
 
-echo "[*] Installing dependencies (curl, jq)..."
-apt_exec update
-apt_exec install -y curl jq
+if [[ "${POP_SETUP_PACKAGES_READY:-0}" != "1" ]]; then
+  echo "[*] Installing dependencies (curl, jq)..."
+  apt_exec update
+  apt_exec install -y curl jq
+fi
 
 if command -v rustdesk >/dev/null 2>&1; then
   echo "[*] Rusk (rustdesk) already installed at: $(command -v rustdesk)"
@@ -17,17 +17,12 @@ BASE_PACKAGES=(
   sed
 )
 
-wait_for_apt_lock() {
-  while fuser /var/lib/dpkg/lock-frontend >/dev/null 2>&1 || \
-        fuser /var/lib/apt/lists/lock >/dev/null 2>&1; do
-    echo "Waiting for apt lock to clear..."
-    sleep 5
-  done
-}
-
 apt_exec() {
-  wait_for_apt_lock
-  sudo DEBIAN_FRONTEND=noninteractive apt-get "$@"
+  if [[ -n "${POP_SETUP_PYTHON:-}" ]]; then
+    "$POP_SETUP_PYTHON" -m pop_setup_cli.apt_lock "$@"
+  else
+    sudo DEBIAN_FRONTEND=noninteractive apt-get -o DPkg::Lock::Timeout=600 "$@"
+  fi
 }
 
 if [[ -f "$TEAMVIEWER_SOURCE" ]]; then
@@ -44,7 +39,9 @@ apt_exec dist-upgrade -y
 echo "Removing conflicting system nodejs/npm packages"
 apt_exec remove --purge -y nodejs npm || true
 
-if ((${#BASE_PACKAGES[@]} > 0)); then
+if [[ "${POP_SETUP_PACKAGES_READY:-0}" == "1" ]]; then
+  echo "Core packages already installed by Pop Setup"
+elif ((${#BASE_PACKAGES[@]} > 0)); then
   echo "Installing core CLI and GUI packages: ${BASE_PACKAGES[*]}"
   apt_exec install -y "${BASE_PACKAGES[@]}"
 fi
@@ -1,17 +1,24 @@
 #!/usr/bin/env bash
 set -euo pipefail
 
-wait_for_apt_lock() {
-  while fuser /var/lib/dpkg/lock-frontend >/dev/null 2>&1 || \
-        fuser /var/lib/apt/lists/lock >/dev/null 2>&1; do
-    echo "Waiting for apt lock to clear..."
-    sleep 5
-  done
+apt_exec() {
+  if [[ -n "${POP_SETUP_PYTHON:-}" ]]; then
+    "$POP_SETUP_PYTHON" -m pop_setup_cli.apt_lock "$@"
+  else
+    sudo DEBIAN_FRONTEND=noninteractive apt-get -o DPkg::Lock::Timeout=600 "$@"
+  fi
 }
 
-apt_exec() {
-  wait_for_apt_lock
-  sudo DEBIAN_FRONTEND=noninteractive apt-get "$@"
+download() {
+  local url="$1" dest="$2" sha256="${3:-}"
+  if [[ -n "${POP_SETUP_PYTHON:-}" ]]; then
+    "$POP_SETUP_PYTHON" -m pop_setup_cli.download "$url" -o "$dest" ${sha256:+--sha256 "$sha256"}
+  else
+    curl -fL "$url" -o "$dest"
+    if [[ -n "$sha256" ]]; then
+      echo "$sha256  $dest" | sha256sum -c -
+    fi
+  fi
 }
 
 if command -v teamviewer >/dev/null 2>&1; then
@@ -20,6 +27,6 @@ if command -v teamviewer >/dev/null 2>&1; then
 fi
 
 DEB_PATH="/tmp/teamviewer_amd64.deb"
-wget -O "$DEB_PATH" https://download.teamviewer.com/download/linux/teamviewer_amd64.deb
+download https://download.teamviewer.com/download/linux/teamviewer_amd64.deb "$DEB_PATH" "${TEAMVIEWER_SHA256:-}"
 apt_exec install -y "$DEB_PATH"
 rm -f "$DEB_PATH"
@@ -6,13 +6,25 @@ DOWNLOAD_URL="https://github.com/ventoy/Ventoy/releases/download/v${VENTOY_VERSI
 ARCHIVE="/tmp/ventoy-${VENTOY_VERSION}.tar.gz"
 EXTRACT_DIR="/tmp/ventoy-${VENTOY_VERSION}"
 
+download() {
+  local url="$1" dest="$2" sha256="${3:-}"
+  if [[ -n "${POP_SETUP_PYTHON:-}" ]]; then
+    "$POP_SETUP_PYTHON" -m pop_setup_cli.download "$url" -o "$dest" ${sha256:+--sha256 "$sha256"}
+  else
+    curl -fL "$url" -o "$dest"
+    if [[ -n "$sha256" ]]; then
+      echo "$sha256  $dest" | sha256sum -c -
+    fi
+  fi
+}
+
 if command -v ventoy >/dev/null 2>&1; then
   echo "Ventoy already installed"
   exit 0
 fi
 
 rm -rf "$EXTRACT_DIR"
-wget -O "$ARCHIVE" "$DOWNLOAD_URL"
+download "$DOWNLOAD_URL" "$ARCHIVE" "${VENTOY_SHA256:-}"
 tar -xzf "$ARCHIVE" -C /tmp
 sudo cp "$EXTRACT_DIR/Ventoy2Disk.sh" /usr/local/bin/ventoy
 sudo chmod +x /usr/local/bin/ventoy
@@ -5,12 +5,24 @@ ZELLIJ_VERSION="${ZELLIJ_VERSION:-0.43.1}"
 DOWNLOAD_URL="https://github.com/zellij-org/zellij/releases/download/v${ZELLIJ_VERSION}/zellij-x86_64-unknown-linux-musl.tar.gz"
 ARCHIVE="/tmp/zellij-${ZELLIJ_VERSION}.tar.gz"
 
+download() {
+  local url="$1" dest="$2" sha256="${3:-}"
+  if [[ -n "${POP_SETUP_PYTHON:-}" ]]; then
+    "$POP_SETUP_PYTHON" -m pop_setup_cli.download "$url" -o "$dest" ${sha256:+--sha256 "$sha256"}
+  else
+    curl -fL "$url" -o "$dest"
+    if [[ -n "$sha256" ]]; then
+      echo "$sha256  $dest" | sha256sum -c -
+    fi
+  fi
+}
+
 if command -v zellij >/dev/null 2>&1; then
   echo "Zellij already installed"
   exit 0
 fi
 
-wget -O "$ARCHIVE" "$DOWNLOAD_URL"
+download "$DOWNLOAD_URL" "$ARCHIVE" "${ZELLIJ_SHA256:-}"
 tar -xzf "$ARCHIVE" -C /tmp
 sudo mv /tmp/zellij /usr/local/bin/zellij
 rm -f "$ARCHIVE"
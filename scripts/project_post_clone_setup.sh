@@ -38,14 +38,30 @@ resolve_conda_bin() {
   echo "" 
 }
 
+env_cache() {
+  if [[ -z "${POP_SETUP_PYTHON:-}" ]]; then
+    return 3
+  fi
+  "$POP_SETUP_PYTHON" -m pop_setup_cli.env_cache "$@"
+}
+
 run_npm_install() {
-  local dir="$1"
+  local dir="$1" key=""
   if [[ ! -f "$dir/package.json" ]]; then
     return
   fi
   if source_nvm; then
+    if [[ -f "$dir/package-lock.json" ]]; then
+      key="$(env_cache key --kind npm --lockfile "$dir/package-lock.json" --extra "$(node --version)" || true)"
+    fi
+    if [[ -n "$key" ]] && env_cache restore --key "$key" --target "$dir/node_modules"; then
+      return
+    fi
     echo "Running npm install in $dir"
     (cd "$dir" && npm install)
+    if [[ -n "$key" && -d "$dir/node_modules" ]]; then
+      env_cache save --key "$key" --target "$dir/node_modules" || true
+    fi
   else
     echo "NVM not available; skipping npm install in $dir" >&2
   fi
@@ -54,9 +70,22 @@ run_npm_install() {
 apply_conda_env() {
   local file="$1"
   local conda_bin="$2"
+  local name prefix key=""
   if [[ -f "$file" ]]; then
+    name="$(sed -n 's/^name:[[:space:]]*//p' "$file" | head -n 1 | tr -d "\"'[:space:]")"
+    prefix="$(dirname "$(dirname "$conda_bin")")/envs/$name"
+    if [[ -n "$name" ]]; then
+      # Conda envs hard-code their prefix, so it is part of the key.
+      key="$(env_cache key --kind conda --lockfile "$file" --extra "$prefix" || true)"
+    fi
+    if [[ -n "$key" ]] && env_cache restore --key "$key" --target "$prefix"; then
+      return
+    fi
     echo "Applying conda environment from $file"
     "$conda_bin" env create -f "$file" || "$conda_bin" env update -f "$file" --prune
+    if [[ -n "$key" && -d "$prefix" ]]; then
+      env_cache save --key "$key" --target "$prefix" || true
+    fi
   fi
 }
 
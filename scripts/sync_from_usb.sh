@@ -4,6 +4,7 @@ set -euo pipefail
 USB_DRIVE_PATH="${USB_DRIVE_PATH:-/media/Samsung_USB}"
 RIBBING_APP_PARENT="${RIBBING_APP_PARENT:-$HOME/Documents/Projects/RibbingApp}"
 CC_PARENT="${CC_PARENT:-$HOME/Documents/Projects/CattleClassificationApp}"
+USB_SYNC_JOBS="${USB_SYNC_JOBS:-4}"
 
 if [[ ! -d "$USB_DRIVE_PATH" ]]; then
   echo "USB drive not found at $USB_DRIVE_PATH"
@@ -18,7 +19,11 @@ sync_directory() {
   if [[ -d "$src" ]]; then
     echo "Syncing $src -> $dest"
     mkdir -p "$dest"
-    rsync -a --info=progress2 "$src/" "$dest/"
+    if [[ -n "${POP_SETUP_PYTHON:-}" ]]; then
+      "$POP_SETUP_PYTHON" -m pop_setup_cli.usb_sync "$src" "$dest" --jobs "$USB_SYNC_JOBS"
+    else
+      rsync -a --info=progress2 "$src/" "$dest/"
+    fi
   else
     echo "Source missing, skipping: $src"
   fi
@@ -29,7 +34,11 @@ sync_file() {
   if [[ -f "$src" ]]; then
     echo "Syncing file $src"
     mkdir -p "$dest_dir"
-    rsync -a "$src" "$dest_dir/"
+    if [[ -n "${POP_SETUP_PYTHON:-}" ]]; then
+      "$POP_SETUP_PYTHON" -m pop_setup_cli.usb_sync "$src" "$dest_dir"
+    else
+      rsync -a "$src" "$dest_dir/"
+    fi
   else
     echo "File missing, skipping: $src"
   fi
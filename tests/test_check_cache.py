@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from pop_setup_cli.check_cache import CheckCache
+from pop_setup_cli.hardware import HardwareState
+from pop_setup_cli.models import ExecutionResult
+
+
+def _result(script_id: str) -> ExecutionResult:
+    return ExecutionResult(script_id, script_id, "check", "OK", "Already installed")
+
+
+class CheckCacheTest(unittest.TestCase):
+    def test_fresh_entry_is_a_hit(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = CheckCache(Path(tmp))
+            cache.put("key", _result("step"))
+
+            cached = cache.get("step", "key")
+
+            self.assertIsNotNone(cached)
+            self.assertEqual(cached.status, "OK")
+            self.assertEqual((cache.stats.hits, cache.stats.misses), (1, 0))
+
+    def test_expired_entry_is_a_miss(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = CheckCache(Path(tmp), ttl=0.0)
+            cache.put("key", _result("step"))
+            cache.flush()
+
+            self.assertIsNone(cache.get("step", "key"))
+            # Entries keep the TTL they were stored with.
+            self.assertIsNone(CheckCache(Path(tmp), ttl=60.0).get("step", "key"))
+
+    def test_other_key_is_a_miss(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = CheckCache(Path(tmp))
+            cache.put("key", _result("step"))
+
+            self.assertIsNone(cache.get("step", "other"))
+            self.assertEqual(cache.stats.misses, 1)
+
+    def test_key_follows_the_check_script(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            check = Path(tmp) / "check.sh"
+            check.write_text("command -v git\n")
+            cache = CheckCache(Path(tmp))
+            state = HardwareState(False)
+            key = cache.key_for(check, state)
+
+            self.assertEqual(cache.key_for(check, state), key)
+            check.write_text("command -v hg\n")
+            self.assertNotEqual(cache.key_for(check, state), key)
+            self.assertIsNone(cache.key_for(Path(tmp) / "missing.sh", state))
+
+    def test_invalidate_survives_a_reload(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = CheckCache(Path(tmp))
+            cache.put("key", _result("step"))
+            cache.put("key", _result("other"))
+            cache.flush()
+            self.assertIsNotNone(CheckCache(Path(tmp)).get("step", "key"))
+
+            cache.invalidate("step")
+            cache.flush()
+            reloaded = CheckCache(Path(tmp))
+
+            self.assertIsNone(reloaded.get("step", "key"))
+            self.assertIsNotNone(reloaded.get("other", "key"))
+
+    def test_unflushed_entries_are_not_written(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = CheckCache(Path(tmp))
+            cache.put("key", _result("step"))
+
+            self.assertFalse(cache.path.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from pop_setup_cli.durations import DurationHistory
+from pop_setup_cli.models import Script
+
+
+def _script(root: Path, script_id: str) -> Script:
+    (root / f"{script_id}.sh").write_text(f"echo {script_id}\n")
+    return Script(script_id, script_id, "", f"{script_id}.sh")
+
+
+class DurationHistoryTest(unittest.TestCase):
+    def test_check_only_runs_are_averaged_separately(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            step = _script(root, "step")
+            history = DurationHistory(root / "durations.json", root)
+
+            history.record(step, 600.0)
+            self.assertEqual(history.known(step), 600.0)
+            history.record(step, 0.5, check_only=True)
+            self.assertEqual(history.known(step), 0.5)
+            history.record(step, 500.0)
+            self.assertEqual(history.known(step), 570.0)
+
+    def test_unseen_steps_count_as_a_typical_install(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            installed, checked, unseen = (_script(root, name) for name in ("a", "b", "c"))
+            history = DurationHistory(root / "durations.json", root)
+            history.record(installed, 60.0)
+            history.record(checked, 0.2, check_only=True)
+            history.save()
+
+            expected = DurationHistory(root / "durations.json", root).expected(
+                [installed, checked, unseen]
+            )
+
+            self.assertEqual(expected, {"a": 60.0, "b": 0.2, "c": 60.0})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from pop_setup_cli.executor import OUTPUT_DRAIN_SECONDS, Executor
+from pop_setup_cli.hardware import HardwareState
+from pop_setup_cli.journal import RunJournal
+from pop_setup_cli.models import ExecutionResult, Script
+from pop_setup_cli.wakeup import WakeQueue
+
+
+class _NoHardware:
+    def detect(self) -> HardwareState:
+        return HardwareState(False, cpu_count=1)
+
+
+class _Controller:
+    def __init__(self) -> None:
+        self._actions: WakeQueue[str] = WakeQueue()
+        self.requested_at: Optional[float] = None
+
+    def fileno(self) -> int:
+        return self._actions.fileno()
+
+    def consume_action(self) -> Optional[str]:
+        return self._actions.get_nowait()
+
+    def request_when(self, action: str, path: Path) -> None:
+        def fire() -> None:
+            while not path.exists():
+                time.sleep(0.01)
+            self.requested_at = time.perf_counter()
+            self._actions.put(action)
+
+        threading.Thread(target=fire, daemon=True).start()
+
+
+def _alive(pid: int) -> bool:
+    # Orphans are reaped by init; until then a zombie counts as gone.
+    try:
+        stat = Path(f"/proc/{pid}/stat").read_text()
+    except OSError:
+        return False
+    return stat.rsplit(")", 1)[1].split()[0] != "Z"
+
+
+def _script(root: Path, script_id: str, body: str, **options) -> Script:
+    # Every step's check fails, so its install script always runs.
+    (root / "scripts").mkdir(exist_ok=True)
+    (root / "scripts" / "check_missing.sh").write_text("exit 1\n")
+    (root / "scripts" / f"{script_id}.sh").write_text(body + "\n")
+    return Script(
+        script_id,
+        script_id,
+        "",
+        f"scripts/{script_id}.sh",
+        "scripts/check_missing.sh",
+        **options,
+    )
+
+
+def _make_executor(root: Path, scripts: List[Script], **options) -> Executor:
+    return Executor(
+        {script.id: script for script in scripts},
+        {},
+        root,
+        hardware_detector=_NoHardware(),
+        log_root=root / "logs",
+        **options,
+    )
+
+
+def _final(results: List[ExecutionResult]) -> Dict[str, ExecutionResult]:
+    final: Dict[str, ExecutionResult] = {}
+    for result in results:
+        final[result.script_id] = result
+    return final
+
+
+class SchedulerTest(unittest.TestCase):
+    def test_exclusive_resource_is_never_shared(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            # mkdir fails if another holder of the resource is still inside.
+            body = f"mkdir {root}/held || exit 1\nsleep 0.2\nrmdir {root}/held"
+            scripts = [
+                _script(root, f"step_{index}", body, resources=["gpu"]) for index in range(3)
+            ]
+            executor = _make_executor(root, scripts, jobs=3)
+
+            final = _final(executor.run_scripts([script.id for script in scripts]))
+
+            self.assertEqual({result.status for result in final.values()}, {"DONE"})
+
+    def test_dependency_runs_after_its_prerequisite(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            scripts = [
+                _script(root, "base", f"sleep 0.2\ntouch {root}/base.done"),
+                _script(root, "child", f"test -e {root}/base.done", depends_on=["base"]),
+            ]
+            executor = _make_executor(root, scripts, jobs=2)
+
+            final = _final(executor.run_scripts(["child", "base"]))
+
+            self.assertEqual(final["base"].status, "DONE")
+            self.assertEqual(final["child"].status, "DONE")
+
+    def test_failure_skips_dependents_without_running_them(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            scripts = [
+                _script(root, "base", "exit 1"),
+                _script(root, "child", f"touch {root}/child.ran", depends_on=["base"]),
+                _script(root, "grandchild", f"touch {root}/grandchild.ran", depends_on=["child"]),
+                _script(root, "other", "true"),
+            ]
+            executor = _make_executor(root, scripts, jobs=2)
+
+            final = _final(executor.run_scripts([script.id for script in scripts]))
+
+            self.assertEqual(final["base"].status, "FAIL")
+            for script_id in ("child", "grandchild"):
+                self.assertEqual(final[script_id].phase, "dependency")
+                self.assertEqual(final[script_id].status, "SKIP")
+                self.assertFalse((root / f"{script_id}.ran").exists())
+            self.assertEqual(final["other"].status, "DONE")
+
+    def test_cancel_leaves_dependents_unstarted(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            scripts = [
+                _script(root, "base", f"touch {root}/base.started\nsleep 3600"),
+                _script(root, "child", f"touch {root}/child.ran", depends_on=["base"]),
+            ]
+            executor = _make_executor(root, scripts, jobs=2)
+            controller = _Controller()
+            controller.request_when("cancel", root / "base.started")
+
+            results = executor.run_scripts(["base", "child"], controller=controller)
+
+            self.assertEqual(_final(results)["base"].status, "CANCEL")
+            self.assertFalse(any(result.script_id == "child" for result in results))
+            self.assertFalse((root / "child.ran").exists())
+
+
+class ResumeTest(unittest.TestCase):
+    def test_resume_reruns_only_unfinished_steps(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            scripts = [
+                _script(root, "first", f"echo run >> {root}/first.runs"),
+                _script(root, "second", f"test -e {root}/second.ready"),
+                _script(root, "third", "true", depends_on=["second"]),
+            ]
+            journal = RunJournal(root / "journal.jsonl")
+            executor = _make_executor(root, scripts, journal=journal)
+            executor.run_scripts(["first", "second", "third"])
+
+            state = executor.resumable_run()
+            self.assertIsNotNone(state)
+            self.assertEqual(state.remaining(), ["second", "third"])
+
+            (root / "second.ready").touch()
+            final = _final(executor.resume_run())
+
+            self.assertEqual((root / "first.runs").read_text(), "run\n")
+            self.assertTrue(final["first"].message.endswith("(previous run)"))
+            self.assertEqual(final["second"].status, "DONE")
+            self.assertEqual(final["third"].status, "DONE")
+            self.assertIsNone(executor.resumable_run())
+
+    def test_resume_leaves_out_removed_scripts(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            scripts = [
+                _script(root, "kept", f"test -e {root}/kept.ready"),
+                _script(root, "renamed", "exit 1"),
+            ]
+            journal = RunJournal(root / "journal.jsonl")
+            _make_executor(root, scripts, journal=journal).run_scripts(["kept", "renamed"])
+            (root / "kept.ready").touch()
+            executor = _make_executor(root, scripts[:1], journal=journal)
+
+            state = executor.resumable_run()
+            self.assertIsNotNone(state)
+            self.assertEqual(state.script_ids, ["kept"])
+            self.assertEqual(state.dropped, ["renamed"])
+
+            final = _final(executor.resume_run())
+
+            self.assertEqual(list(final), ["kept"])
+            self.assertEqual(final["kept"].status, "DONE")
+
+
+class CancelTest(unittest.TestCase):
+    def test_cancel_stops_background_children(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            pid_file = root / "child.pid"
+            script = _script(
+                root,
+                "spawn",
+                f"sleep 3600 &\necho $! > {pid_file}.tmp\nmv {pid_file}.tmp {pid_file}\nwait",
+            )
+            executor = _make_executor(root, [script])
+            controller = _Controller()
+            controller.request_when("cancel", pid_file)
+
+            results = executor.run_scripts(["spawn"], controller=controller)
+            returned = time.perf_counter()
+
+            self.assertEqual(results[-1].status, "CANCEL")
+            self.assertIsNotNone(controller.requested_at)
+            self.assertLess(returned - controller.requested_at, OUTPUT_DRAIN_SECONDS / 2)
+            child = int(pid_file.read_text())
+            deadline = time.monotonic() + 1
+            while _alive(child) and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertFalse(_alive(child))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import tempfile
+import unittest
+from pathlib import Path
+from typing import List
+
+from pop_setup_cli.log_buffer import LogBuffer
+
+
+def _retained_bytes(buffer: LogBuffer) -> int:
+    return sum(segment.bytes for segment in buffer.segments())
+
+
+class LogBufferBudgetTest(unittest.TestCase):
+    def test_byte_budget_drops_oldest_lines(self) -> None:
+        buffer = LogBuffer(max_lines=1000, max_bytes=100)
+        for index in range(20):
+            buffer.append(f"line {index:04d}")  # 9 bytes each
+
+        self.assertLessEqual(_retained_bytes(buffer), 100)
+        self.assertEqual(buffer.segment("output").retained, 11)
+        self.assertEqual(buffer.tail(2), ["line 0018", "line 0019"])
+        self.assertEqual(buffer.line_count, 20)
+
+    def test_line_cap_applies_per_segment(self) -> None:
+        buffer = LogBuffer(max_lines=3)
+        for index in range(5):
+            buffer.append(str(index))
+
+        self.assertEqual(buffer.tail(10), ["2", "3", "4"])
+
+    def test_oversized_line_is_kept(self) -> None:
+        buffer = LogBuffer(max_bytes=4)
+        buffer.append("much longer than the budget")
+
+        self.assertEqual(buffer.tail(1), ["much longer than the budget"])
+
+
+class LogBufferEvictionTest(unittest.TestCase):
+    def test_finished_segments_are_evicted_first(self) -> None:
+        buffer = LogBuffer(max_bytes=40)
+        buffer.open_segment("done")
+        for index in range(4):
+            buffer.append(f"done {index:04d}", "done")  # 9 bytes each
+        buffer.close_segment("done")
+        buffer.open_segment("small")
+        buffer.append("small", "small")
+        buffer.open_segment("big")
+        for index in range(4):
+            buffer.append(f"big {index:04d}", "big")  # 8 bytes each
+
+        self.assertEqual(buffer.segment("done").retained, 0)
+        self.assertEqual(buffer.segment("big").retained, 4)
+        self.assertEqual(buffer.segment("small").retained, 1)
+
+    def test_biggest_running_segment_gives_way(self) -> None:
+        buffer = LogBuffer(max_bytes=30)
+        buffer.open_segment("small")
+        buffer.append("tiny", "small")
+        buffer.open_segment("big")
+        for index in range(4):
+            buffer.append(f"big {index:04d}", "big")
+
+        self.assertEqual(buffer.segment("small").tail(1), ["tiny"])
+        self.assertEqual(buffer.segment("big").tail(10), ["big 0001", "big 0002", "big 0003"])
+
+    def test_evicted_lines_are_paged_from_the_log(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            log_path = Path(tmp) / "step.log"
+            flushed: List[bool] = []
+            buffer = LogBuffer(max_lines=2)
+            buffer.open_segment("step", log_path, flush=lambda: flushed.append(True))
+            with log_path.open("w") as handle:
+                for index in range(5):
+                    handle.write(f"12:00:00.000 [out] line {index}\n")
+                    buffer.append(f"line {index}", "step")
+
+            tail = buffer.tail(5, segment="step")
+
+            self.assertEqual(tail, [f"line {index}" for index in range(5)])
+            self.assertEqual(flushed, [True])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from pop_setup_cli.trace import folded_stacks, parse_trace, slowest_lines
+
+TRACE = (
+    "+\t100.000000\t/s/a.sh:3\tmain source\tapt-get update\n"
+    "script output that is not a trace line\n"
+    "++\t100.500000\t/s/a.sh:7\tinstall_deb main source\tcurl -o pkg.deb URL\n"
+    "++\t102.500000\t/s/a.sh:7\tinstall_deb main source\tcurl -o pkg.deb URL\n"
+    "+\t103,000000\t/s/a.sh:9\tmain source\tdpkg -i pkg.deb\n"
+    "+\t104.250000\t:end\t\t\n"
+)
+
+
+class ParseTraceTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.trace_path = Path(self._tmp.name) / "step.trace"
+        self.trace_path.write_text(TRACE, encoding="utf-8")
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def test_each_line_is_charged_until_the_next(self) -> None:
+        samples = parse_trace(self.trace_path)
+
+        self.assertEqual(
+            [sample.location for sample in samples],
+            ["/s/a.sh:3", "/s/a.sh:7", "/s/a.sh:7", "/s/a.sh:9"],
+        )
+        # The comma stamp parses, and the last command runs until the end marker.
+        self.assertEqual([sample.seconds for sample in samples], [0.5, 2.0, 0.5, 1.25])
+
+    def test_wrapper_frames_are_dropped(self) -> None:
+        samples = parse_trace(self.trace_path)
+
+        self.assertEqual(samples[0].stack, ())
+        self.assertEqual(samples[1].stack, ("install_deb",))
+
+    def test_slowest_lines_sum_repeated_locations(self) -> None:
+        totals = slowest_lines(parse_trace(self.trace_path), top=2)
+
+        self.assertEqual([total.location for total in totals], ["/s/a.sh:7", "/s/a.sh:9"])
+        self.assertEqual((totals[0].seconds, totals[0].count), (2.5, 2))
+
+    def test_folded_stacks_are_weighted_in_microseconds(self) -> None:
+        folded = folded_stacks("step", parse_trace(self.trace_path))
+
+        self.assertEqual(folded["step;install_deb;/s/a.sh:7"], 2_500_000)
+        self.assertEqual(folded["step;/s/a.sh:9"], 1_250_000)
+
+    def test_missing_trace_is_empty(self) -> None:
+        self.assertEqual(parse_trace(Path(self._tmp.name) / "missing.trace"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from pop_setup_cli.usb_sync import sync_tree
+
+
+class InPlaceOverwriteTest(unittest.TestCase):
+    def test_overwritten_file_is_copied_again(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            source, dest, state = root / "src", root / "dst", root / "state"
+            (source / "sub").mkdir(parents=True)
+            target = source / "sub" / "f"
+            target.write_bytes(b"old")
+            sync_tree(source, dest, jobs=1, state_dir=state)
+            directory_mtime = os.stat(source / "sub").st_mtime_ns
+
+            target.write_bytes(b"new contents")
+            # Writing in place leaves the directory's mtime alone.
+            self.assertEqual(os.stat(source / "sub").st_mtime_ns, directory_mtime)
+            report = sync_tree(source, dest, jobs=1, state_dir=state)
+
+            self.assertFalse(report.skipped_tree)
+            self.assertEqual(report.copied_files, 1)
+            self.assertEqual((dest / "sub" / "f").read_bytes(), b"new contents")
+
+    def test_unchanged_tree_is_skipped(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            source, dest, state = root / "src", root / "dst", root / "state"
+            (source / "sub").mkdir(parents=True)
+            (source / "sub" / "f").write_bytes(b"data")
+            sync_tree(source, dest, jobs=1, state_dir=state)
+
+            report = sync_tree(source, dest, jobs=1, state_dir=state)
+
+            self.assertTrue(report.skipped_tree)
+
+
+if __name__ == "__main__":
+    unittest.main()